@@ -1,20 +1,25 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime, date
-from db import DatabaseManager
+from tkinter import ttk
+import dialogs
+from datetime import datetime, date, timedelta
+from db import (get_database_manager, validate_trip, validate_schedule, WEEKDAYS, format_clock,
+                format_duration, format_timestamp)
+from virtual_list import VirtualTreeview
+from lazy_tabs import LazyTabs
+from data_service import DataService
+from ui_monitor import timed_handler
+from trip_import import import_trip_file
+from data_export import export_bookings, export_trips
 
 class AdminPanel:
-    def __init__(self, parent_frame, user_data):
+    def __init__(self, parent_frame, user_data, data_service=None):
         self.parent_frame = parent_frame
         self.user_data = user_data
-        self.db = DatabaseManager()
+        self.db = get_database_manager()
+        self.data_service = data_service or DataService(parent_frame)
         
-        # Create admin interface
+        # Create admin interface; only the first tab is built and loaded up front
         self.create_widgets()
-        
-        # Load initial data
-        self.load_trips()
-        self.load_all_bookings()
     
     def create_widgets(self):
         """Create admin interface widgets"""
@@ -22,20 +27,22 @@ class AdminPanel:
         self.notebook = ttk.Notebook(self.parent_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Trip Management Tab
-        self.trip_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.trip_frame, text="Trip Management")
-        self.create_trip_management()
-        
-        # Booking Management Tab
-        self.booking_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.booking_frame, text="All Bookings")
-        self.create_booking_management()
-        
-        # Statistics Tab
-        self.stats_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.stats_frame, text="Statistics")
-        self.create_statistics()
+        # Each tab is built and loaded when first selected, and reloaded
+        # on later visits only if trips or bookings were written meanwhile
+        self.tabs = LazyTabs(self.notebook, self.db.data_version)
+        self.trip_frame = self.tabs.add("Trip Management", self.create_trip_management, self.load_trips)
+        self.booking_frame = self.tabs.add("All Bookings", self.create_booking_management, self.load_all_bookings)
+        self.stats_frame = self.tabs.add("Statistics", self.create_statistics, self.update_statistics)
+        self.reports_frame = self.tabs.add("Reports", self.create_reports, self.update_report)
+        self.schedules_frame = self.tabs.add("Schedules", self.create_schedules, self.load_schedules)
+        # Query timings move with every read, so they are fetched on each visit
+        self.diagnostics_frame = self.tabs.add("Diagnostics", self.create_diagnostics, self.update_diagnostics,
+                                               versioned=False)
+        self.tabs.show()
+    
+    def refresh(self):
+        """Reload the visible tab if its data changed while the admin panel was hidden"""
+        self.tabs.show()
     
     def create_trip_management(self):
         """Create trip management interface"""
@@ -109,38 +116,27 @@ class AdminPanel:
         list_frame = ttk.LabelFrame(self.trip_frame, text="Existing Trips", padding="15")
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Create treeview for trips
+        # Create virtual treeview for trips; only the visible rows become Treeview items
         columns = ('ID', 'Source', 'Destination', 'Date', 'Mode', 'Price', 'Departure', 'Arrival', 'Duration', 'Seats')
-        self.trips_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=10)
         
         # Define column headings and widths
         column_widths = {'ID': 50, 'Source': 100, 'Destination': 100, 'Date': 100, 
                         'Mode': 80, 'Price': 80, 'Departure': 80, 'Arrival': 80, 
                         'Duration': 80, 'Seats': 60}
         
-        for col in columns:
-            self.trips_tree.heading(col, text=col)
-            self.trips_tree.column(col, width=column_widths[col])
-        
-        # Scrollbars
-        v_scrollbar1 = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.trips_tree.yview)
-        h_scrollbar1 = ttk.Scrollbar(list_frame, orient=tk.HORIZONTAL, command=self.trips_tree.xview)
-        self.trips_tree.configure(yscrollcommand=v_scrollbar1.set, xscrollcommand=h_scrollbar1.set)
-        
-        # Grid treeview and scrollbars
-        self.trips_tree.grid(row=0, column=0, sticky='nsew')
-        v_scrollbar1.grid(row=0, column=1, sticky='ns')
-        h_scrollbar1.grid(row=1, column=0, sticky='ew')
-        
-        list_frame.grid_rowconfigure(0, weight=1)
-        list_frame.grid_columnconfigure(0, weight=1)
+        self.trips_tree = VirtualTreeview(list_frame, columns, column_widths, self.format_trip, height=10,
+                                          data_service=self.data_service)
         
         # Trip action buttons
         trip_actions = ttk.Frame(list_frame)
         trip_actions.grid(row=2, column=0, columnspan=2, pady=10, sticky='ew')
         
         ttk.Button(trip_actions, text="Refresh", command=self.load_trips).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(trip_actions, text="Delete Selected", command=self.delete_trip).pack(side=tk.LEFT)
+        ttk.Button(trip_actions, text="Delete Selected", command=self.delete_trip).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(trip_actions, text="Import Trips...", command=self.import_trips).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(trip_actions, text="Export Trips...", command=lambda: self.open_export_dialog('trips')).pack(side=tk.LEFT)
+        
+        self.load_trips()
     
     def create_booking_management(self):
         """Create booking management interface"""
@@ -148,9 +144,8 @@ class AdminPanel:
         bookings_frame = ttk.LabelFrame(self.booking_frame, text="All Bookings", padding="15")
         bookings_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Create treeview for bookings
+        # Create virtual treeview for bookings; only the visible rows become Treeview items
         columns = ('Booking ID', 'User', 'Email', 'Route', 'Date', 'Mode', 'Passengers', 'Amount', 'Status', 'Booked On')
-        self.bookings_tree = ttk.Treeview(bookings_frame, columns=columns, show='headings', height=15)
         
         # Define column headings and widths
         column_widths = {
@@ -166,28 +161,20 @@ class AdminPanel:
             'Booked On': 120
         }
         
-        for col in columns:
-            self.bookings_tree.heading(col, text=col)
-            self.bookings_tree.column(col, width=column_widths[col])
-        
-        # Scrollbars
-        v_scrollbar2 = ttk.Scrollbar(bookings_frame, orient=tk.VERTICAL, command=self.bookings_tree.yview)
-        h_scrollbar2 = ttk.Scrollbar(bookings_frame, orient=tk.HORIZONTAL, command=self.bookings_tree.xview)
-        self.bookings_tree.configure(yscrollcommand=v_scrollbar2.set, xscrollcommand=h_scrollbar2.set)
-        
-        # Grid treeview and scrollbars
-        self.bookings_tree.grid(row=0, column=0, sticky='nsew')
-        v_scrollbar2.grid(row=0, column=1, sticky='ns')
-        h_scrollbar2.grid(row=1, column=0, sticky='ew')
+        # Color code by status
+        tag_colors = {'confirmed': '#dcfce7', 'cancelled': '#fecaca', 'pending': '#fef3c7'}
         
-        bookings_frame.grid_rowconfigure(0, weight=1)
-        bookings_frame.grid_columnconfigure(0, weight=1)
+        self.bookings_tree = VirtualTreeview(bookings_frame, columns, column_widths, self.format_booking,
+                                             height=15, tag_colors=tag_colors, data_service=self.data_service)
         
         # Booking action buttons
         booking_actions = ttk.Frame(bookings_frame)
         booking_actions.grid(row=2, column=0, columnspan=2, pady=10, sticky='ew')
         
-        ttk.Button(booking_actions, text="Refresh", command=self.load_all_bookings).pack(side=tk.LEFT)
+        ttk.Button(booking_actions, text="Refresh", command=self.load_all_bookings).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(booking_actions, text="Export...", command=lambda: self.open_export_dialog('bookings')).pack(side=tk.LEFT)
+        
+        self.load_all_bookings()
     
     def create_statistics(self):
         """Create statistics interface"""
@@ -225,160 +212,761 @@ class AdminPanel:
         # Load initial statistics
         self.update_statistics()
     
+    def create_reports(self):
+        """Create time-series report interface"""
+        # Report criteria
+        criteria_frame = ttk.LabelFrame(self.reports_frame, text="Report", padding="15")
+        criteria_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        ttk.Label(criteria_frame, text="Group by:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        self.report_group_var = tk.StringVar(value='day')
+        group_combo = ttk.Combobox(criteria_frame, textvariable=self.report_group_var, width=10, state='readonly')
+        group_combo['values'] = ('day', 'route', 'mode')
+        group_combo.grid(row=0, column=1, padx=(0, 20))
+        
+        ttk.Label(criteria_frame, text="From:").grid(row=0, column=2, sticky=tk.W, padx=(0, 5))
+        self.report_from_var = tk.StringVar()
+        ttk.Entry(criteria_frame, textvariable=self.report_from_var, width=12).grid(row=0, column=3, padx=(0, 20))
+        
+        ttk.Label(criteria_frame, text="To:").grid(row=0, column=4, sticky=tk.W, padx=(0, 5))
+        self.report_to_var = tk.StringVar()
+        ttk.Entry(criteria_frame, textvariable=self.report_to_var, width=12).grid(row=0, column=5, padx=(0, 20))
+        
+        ttk.Label(criteria_frame, text="Mode:").grid(row=0, column=6, sticky=tk.W, padx=(0, 5))
+        self.report_mode_var = tk.StringVar()
+        mode_combo = ttk.Combobox(criteria_frame, textvariable=self.report_mode_var, width=10)
+        mode_combo['values'] = ('', 'flight', 'train', 'bus')
+        mode_combo.grid(row=0, column=7, padx=(0, 20))
+        
+        ttk.Button(criteria_frame, text="Show Report", command=self.update_report).grid(row=0, column=8, padx=(0, 10))
+        ttk.Button(criteria_frame, text="Rebuild Rollups", command=self.rebuild_rollups).grid(row=0, column=9)
+        
+        # Report rows come from the rollup table, so they cost the same however many bookings exist
+        report_frame = ttk.LabelFrame(self.reports_frame, text="Revenue and Load Factor", padding="15")
+        report_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        columns = ('Period', 'Trips', 'Bookings', 'Passengers', 'Revenue', 'Load Factor')
+        column_widths = {'Period': 200, 'Trips': 80, 'Bookings': 80, 'Passengers': 80,
+                         'Revenue': 120, 'Load Factor': 100}
+        
+        self.report_group = 'day'
+        self.report_tree = VirtualTreeview(report_frame, columns, column_widths, self.format_report_row,
+                                           height=15, data_service=self.data_service)
+        
+        self.update_report()
+    
+    @timed_handler("admin report")
+    def update_report(self):
+        """Load the report for the selected grouping and date range"""
+        start_date = self.report_from_var.get().strip()
+        end_date = self.report_to_var.get().strip()
+        
+        # Validate date formats if provided
+        for date_str in (start_date, end_date):
+            if date_str:
+                try:
+                    datetime.strptime(date_str, '%Y-%m-%d')
+                except ValueError:
+                    dialogs.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
+                    return
+        
+        group_by = self.report_group_var.get()
+        self.data_service.submit(
+            self.db.get_rollup_report, group_by, start_date or None, end_date or None,
+            self.report_mode_var.get().strip() or None,
+            on_success=lambda rows: self.show_report(group_by, rows),
+            key="admin-report", owner=self.parent_frame
+        )
+    
+    def show_report(self, group_by, rows):
+        """Display report rows grouped by day, route or mode"""
+        self.report_group = group_by
+        self.report_tree.tree.heading('Period', text={'day': "Date", 'route': "Route", 'mode': "Mode"}[group_by])
+        self.report_tree.set_rows(rows)
+    
+    def format_report_row(self, row):
+        """Format a report row for display; returns (values, tags)"""
+        label, trips, bookings, passengers, revenue, load_factor = row
+        
+        if self.report_group == 'mode':
+            label = label.title()
+        load_str = "N/A" if load_factor is None else f"{load_factor:.0%}"
+        
+        values = (label, trips, bookings, passengers, f"₹{revenue:,.0f}", load_str)
+        return values, ()
+    
+    def rebuild_rollups(self):
+        """Recompute the report rollups from all bookings"""
+        confirmation = dialogs.askyesno(
+            "Rebuild Rollups",
+            "Recompute report totals from all trips and bookings?\n\n"
+            "This is only needed after data was changed outside the application."
+        )
+        if confirmation:
+            self.data_service.submit(
+                self.db.rebuild_rollups, on_success=self.on_rollups_rebuilt, owner=self.parent_frame
+            )
+    
+    def on_rollups_rebuilt(self, result):
+        """Handle the rollup rebuild result"""
+        success, message = result
+        if success:
+            dialogs.showinfo("Success", message)
+            self.update_report()
+        else:
+            dialogs.showerror("Error", message)
+    
+    def create_schedules(self):
+        """Create recurring schedule interface"""
+        cities = ('Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Hyderabad', 'Pune', 'Ahmedabad')
+        
+        form_frame = ttk.LabelFrame(self.schedules_frame, text="Schedule", padding="15")
+        form_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        # Same fields as a trip, with a weekly pattern and validity window instead of a date
+        fields = [
+            ('source', "Source:", cities), ('destination', "Destination:", cities), ('mode', "Mode:", ('flight', 'train', 'bus')),
+            ('price', "Price (₹):", None), ('seats', "Seats:", None), ('duration', "Duration:", None),
+            ('departure_time', "Departure:", None), ('arrival_time', "Arrival:", None), ('valid_from', "Valid from:", None),
+            ('valid_to', "Valid to:", None),
+        ]
+        self.schedule_vars = {}
+        for index, (name, label, values) in enumerate(fields):
+            row, column = divmod(index, 3)
+            ttk.Label(form_frame, text=label).grid(row=row, column=column * 2, sticky=tk.W, padx=(0, 5), pady=3)
+            self.schedule_vars[name] = tk.StringVar()
+            if values is None:
+                widget = ttk.Entry(form_frame, textvariable=self.schedule_vars[name], width=15)
+            else:
+                widget = ttk.Combobox(form_frame, textvariable=self.schedule_vars[name], values=values, width=13)
+            widget.grid(row=row, column=column * 2 + 1, sticky=tk.W, padx=(0, 20), pady=3)
+        
+        days_frame = ttk.Frame(form_frame)
+        days_frame.grid(row=4, column=0, columnspan=6, sticky=tk.W, pady=(5, 0))
+        ttk.Label(days_frame, text="Runs on:").pack(side=tk.LEFT, padx=(0, 5))
+        self.schedule_day_vars = []
+        for day in WEEKDAYS:
+            day_var = tk.BooleanVar(value=True)
+            ttk.Checkbutton(days_frame, text=day, variable=day_var).pack(side=tk.LEFT, padx=(0, 5))
+            self.schedule_day_vars.append(day_var)
+        
+        form_actions = ttk.Frame(form_frame)
+        form_actions.grid(row=5, column=0, columnspan=6, sticky=tk.W, pady=(10, 0))
+        ttk.Button(form_actions, text="Add Schedule", command=self.add_schedule).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(form_actions, text="Update Selected", command=self.update_schedule).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(form_actions, text="Delete Selected", command=self.delete_schedule).pack(side=tk.LEFT)
+        
+        # Schedule list
+        list_frame = ttk.LabelFrame(self.schedules_frame, text="Recurring Schedules", padding="15")
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        columns = ('ID', 'Route', 'Mode', 'Price', 'Departure', 'Arrival', 'Seats', 'Days', 'Valid From', 'Valid To')
+        column_widths = {'ID': 50, 'Route': 180, 'Mode': 80, 'Price': 80, 'Departure': 80, 'Arrival': 80,
+                         'Seats': 60, 'Days': 180, 'Valid From': 100, 'Valid To': 100}
+        
+        self.schedules_tree = VirtualTreeview(list_frame, columns, column_widths, self.format_schedule, height=10,
+                                              data_service=self.data_service)
+        self.schedules_tree.tree.bind('<<TreeviewSelect>>', self.on_schedule_selected)
+        
+        # Trip generation
+        generate_actions = ttk.Frame(list_frame)
+        generate_actions.grid(row=2, column=0, columnspan=2, pady=10, sticky='ew')
+        
+        ttk.Button(generate_actions, text="Refresh", command=self.load_schedules).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Label(generate_actions, text="Days ahead:").pack(side=tk.LEFT, padx=(10, 5))
+        self.schedule_days_ahead_var = tk.StringVar(value='90')
+        ttk.Spinbox(generate_actions, from_=1, to=365, textvariable=self.schedule_days_ahead_var,
+                    width=5).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(generate_actions, text="Generate Trips", command=self.generate_trips).pack(side=tk.LEFT)
+        
+        self.load_schedules()
+    
+    def load_schedules(self):
+        """Load all schedules"""
+        self.data_service.submit(
+            self.db.get_schedules, on_success=self.schedules_tree.set_rows,
+            key="admin-schedules", owner=self.parent_frame
+        )
+    
+    def format_schedule(self, schedule):
+        """Format a schedule row for display; returns (values, tags)"""
+        (schedule_id, source, destination, mode, price, duration, departure, arrival, seats,
+         days_of_week, valid_from, valid_to) = schedule
+        
+        if days_of_week == 127:
+            days = "Daily"
+        else:
+            days = " ".join(day for bit, day in enumerate(WEEKDAYS) if days_of_week & (1 << bit))
+        
+        values = (
+            schedule_id, f"{source} → {destination}", mode.title(), f"₹{price:,.0f}",
+            departure, arrival, seats, days, valid_from, valid_to
+        )
+        return values, ()
+    
+    def on_schedule_selected(self, event=None):
+        """Copy the selected schedule into the form for editing"""
+        schedule = self.schedules_tree.selected_row()
+        if schedule is None:
+            return
+        
+        (schedule_id, source, destination, mode, price, duration, departure, arrival, seats,
+         days_of_week, valid_from, valid_to) = schedule
+        values = {
+            'source': source, 'destination': destination, 'mode': mode, 'price': f"{price:g}",
+            'seats': seats, 'duration': duration, 'departure_time': departure, 'arrival_time': arrival,
+            'valid_from': valid_from, 'valid_to': valid_to,
+        }
+        for name, value in values.items():
+            self.schedule_vars[name].set(value)
+        for bit, day_var in enumerate(self.schedule_day_vars):
+            day_var.set(bool(days_of_week & (1 << bit)))
+    
+    def read_schedule_form(self):
+        """Validate the schedule form; returns the schedule values or None"""
+        days_of_week = sum(1 << bit for bit, day_var in enumerate(self.schedule_day_vars) if day_var.get())
+        try:
+            return validate_schedule(
+                self.schedule_vars['source'].get(),
+                self.schedule_vars['destination'].get(),
+                self.schedule_vars['mode'].get(),
+                self.schedule_vars['price'].get(),
+                self.schedule_vars['duration'].get(),
+                self.schedule_vars['departure_time'].get(),
+                self.schedule_vars['arrival_time'].get(),
+                self.schedule_vars['seats'].get(),
+                days_of_week,
+                self.schedule_vars['valid_from'].get(),
+                self.schedule_vars['valid_to'].get()
+            )
+        except ValueError as e:
+            dialogs.showerror("Error", f"Invalid input: {str(e)}")
+            return None
+    
+    def add_schedule(self):
+        """Add a new recurring schedule"""
+        schedule = self.read_schedule_form()
+        if schedule is not None:
+            self.data_service.submit(
+                self.db.add_schedule, *schedule, on_success=self.on_schedule_added, owner=self.parent_frame)
+    
+    def on_schedule_added(self, result):
+        """Handle the add schedule result"""
+        success, message, schedule_id = result
+        if success:
+            dialogs.showinfo("Success", f"{message}.\n\nUse Generate Trips to create its trips.")
+            self.load_schedules()
+        else:
+            dialogs.showerror("Error", message)
+    
+    def update_schedule(self):
+        """Apply the form to the selected schedule and its future trips"""
+        selected = self.schedules_tree.selected_row()
+        if selected is None:
+            dialogs.showwarning("No Selection", "Please select a schedule to update.")
+            return
+        
+        schedule = self.read_schedule_form()
+        if schedule is None:
+            return
+        
+        confirmation = dialogs.askyesno(
+            "Update Schedule",
+            f"Update schedule #{selected[0]}?\n\n"
+            f"Future trips are changed to match; booked trips are never removed."
+        )
+        if confirmation:
+            self.data_service.submit(
+                self.db.update_schedule, selected[0], *schedule,
+                on_success=self.on_schedule_changed, owner=self.parent_frame
+            )
+    
+    def delete_schedule(self):
+        """Delete the selected schedule"""
+        schedule = self.schedules_tree.selected_row()
+        if schedule is None:
+            dialogs.showwarning("No Selection", "Please select a schedule to delete.")
+            return
+        
+        confirmation = dialogs.askyesno(
+            "Confirm Deletion",
+            f"Are you sure you want to delete schedule #{schedule[0]}?\n\n"
+            f"Its future trips without bookings are deleted as well."
+        )
+        if confirmation:
+            self.data_service.submit(
+                self.db.delete_schedule, schedule[0], on_success=self.on_schedule_changed, owner=self.parent_frame)
+    
+    def on_schedule_changed(self, result):
+        """Handle the update or delete schedule result"""
+        success, message = result
+        if success:
+            dialogs.showinfo("Success", message)
+            self.load_schedules()
+        else:
+            dialogs.showerror("Error", message)
+    
+    def generate_trips(self):
+        """Generate trips for every schedule from today up to the chosen number of days ahead"""
+        try:
+            days_ahead = int(self.schedule_days_ahead_var.get())
+            if days_ahead <= 0:
+                raise ValueError
+        except ValueError:
+            dialogs.showerror("Error", "Days ahead must be a positive number")
+            return
+        
+        start = date.today()
+        end = start + timedelta(days=days_ahead - 1)
+        self.data_service.submit(
+            self.db.expand_schedules, start.isoformat(), end.isoformat(),
+            on_success=self.on_trips_generated, owner=self.parent_frame
+        )
+    
+    def on_trips_generated(self, result):
+        """Handle the trip generation result"""
+        success, message, created = result
+        if success:
+            dialogs.showinfo("Success", message)
+        else:
+            dialogs.showerror("Error", message)
+    
+    def create_diagnostics(self):
+        """Create query instrumentation interface"""
+        actions = ttk.Frame(self.diagnostics_frame)
+        actions.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        ttk.Button(actions, text="Refresh", command=self.update_diagnostics).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(actions, text="Reset", command=self.reset_diagnostics).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(actions, text="Save to File...", command=self.save_diagnostics).pack(side=tk.LEFT, padx=(0, 20))
+        self.diagnostics_summary = ttk.Label(actions, text="", font=('Arial', 10))
+        self.diagnostics_summary.pack(side=tk.LEFT)
+        
+        # Per-method timings
+        methods_frame = ttk.LabelFrame(self.diagnostics_frame, text="Database Operations", padding="10")
+        methods_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        
+        columns = ('Operation', 'Calls', 'Errors', 'Mean ms', 'p95 ms', 'p99 ms', 'Max ms', 'Rows')
+        column_widths = {'Operation': 220, 'Calls': 70, 'Errors': 60, 'Mean ms': 80, 'p95 ms': 80,
+                         'p99 ms': 80, 'Max ms': 80, 'Rows': 90}
+        self.methods_tree = VirtualTreeview(methods_frame, columns, column_widths, self.format_method_stats,
+                                            height=6, data_service=self.data_service)
+        
+        # Per-statement timings with their query plans
+        statements_frame = ttk.LabelFrame(self.diagnostics_frame, text="SQL Statements", padding="10")
+        statements_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        columns = ('Statement', 'Calls', 'Total ms', 'Mean ms', 'p95 ms', 'Rows', 'Plan')
+        column_widths = {'Statement': 420, 'Calls': 70, 'Total ms': 90, 'Mean ms': 80, 'p95 ms': 80,
+                         'Rows': 90, 'Plan': 160}
+        self.statements_tree = VirtualTreeview(statements_frame, columns, column_widths, self.format_statement_stats,
+                                               height=6, tag_colors={'full_scan': '#fecaca'},
+                                               data_service=self.data_service)
+        self.statements_tree.tree.bind('<<TreeviewSelect>>', self.on_statement_selected)
+        self.statement_plan_label = ttk.Label(statements_frame, text="", font=('Courier', 9), justify=tk.LEFT)
+        self.statement_plan_label.grid(row=2, column=0, columnspan=2, sticky='w', pady=(5, 0))
+        
+        # Statements slower than the monitor's threshold, newest first
+        slow_frame = ttk.LabelFrame(self.diagnostics_frame, text="Slow Queries", padding="10")
+        slow_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
+        
+        columns = ('Time', 'ms', 'Operation', 'Rows', 'Statement', 'Parameters')
+        column_widths = {'Time': 140, 'ms': 80, 'Operation': 160, 'Rows': 70, 'Statement': 380, 'Parameters': 200}
+        self.slow_tree = VirtualTreeview(slow_frame, columns, column_widths, self.format_slow_query, height=5,
+                                         tag_colors={'full_scan': '#fecaca'}, data_service=self.data_service)
+        
+        self.update_diagnostics()
+    
+    def update_diagnostics(self):
+        """Show the latest query instrumentation snapshot"""
+        self.data_service.submit(
+            self.db.query_stats, on_success=self.show_diagnostics, key="admin-diagnostics", owner=self.parent_frame
+        )
+    
+    def show_diagnostics(self, stats):
+        """Fill the diagnostics lists from a QueryMonitor snapshot"""
+        if stats is None:
+            self.diagnostics_summary.configure(text="Query monitoring is off for this database connection.")
+            return
+        
+        pool = self.db.pool_stats()
+        scans = sum(1 for statement in stats['statements'] if statement['full_scans'])
+        self.diagnostics_summary.configure(
+            text=f"Since {stats['since']}  |  slow threshold {stats['slow_threshold_ms']:g} ms  |  "
+                 f"{scans} statement(s) with full scans  |  lock wait {pool['lock_wait_time']:.2f}s "
+                 f"over {pool['write_transactions']} writes"
+        )
+        self.methods_tree.set_rows(sorted(stats['methods'].items(), key=lambda item: item[1]['total_ms'],
+                                          reverse=True))
+        self.statements_tree.set_rows([(statement['sql'], statement) for statement in stats['statements']])
+        self.slow_tree.set_rows(list(enumerate(stats['slow_queries']))[::-1])
+        self.statement_plan_label.configure(text="")
+    
+    def format_method_stats(self, row):
+        """Format an operation's timings for display; returns (values, tags)"""
+        name, stats = row
+        values = (name, stats['calls'], stats['errors'], f"{stats['mean_ms']:.2f}", f"{stats['p95_ms']:.2f}",
+                  f"{stats['p99_ms']:.2f}", f"{stats['max_ms']:.2f}", stats['rows'])
+        return values, ()
+    
+    def format_statement_stats(self, row):
+        """Format a statement's timings for display; returns (values, tags)"""
+        sql, stats = row
+        if stats['full_scans']:
+            plan, tags = "FULL SCAN", ('full_scan',)
+        elif stats['plan']:
+            plan, tags = "indexed", ()
+        else:
+            plan, tags = "", ()
+        mean = f"{stats['mean_ms']:.2f}" if stats['mean_ms'] is not None else ""
+        p95 = f"{stats['p95_ms']:.2f}" if stats['p95_ms'] is not None else ""
+        values = (sql, stats['calls'], f"{stats['total_ms']:.1f}", mean, p95, stats['rows'], plan)
+        return values, tags
+    
+    def format_slow_query(self, row):
+        """Format a slow-query log entry for display; returns (values, tags)"""
+        index, entry = row
+        tags = ('full_scan',) if entry['full_scans'] else ()
+        values = (entry['time'], f"{entry['elapsed_ms']:.1f}", entry['method'] or "", entry['rows'],
+                  entry['sql'], str(entry['params']))
+        return values, tags
+    
+    def on_statement_selected(self, event=None):
+        """Show the selected statement's query plan"""
+        row = self.statements_tree.selected_row()
+        if row is None:
+            return
+        plan = row[1]['plan']
+        self.statement_plan_label.configure(
+            text="\n".join(plan) if plan else "No query plan captured for this statement")
+    
+    def reset_diagnostics(self):
+        """Start collecting diagnostics afresh"""
+        if self.db.monitor is not None:
+            self.db.monitor.reset()
+        self.update_diagnostics()
+    
+    def save_diagnostics(self):
+        """Write the diagnostics, with pool and cache statistics, to a JSON file"""
+        if self.db.monitor is None:
+            dialogs.showinfo("Diagnostics", "Query monitoring is off for this database connection.")
+            return
+        path = dialogs.asksaveasfilename(
+            title="Save Diagnostics", defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("All files", "*.*")],
+            initialfile=f"diagnostics-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        if not path:
+            return
+        self.data_service.submit(
+            lambda: self.db.monitor.dump(path, pool=self.db.pool_stats(), cache=self.db.cache_stats()),
+            on_success=lambda report: dialogs.showinfo("Diagnostics", f"Diagnostics saved to:\n{path}"),
+            on_error=lambda error: dialogs.showerror("Error", f"Could not save diagnostics: {str(error)}"),
+            owner=self.parent_frame
+        )
+    
     def add_trip(self):
         """Add a new trip"""
         # Validate inputs
         if not all([self.source_var.get(), self.destination_var.get(), self.date_var.get(),
                    self.mode_var.get(), self.price_var.get(), self.seats_var.get(),
                    self.departure_var.get(), self.arrival_var.get(), self.duration_var.get()]):
-            messagebox.showerror("Error", "Please fill in all fields")
+            dialogs.showerror("Error", "Please fill in all fields")
             return
         
         try:
-            # Validate date
-            datetime.strptime(self.date_var.get(), '%Y-%m-%d')
-            
-            # Validate numeric fields
-            price = float(self.price_var.get())
-            seats = int(self.seats_var.get())
-            
-            if price <= 0 or seats <= 0:
-                raise ValueError("Price and seats must be positive")
-            
+            # Same rules the importer applies to every row
+            trip = validate_trip(
+                self.source_var.get(),
+                self.destination_var.get(),
+                self.date_var.get(),
+                self.price_var.get(),
+                self.mode_var.get(),
+                self.duration_var.get(),
+                self.departure_var.get(),
+                self.arrival_var.get(),
+                self.seats_var.get()
+            )
         except ValueError as e:
-            messagebox.showerror("Error", f"Invalid input: {str(e)}")
+            dialogs.showerror("Error", f"Invalid input: {str(e)}")
             return
         
         # Add trip to database
-        success, message = self.db.add_trip(
-            self.source_var.get(),
-            self.destination_var.get(),
-            self.date_var.get(),
-            price,
-            self.mode_var.get(),
-            self.duration_var.get(),
-            self.departure_var.get(),
-            self.arrival_var.get(),
-            seats
-        )
-        
+        self.data_service.submit(self.db.add_trip, *trip, on_success=self.on_trip_added, owner=self.parent_frame)
+    
+    def on_trip_added(self, result):
+        """Handle the add trip result"""
+        success, message = result
         if success:
-            messagebox.showinfo("Success", "Trip added successfully!")
+            dialogs.showinfo("Success", "Trip added successfully!")
             # Clear form
             for var in [self.source_var, self.destination_var, self.date_var, self.mode_var,
                        self.price_var, self.seats_var, self.departure_var, self.arrival_var, self.duration_var]:
                 var.set('')
             self.load_trips()
         else:
-            messagebox.showerror("Error", message)
+            dialogs.showerror("Error", message)
+    
+    def import_trips(self):
+        """Bulk-import trips from a timetable file"""
+        path = dialogs.askopenfilename(
+            parent=self.parent_frame,
+            title="Import Trips",
+            filetypes=[("Timetables", "*.csv *.json *.jsonl *.ndjson"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        # Progress window; the import itself runs on a worker thread
+        self.import_window = tk.Toplevel(self.parent_frame)
+        self.import_window.title("Importing Trips")
+        self.import_window.geometry("420x140")
+        self.import_window.resizable(False, False)
+        self.import_window.transient(self.parent_frame.winfo_toplevel())
+        self.import_window.protocol("WM_DELETE_WINDOW", lambda: None)
+        
+        import_frame = ttk.Frame(self.import_window, padding="20")
+        import_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.import_progress = ttk.Progressbar(import_frame, maximum=100, length=380)
+        self.import_progress.pack(fill=tk.X, pady=(0, 10))
+        self.import_status = ttk.Label(import_frame, text="Reading file...", font=('Arial', 10))
+        self.import_status.pack(fill=tk.X)
+        
+        self.data_service.submit(
+            self.run_import, path,
+            on_success=self.on_import_finished, on_error=self.on_import_error, owner=self.parent_frame
+        )
+    
+    def run_import(self, path):
+        """Import a trip file (runs on a worker thread)"""
+        window = self.import_window
+        return import_trip_file(
+            self.db, path,
+            on_progress=lambda summary: self.data_service.post(self.show_import_progress, summary, owner=window),
+            rejects_path=path + ".rejects.csv"
+        )
+    
+    def show_import_progress(self, summary):
+        """Update the import progress window"""
+        if summary['total_bytes']:
+            self.import_progress['value'] = 100 * summary['bytes_read'] / summary['total_bytes']
+        self.import_status.configure(
+            text=f"{summary['read']} rows read: {summary['imported']} imported, "
+                 f"{summary['duplicates']} duplicates, {summary['rejected']} rejected"
+        )
+    
+    def on_import_finished(self, summary):
+        """Report the import result"""
+        self.import_window.destroy()
+        
+        message = (
+            f"Imported {summary['imported']} of {summary['read']} rows.\n\n"
+            f"Duplicates skipped: {summary['duplicates']}\n"
+            f"Rejected: {summary['rejected']}"
+        )
+        if summary['rejects_path']:
+            message += f"\n\nRejected rows and reasons were written to:\n{summary['rejects_path']}"
+        dialogs.showinfo("Import Complete", message)
+        self.load_trips()
+    
+    def on_import_error(self, error):
+        """Handle an import that failed part-way"""
+        self.import_window.destroy()
+        dialogs.showerror("Import Failed", f"Import stopped: {str(error)}\n\nBatches committed before the error were kept.")
+        self.load_trips()
+    
+    def open_export_dialog(self, kind):
+        """Ask for export filters; kind is 'bookings' or 'trips'"""
+        dialog = tk.Toplevel(self.parent_frame)
+        dialog.title(f"Export {kind.title()}")
+        dialog.resizable(False, False)
+        dialog.transient(self.parent_frame.winfo_toplevel())
+        dialog.grab_set()
+        
+        form = ttk.Frame(dialog, padding="20")
+        form.pack(fill=tk.BOTH, expand=True)
+        
+        # Bookings filter on the booking date, trips on the travel date
+        date_label = "Booked" if kind == 'bookings' else "Travel"
+        cities = ('', 'Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Hyderabad', 'Pune', 'Ahmedabad')
+        fields = [
+            ('start_date', f"{date_label} from (YYYY-MM-DD):", None),
+            ('end_date', f"{date_label} to (YYYY-MM-DD):", None),
+            ('source', "Source:", cities),
+            ('destination', "Destination:", cities),
+        ]
+        if kind == 'bookings':
+            fields.append(('status', "Status:", ('', 'confirmed', 'cancelled', 'pending')))
+        else:
+            fields.append(('mode', "Mode:", ('', 'flight', 'train', 'bus')))
+        
+        filter_vars = {}
+        for row, (name, label, values) in enumerate(fields):
+            ttk.Label(form, text=label).grid(row=row, column=0, sticky=tk.W, padx=(0, 10), pady=3)
+            filter_vars[name] = tk.StringVar()
+            if values is None:
+                widget = ttk.Entry(form, textvariable=filter_vars[name], width=18)
+            else:
+                widget = ttk.Combobox(form, textvariable=filter_vars[name], values=values, width=16)
+            widget.grid(row=row, column=1, sticky=tk.W, pady=3)
+        
+        status_label = ttk.Label(form, text="", font=('Arial', 9), foreground='gray')
+        status_label.grid(row=len(fields), column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        
+        export_button = ttk.Button(
+            form, text="Export",
+            command=lambda: self.start_export(kind, dialog, filter_vars, export_button, status_label)
+        )
+        export_button.grid(row=len(fields) + 1, column=0, columnspan=2, pady=(10, 0))
     
+    def start_export(self, kind, dialog, filter_vars, export_button, status_label):
+        """Validate the filters, pick a file and stream the export on a worker thread"""
+        filters = {name: var.get().strip() or None for name, var in filter_vars.items()}
+        for name in ('start_date', 'end_date'):
+            if filters[name]:
+                try:
+                    datetime.strptime(filters[name], '%Y-%m-%d')
+                except ValueError:
+                    dialogs.showerror("Error", "Invalid date format. Use YYYY-MM-DD", parent=dialog)
+                    return
+        
+        path = dialogs.asksaveasfilename(
+            parent=dialog,
+            title=f"Export {kind.title()}",
+            defaultextension=".csv",
+            initialfile=f"{kind}.csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl *.ndjson")]
+        )
+        if not path:
+            return
+        
+        export = export_bookings if kind == 'bookings' else export_trips
+        
+        def show_progress(count):
+            status_label.configure(text=f"{count} row(s) written...")
+        
+        export_button.configure(state=tk.DISABLED)
+        self.data_service.submit(
+            export, self.db, path,
+            on_progress=lambda count: self.data_service.post(show_progress, count, owner=dialog),
+            on_success=lambda count: self.on_export_finished(dialog, path, count),
+            on_error=lambda error: self.on_export_error(dialog, export_button, error),
+            owner=dialog, **filters
+        )
+    
+    def on_export_finished(self, dialog, path, count):
+        """Report a finished export"""
+        dialog.destroy()
+        dialogs.showinfo("Export Complete", f"Exported {count} row(s) to:\n{path}")
+    
+    def on_export_error(self, dialog, export_button, error):
+        """Report a failed export"""
+        export_button.configure(state=tk.NORMAL)
+        dialogs.showerror("Export Failed", f"Export failed: {str(error)}", parent=dialog)
+    
+    @timed_handler("admin trips")
     def load_trips(self):
         """Load all trips"""
-        trips = self.db.search_trips()
-        
-        # Clear existing items
-        for item in self.trips_tree.get_children():
-            self.trips_tree.delete(item)
+        self.trips_tree.set_source(lambda after, page_size: self.db.search_trips_page(page_size=page_size, after=after))
+    
+    def patch_trip(self, trip):
+        """Update one trip row in place, e.g. after its seat count changed"""
+        if trip is not None:
+            self.patch_trips([trip])
+    
+    def patch_trips(self, trips):
+        """Update the trip rows changed by one data write in place"""
+        if trips and self.tabs.is_built(self.trip_frame):
+            for trip in trips:
+                self.trips_tree.update_row(trip)
+            self.tabs.mark_patched(self.trip_frame)
+    
+    def format_trip(self, trip):
+        """Format a trip row for display; returns (values, tags)"""
+        trip_id, source, destination, date, price, mode, duration, departure, arrival, seats, created_at = trip
         
-        # Insert trip data
-        for trip in trips:
-            trip_id, source, destination, date, price, mode, duration, departure, arrival, seats, created_at = trip
-            
-            self.trips_tree.insert('', tk.END, values=(
-                trip_id, source, destination, date, mode.title(), 
-                f"₹{price:,.0f}", departure, arrival, duration, seats
-            ))
+        values = (
+            trip_id, source, destination, date, mode.title(), 
+            f"₹{price:,.0f}", format_clock(departure), format_clock(arrival), format_duration(duration), seats
+        )
+        return values, ()
     
     def delete_trip(self):
         """Delete selected trip"""
-        selection = self.trips_tree.selection()
-        if not selection:
-            messagebox.showwarning("No Selection", "Please select a trip to delete.")
+        trip = self.trips_tree.selected_row()
+        if trip is None:
+            dialogs.showwarning("No Selection", "Please select a trip to delete.")
             return
         
         # Get selected trip data
-        item = self.trips_tree.item(selection[0])
-        trip_id = item['values'][0]
+        trip_id = trip[0]
         
         # Confirm deletion
-        confirmation = messagebox.askyesno(
+        confirmation = dialogs.askyesno(
             "Confirm Deletion",
             f"Are you sure you want to delete trip #{trip_id}?\n\n"
             f"This action cannot be undone."
         )
         
         if confirmation:
-            success, message = self.db.delete_trip(trip_id)
-            if success:
-                messagebox.showinfo("Success", "Trip deleted successfully!")
-                self.load_trips()
-            else:
-                messagebox.showerror("Error", message)
+            self.data_service.submit(
+                self.db.delete_trip, trip_id, on_success=self.on_trip_deleted, owner=self.parent_frame)
+    
+    def on_trip_deleted(self, result):
+        """Handle the delete trip result"""
+        success, message = result
+        if success:
+            dialogs.showinfo("Success", "Trip deleted successfully!")
+            self.load_trips()
+        else:
+            dialogs.showerror("Error", message)
     
+    @timed_handler("admin bookings")
     def load_all_bookings(self):
         """Load all bookings"""
-        bookings = self.db.get_all_bookings()
-        
-        # Clear existing items
-        for item in self.bookings_tree.get_children():
-            self.bookings_tree.delete(item)
-        
-        # Insert booking data
-        for booking in bookings:
-            booking_id, user_name, email, passengers, total_amount, booking_date, status, source, destination, date, mode = booking
-            
-            # Format data
-            route = f"{source} → {destination}"
-            amount_str = f"₹{total_amount:,.0f}"
-            
-            # Format booking date
-            booking_dt = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
-            booked_on = booking_dt.strftime('%Y-%m-%d %H:%M')
-            
-            # Color code by status
-            tags = ()
-            if status == 'confirmed':
-                tags = ('confirmed',)
-            elif status == 'cancelled':
-                tags = ('cancelled',)
-            elif status == 'pending':
-                tags = ('pending',)
-            
-            self.bookings_tree.insert('', tk.END, values=(
-                booking_id, user_name, email, route, date, mode.title(), 
-                passengers, amount_str, status.title(), booked_on
-            ), tags=tags)
-        
-        # Configure tag colors
-        self.bookings_tree.tag_configure('confirmed', background='#dcfce7')
-        self.bookings_tree.tag_configure('cancelled', background='#fecaca')
-        self.bookings_tree.tag_configure('pending', background='#fef3c7')
+        self.bookings_tree.set_source(
+            lambda after, page_size: self.db.get_all_bookings_page(page_size=page_size, after=after))
     
+    def format_booking(self, booking):
+        """Format a booking row for display; returns (values, tags)"""
+        booking_id, user_name, email, passengers, total_amount, booking_epoch, status, source, destination, date, mode = booking
+        
+        # Format data
+        route = f"{source} → {destination}"
+        amount_str = f"₹{total_amount:,.0f}"
+        
+        booked_on = format_timestamp(booking_epoch)
+        
+        # Color code by status
+        tags = ()
+        if status in ('confirmed', 'cancelled', 'pending'):
+            tags = (status,)
+        
+        values = (
+            booking_id, user_name, email, route, date, mode.title(), 
+            passengers, amount_str, status.title(), booked_on
+        )
+        return values, tags
+    
+    @timed_handler("admin statistics")
     def update_statistics(self):
         """Update statistics display"""
-        bookings = self.db.get_all_bookings()
-        
-        # Calculate statistics
-        total_bookings = len(bookings)
-        confirmed_bookings = [b for b in bookings if b[6] == 'confirmed']
-        total_revenue = sum([b[4] for b in confirmed_bookings])
-        total_passengers = sum([b[3] for b in confirmed_bookings])
-        
-        # Popular route
-        if confirmed_bookings:
-            routes = [f"{b[7]} → {b[8]}" for b in confirmed_bookings]
-            popular_route = max(set(routes), key=routes.count) if routes else "N/A"
-            
-            # Popular mode
-            modes = [b[10] for b in confirmed_bookings]
-            popular_mode = max(set(modes), key=modes.count).title() if modes else "N/A"
-        else:
-            popular_route = "N/A"
-            popular_mode = "N/A"
+        self.data_service.submit(
+            self.db.get_booking_statistics, on_success=self.show_statistics,
+            key="admin-statistics", owner=self.parent_frame
+        )
+    
+    def show_statistics(self, stats):
+        """Display the aggregated statistics"""
+        popular_route = "N/A"
+        if stats['popular_route']:
+            popular_route = f"{stats['popular_route'][0]} → {stats['popular_route'][1]}"
+        popular_mode = stats['popular_mode'].title() if stats['popular_mode'] else "N/A"
         
         # Update labels
-        self.total_bookings_label.configure(text=f"Total Bookings: {total_bookings}")
-        self.total_revenue_label.configure(text=f"Total Revenue: ₹{total_revenue:,.0f}")
-        self.total_passengers_label.configure(text=f"Total Passengers: {total_passengers}")
+        self.total_bookings_label.configure(text=f"Total Bookings: {stats['total_bookings']}")
+        self.total_revenue_label.configure(text=f"Total Revenue: ₹{stats['total_revenue']:,.0f}")
+        self.total_passengers_label.configure(text=f"Total Passengers: {stats['total_passengers']}")
         self.popular_route_label.configure(text=f"Popular Route: {popular_route}")
         self.popular_mode_label.configure(text=f"Popular Mode: {popular_mode}")
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""Performance benchmarks for the database layer
+
+generator fills a database with seeded synthetic cities, trips, users and
+bookings; runner times DatabaseManager operations against it at several
+data sizes and writes p50/p95/p99 latency and throughput as JSON:
+    
+    python -m benchmarks --sizes 10000,100000,1000000 --output bench.json
+    python -m benchmarks --output new.json --baseline bench.json
+"""
\ No newline at end of file
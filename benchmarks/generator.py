@@ -0,0 +1,225 @@
+import argparse
+import itertools
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from db import DatabaseManager
+
+# Fixed calendar so runs on different days generate identical databases
+START_DATE = date(2030, 1, 1)
+
+# Real city names first; larger runs continue with numbered ones
+CITY_NAMES = (
+    'Mumbai', 'Delhi', 'Bangalore', 'Chennai', 'Kolkata', 'Hyderabad', 'Pune', 'Ahmedabad',
+    'Jaipur', 'Goa', 'Kochi', 'Lucknow', 'Chandigarh', 'Indore', 'Bhopal', 'Nagpur',
+    'Patna', 'Surat', 'Varanasi', 'Amritsar', 'Coimbatore', 'Mysore', 'Udaipur', 'Guwahati',
+)
+
+# Per travel mode: share of trips, capacity, price per hour, (shortest, longest) duration in minutes
+MODE_PROFILES = {
+    'bus': (0.5, 45, 150, (120, 900)),
+    'train': (0.35, 400, 250, (180, 1800)),
+    'flight': (0.15, 180, 2400, (60, 240)),
+}
+
+# Departures bunch around the morning and evening peaks: (weight, mean hour, spread in hours)
+DEPARTURE_PEAKS = ((0.45, 7.5, 1.5), (0.35, 18.5, 2.0), (0.2, 13.0, 4.0))
+
+# Passengers per booking, and how many days before travel bookings are made
+PASSENGER_WEIGHTS = (0.55, 0.25, 0.12, 0.08)
+MAX_LEAD_DAYS = 60
+CANCELLED_SHARE = 0.08
+
+# Rows per executemany transaction
+BATCH_SIZE = 20000
+
+def zipf_weights(count, exponent=1.0):
+    """Popularity weights where the k-th item is k**exponent times rarer than the first"""
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+def make_cities(count):
+    """City names, most popular first"""
+    names = list(CITY_NAMES[:count])
+    names.extend(f"City {number}" for number in range(len(names) + 1, count + 1))
+    return names
+
+def departure_minute(rng):
+    """Draw a departure time, rounded to five minutes, from the daily peaks"""
+    weight = rng.random()
+    for share, hour, spread in DEPARTURE_PEAKS:
+        weight -= share
+        if weight <= 0:
+            break
+    minute = int(rng.gauss(hour, spread) * 60) % (24 * 60)
+    return minute - minute % 5
+
+def generate_trips(rng, cities, count, days):
+    """Yield trip rows in import_trips column order
+    
+    Routes are drawn from a Zipf popularity over cities, so a few city pairs
+    carry most of the traffic; modes, departure peaks, durations and prices
+    follow MODE_PROFILES and DEPARTURE_PEAKS.
+    """
+    weights = list(itertools.accumulate(zipf_weights(len(cities))))
+    modes = list(MODE_PROFILES)
+    mode_weights = list(itertools.accumulate(MODE_PROFILES[mode][0] for mode in modes))
+    
+    for _ in range(count):
+        source, destination = rng.choices(cities, cum_weights=weights, k=2)
+        while destination == source:
+            destination = rng.choices(cities, cum_weights=weights)[0]
+        mode = rng.choices(modes, cum_weights=mode_weights)[0]
+        share, capacity, hourly_price, (shortest, longest) = MODE_PROFILES[mode]
+        
+        day = START_DATE + timedelta(days=rng.randrange(days))
+        departure = departure_minute(rng)
+        duration = rng.randrange(shortest, longest + 1, 5)
+        arrival = (departure + duration) % (24 * 60)
+        price = round(hourly_price * duration / 60 * rng.uniform(0.7, 1.4), 2)
+        
+        yield (source, destination, day.isoformat(), price, mode, f"{duration // 60}h {duration % 60}m",
+               f"{departure // 60:02d}:{departure % 60:02d}", f"{arrival // 60:02d}:{arrival % 60:02d}", capacity)
+
+def insert_trips(db, rows):
+    """Bulk-insert trip rows; services repeated by chance are skipped. Returns rows inserted"""
+    def insert(cursor, batch):
+        cursor.executemany('''
+            INSERT OR IGNORE INTO trips (source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+        return cursor.rowcount
+    
+    inserted = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return inserted
+        inserted += db.run_write(lambda cursor: insert(cursor, batch))
+
+def insert_users(db, count, password="password"):
+    """Add users user1@example.com ... sharing one password. Returns their user IDs"""
+    hashed = db.hash_password(password)
+    
+    def insert(cursor):
+        first = cursor.execute("SELECT COALESCE(MAX(user_id), 0) + 1 FROM users").fetchone()[0]
+        cursor.executemany('''
+            INSERT OR IGNORE INTO users (name, email, password)
+            VALUES (?, ?, ?)
+        ''', ((f"User {number}", f"user{number}@example.com", hashed) for number in range(first, first + count)))
+        return [row[0] for row in cursor.execute(
+            "SELECT user_id FROM users WHERE email LIKE 'user%@example.com' ORDER BY user_id")]
+    
+    return db.run_write(insert)
+
+def generate_bookings(rng, trips, user_ids, count):
+    """Yield (user_id, trip_id, passengers, total_amount, booking_date, status) rows
+    
+    trips is a list of [trip_id, date, price, seats left] entries, which is
+    updated as confirmed bookings take seats. Busy users book far more often
+    than the rest, popular trips (those on the busiest routes, listed first)
+    fill up first, and most bookings are made in the last days before travel.
+    """
+    user_weights = list(itertools.accumulate(zipf_weights(len(user_ids), 0.8)))
+    trip_weights = list(itertools.accumulate(zipf_weights(len(trips), 0.6)))
+    users = user_ids[:]
+    rng.shuffle(users)
+    
+    for _ in range(count):
+        passengers = rng.choices(range(1, len(PASSENGER_WEIGHTS) + 1), weights=PASSENGER_WEIGHTS)[0]
+        # A sold-out trip sends the traveller to another one
+        for attempt in range(10):
+            trip = rng.choices(trips, cum_weights=trip_weights)[0]
+            if trip[3] >= passengers:
+                break
+        else:
+            continue
+        
+        status = 'cancelled' if rng.random() < CANCELLED_SHARE else 'confirmed'
+        if status == 'confirmed':
+            trip[3] -= passengers
+        lead = min(int(rng.expovariate(1 / 10)), MAX_LEAD_DAYS)
+        booked = datetime.fromisoformat(trip[1]) - timedelta(days=lead, seconds=rng.randrange(86400))
+        yield (rng.choices(users, cum_weights=user_weights)[0], trip[0], passengers, trip[2] * passengers,
+               booked.strftime('%Y-%m-%d %H:%M:%S'), status)
+
+def insert_bookings(db, rng, user_ids, count):
+    """Add bookings over the existing trips and take their seats. Returns bookings inserted"""
+    with db.get_connection() as conn:
+        # Busiest routes first, so they get the highest booking weights
+        trips = [list(row) for row in conn.execute('''
+            SELECT t.trip_id, t.date, t.price, t.available_seats
+            FROM trips t
+            JOIN (SELECT source, destination, COUNT(*) AS trips FROM trips GROUP BY source, destination) r
+              ON r.source = t.source AND r.destination = t.destination
+            WHERE t.available_seats > 0
+            ORDER BY r.trips DESC, t.trip_id
+        ''')]
+    if not trips or not user_ids:
+        return 0
+    capacity = {trip[0]: trip[3] for trip in trips}
+    
+    def insert(cursor, batch):
+        cursor.executemany('''
+            INSERT INTO bookings (user_id, trip_id, passengers, total_amount, booking_date, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', batch)
+    
+    inserted = 0
+    rows = generate_bookings(rng, trips, user_ids, count)
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        db.run_write(lambda cursor: insert(cursor, batch))
+        inserted += len(batch)
+    
+    # Take the seats in one pass rather than one UPDATE per booking
+    taken = [(capacity[trip[0]] - trip[3], trip[0]) for trip in trips if trip[3] != capacity[trip[0]]]
+    for start in range(0, len(taken), BATCH_SIZE):
+        db.run_write(lambda cursor: cursor.executemany(
+            "UPDATE trips SET available_seats = available_seats - ? WHERE trip_id = ?",
+            taken[start:start + BATCH_SIZE]))
+    return inserted
+
+def populate(db, trips, users, bookings, cities=60, days=180, seed=42):
+    """Fill a database with seeded synthetic data
+    
+    The same arguments always produce the same rows, so timings taken on
+    different machines or commits are comparable. Returns a summary dict of
+    the rows inserted.
+    """
+    rng = random.Random(seed)
+    city_names = make_cities(cities)
+    summary = {'trips': insert_trips(db, generate_trips(rng, city_names, trips, days))}
+    user_ids = insert_users(db, users)
+    summary['users'] = len(user_ids)
+    summary['bookings'] = insert_bookings(db, rng, user_ids, bookings)
+    db.invalidate()
+    return summary
+
+def main(argv=None):
+    """Generate a synthetic database file"""
+    parser = argparse.ArgumentParser(description="Fill a TravelBook database with synthetic data")
+    parser.add_argument('db', help="database file; created if missing")
+    parser.add_argument('--trips', type=int, default=100000, help="trips to generate (default: %(default)s)")
+    parser.add_argument('--users', type=int, help="users to generate (default: trips / 20)")
+    parser.add_argument('--bookings', type=int, help="bookings to generate (default: trips / 4)")
+    parser.add_argument('--cities', type=int, default=60, help="number of cities (default: %(default)s)")
+    parser.add_argument('--days', type=int, default=180, help="travel days covered (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed (default: %(default)s)")
+    args = parser.parse_args(argv)
+    
+    db = DatabaseManager(args.db, storage="desktop")
+    try:
+        summary = populate(db, args.trips, args.users if args.users is not None else max(args.trips // 20, 1),
+                           args.bookings if args.bookings is not None else args.trips // 4,
+                           cities=args.cities, days=args.days, seed=args.seed)
+    finally:
+        db.close()
+    print(f"Inserted {summary['trips']} trips, {summary['users']} users and {summary['bookings']} bookings")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,302 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from db import DatabaseManager, is_busy_error
+from benchmarks.generator import populate
+from benchmarks.runner import environment, summarize
+
+# Pool statistics summed over every worker's DatabaseManager
+LOCK_STATS = ('write_transactions', 'lock_wait_time', 'max_lock_wait', 'lock_timeouts', 'waits', 'wait_time')
+
+def snapshot_capacity(db):
+    """Each trip's capacity: seats still free plus seats held by confirmed bookings"""
+    with db.get_connection() as conn:
+        return dict(conn.execute('''
+            SELECT t.trip_id, t.available_seats + COALESCE(SUM(b.passengers), 0)
+            FROM trips t
+            LEFT JOIN bookings b ON b.trip_id = t.trip_id AND b.status = 'confirmed'
+            GROUP BY t.trip_id
+        '''))
+
+def check_inventory(db, capacity):
+    """Compare every trip against its capacity snapshot
+    
+    Returns (trip_id, capacity, available_seats, confirmed passengers)
+    for each trip whose seats and confirmed bookings no longer add up to
+    its capacity, or whose available seats went negative.
+    """
+    violations = []
+    with db.get_connection() as conn:
+        rows = conn.execute('''
+            SELECT t.trip_id, t.available_seats, COALESCE(SUM(b.passengers), 0)
+            FROM trips t
+            LEFT JOIN bookings b ON b.trip_id = t.trip_id AND b.status = 'confirmed'
+            GROUP BY t.trip_id
+        ''')
+        for trip_id, available, booked in rows:
+            expected = capacity.get(trip_id)
+            if available < 0 or (expected is not None and available + booked != expected):
+                violations.append((trip_id, expected, available, booked))
+    return violations
+
+def free_seats(db, trip_ids):
+    """Available seats of the given trips"""
+    return {trip[0]: trip[9] for trip in db.get_trips(trip_ids)}
+
+def prepare_users(db, count):
+    """Give every worker its own user, so it can find and cancel its own bookings"""
+    user_ids = []
+    for worker in range(count):
+        email = f"loadtest{worker}@example.com"
+        db.register_user(f"Load Test {worker}", email, "password")
+        with db.get_connection() as conn:
+            user_ids.append(conn.execute("SELECT user_id FROM users WHERE email = ?", (email,)).fetchone()[0])
+    return user_ids
+
+def pick_trips(db, count, seed):
+    """Seeded sample of trips with free seats, so workers compete for the same inventory"""
+    with db.get_connection() as conn:
+        trip_ids = [row[0] for row in conn.execute(
+            "SELECT trip_id FROM trips WHERE available_seats > 0 ORDER BY trip_id")]
+    return sorted(random.Random(seed).sample(trip_ids, min(count, len(trip_ids))))
+
+def run_worker(db, worker, user_id, trip_ids, config):
+    """Book and cancel until the deadline or operation count is reached
+    
+    Returns latencies per operation, outcome counts and the seats this
+    worker's successful calls took (positive) or returned (negative) per trip.
+    """
+    rng = random.Random(f"{config['seed']}:{worker}")
+    latencies = {'book_trip': [], 'cancel_booking': []}
+    outcomes = Counter()
+    seats = Counter()
+    held = []
+    
+    def record(operation, message, started):
+        latencies[operation].append(time.perf_counter() - started)
+        if is_busy_error(message):
+            outcomes[f'{operation}_locked'] += 1
+        elif "failed" in message.lower():
+            outcomes[f'{operation}_errors'] += 1
+    
+    operations = 0
+    while time.monotonic() < config['deadline'] and operations < config['operations']:
+        operations += 1
+        if held and rng.random() < config['cancel_ratio']:
+            booking_id, trip_id, passengers = held.pop(rng.randrange(len(held)))
+            started = time.perf_counter()
+            success, message = db.cancel_booking(booking_id, user_id)
+            record('cancel_booking', message, started)
+            if success:
+                outcomes['cancelled'] += 1
+                seats[trip_id] -= passengers
+            continue
+        
+        trip_id = rng.choice(trip_ids)
+        passengers = rng.randint(1, config['max_passengers'])
+        started = time.perf_counter()
+        success, message = db.book_trip(user_id, trip_id, passengers)
+        record('book_trip', message, started)
+        if success:
+            outcomes['booked'] += 1
+            seats[trip_id] += passengers
+            # Only this worker books for user_id, so its newest booking is the one just made
+            with db.get_connection() as conn:
+                booking_id = conn.execute("SELECT MAX(booking_id) FROM bookings WHERE user_id = ?",
+                                          (user_id,)).fetchone()[0]
+            held.append((booking_id, trip_id, passengers))
+        elif message == "Not enough seats available":
+            outcomes['sold_out'] += 1
+    
+    return {'latencies': latencies, 'outcomes': dict(outcomes), 'seats': dict(seats)}
+
+def run_process_worker(path, storage, worker, user_id, trip_ids, config):
+    """Worker process: its own DatabaseManager, like a separate application instance"""
+    db = DatabaseManager(path, pool_size=1, storage=storage)
+    try:
+        result = run_worker(db, worker, user_id, trip_ids, config)
+        result['pool'] = db.pool_stats()
+        return result
+    finally:
+        db.close()
+
+def run_load_test(path, args, on_progress=None):
+    """Run the workers against path and return the report dict"""
+    db = DatabaseManager(path, pool_size=args.workers + 1, storage=args.storage)
+    try:
+        user_ids = prepare_users(db, args.workers)
+        trip_ids = pick_trips(db, args.hot_trips, args.seed)
+        capacity = snapshot_capacity(db)
+        seats_before = free_seats(db, trip_ids)
+        
+        config = {
+            'seed': args.seed,
+            'operations': args.operations,
+            'cancel_ratio': args.cancel_ratio,
+            'max_passengers': args.max_passengers,
+            'deadline': time.monotonic() + args.duration,
+        }
+        if on_progress:
+            on_progress(f"{args.workers} worker {args.mode} on {len(trip_ids)} trips for up to {args.duration}s")
+        
+        pool_before = db.pool_stats()
+        started = time.perf_counter()
+        if args.mode == 'threads':
+            # Threads share one DatabaseManager and its pool, like one busy application
+            with ThreadPoolExecutor(args.workers) as executor:
+                futures = [executor.submit(run_worker, db, worker, user_ids[worker], trip_ids, config)
+                           for worker in range(args.workers)]
+                results = [future.result() for future in futures]
+            pool = db.pool_stats()
+            # Leave out what setup did on the shared pool
+            for key in LOCK_STATS:
+                if not key.startswith('max_'):
+                    pool[key] -= pool_before[key]
+        else:
+            with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                # The deadline is a monotonic time, which spawned processes on this host share
+                futures = [executor.submit(run_process_worker, path, args.storage, worker, user_ids[worker],
+                                           trip_ids, config) for worker in range(args.workers)]
+                results = [future.result() for future in futures]
+            pool = Counter()
+            for result in results:
+                for key in LOCK_STATS:
+                    if key.startswith('max_'):
+                        pool[key] = max(pool[key], result['pool'][key])
+                    else:
+                        pool[key] += result['pool'][key]
+        elapsed = time.perf_counter() - started
+        
+        violations = check_inventory(db, capacity)
+        # Second opinion: seats moved on the hot trips must match what the workers were told
+        moved = Counter()
+        for result in results:
+            moved.update(result['seats'])
+        seats_after = free_seats(db, trip_ids)
+        mismatches = [(trip_id, seats_before[trip_id], seats_after[trip_id], moved[trip_id]) for trip_id in trip_ids
+                      if seats_before[trip_id] - seats_after[trip_id] != moved[trip_id]]
+        sold_out = sum(1 for available in seats_after.values() if available == 0)
+    finally:
+        db.close()
+    
+    outcomes = Counter()
+    operations = {}
+    for result in results:
+        outcomes.update(result['outcomes'])
+    for name in ('book_trip', 'cancel_booking'):
+        timings = [latency for result in results for latency in result['latencies'][name]]
+        operations[name] = summarize(timings, outcomes[f'{name}_locked'] + outcomes[f'{name}_errors'], elapsed)
+    calls = sum(operation['calls'] for operation in operations.values())
+    
+    return {
+        'created': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'environment': environment(),
+        'config': {
+            'mode': args.mode,
+            'workers': args.workers,
+            'duration': args.duration,
+            'operations': args.operations,
+            'hot_trips': len(trip_ids),
+            'cancel_ratio': args.cancel_ratio,
+            'max_passengers': args.max_passengers,
+            'storage': args.storage,
+            'seed': args.seed,
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput': {
+            'calls_per_sec': round(calls / elapsed, 2) if elapsed > 0 else None,
+            'bookings_per_sec': round(outcomes['booked'] / elapsed, 2) if elapsed > 0 else None,
+        },
+        'outcomes': dict(outcomes),
+        'operations': operations,
+        'locks': {key: round(value, 4) if isinstance(value, float) else value
+                  for key, value in pool.items() if key in LOCK_STATS},
+        'inventory': {
+            'trips_checked': len(capacity),
+            'hot_trips_sold_out': sold_out,
+            'violations': [dict(zip(('trip_id', 'capacity', 'available_seats', 'confirmed_passengers'), row))
+                           for row in violations[:50]],
+            'violation_count': len(violations),
+            'mismatches': [dict(zip(('trip_id', 'seats_before', 'seats_after', 'seats_booked'), row))
+                           for row in mismatches[:50]],
+            'ok': not violations and not mismatches,
+        },
+    }
+
+def print_summary(report):
+    """Print the headline numbers of a load test report"""
+    outcomes = report['outcomes']
+    locks = report['locks']
+    inventory = report['inventory']
+    print(f"{report['config']['workers']} worker {report['config']['mode']}, {report['elapsed_seconds']}s: "
+          f"{report['throughput']['calls_per_sec']} calls/s, {report['throughput']['bookings_per_sec']} bookings/s")
+    print(f"  booked {outcomes.get('booked', 0)}, sold out {outcomes.get('sold_out', 0)}, "
+          f"cancelled {outcomes.get('cancelled', 0)}")
+    for name, result in report['operations'].items():
+        print(f"  {name:<16} p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+              f"{outcomes.get(name + '_locked', 0)} locked, {outcomes.get(name + '_errors', 0)} other errors")
+    print(f"  lock waits: {locks.get('lock_wait_time', 0)}s over {locks.get('write_transactions', 0)} write "
+          f"transactions (max {locks.get('max_lock_wait', 0)}s), {locks.get('lock_timeouts', 0)} timed out")
+    if inventory['ok']:
+        print(f"  inventory OK: {inventory['trips_checked']} trips checked, "
+              f"{inventory['hot_trips_sold_out']} contended trips sold out")
+    else:
+        print(f"  INVENTORY BROKEN: {inventory['violation_count']} trips do not add up, "
+              f"{len(inventory['mismatches'])} disagree with the workers")
+
+def main(argv=None):
+    """Run the booking load test from the command line"""
+    parser = argparse.ArgumentParser(description="Concurrent book/cancel load test with an oversell check")
+    parser.add_argument('--db', help="existing database to load (default: a generated one in a temp directory)")
+    parser.add_argument('--generate', type=int, default=10000,
+                        help="trips to generate when --db is not given (default: %(default)s)")
+    parser.add_argument('--mode', choices=('threads', 'processes'), default='threads',
+                        help="threads share one DatabaseManager; processes each open their own (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent workers (default: %(default)s)")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds to run (default: %(default)s)")
+    parser.add_argument('--operations', type=int, default=10 ** 9, help="calls per worker at most")
+    parser.add_argument('--hot-trips', type=int, default=20,
+                        help="trips the workers compete for (default: %(default)s)")
+    parser.add_argument('--cancel-ratio', type=float, default=0.3,
+                        help="share of calls that cancel one of the worker's bookings (default: %(default)s)")
+    parser.add_argument('--max-passengers', type=int, default=4, help="passengers per booking, at most (default: %(default)s)")
+    parser.add_argument('--storage', default="multiprocess", help="storage profile (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed (default: %(default)s)")
+    parser.add_argument('--output', '-o', help="also write the JSON report here")
+    args = parser.parse_args(argv)
+    
+    workdir = None
+    path = args.db
+    if path is None:
+        workdir = tempfile.mkdtemp(prefix="travelbook-load-")
+        path = os.path.join(workdir, "load.db")
+        db = DatabaseManager(path, storage=args.storage)
+        try:
+            populate(db, args.generate, max(args.generate // 20, 1), args.generate // 4, seed=args.seed)
+        finally:
+            db.close()
+    
+    try:
+        report = run_load_test(path, args, on_progress=lambda message: print(message, file=sys.stderr, flush=True))
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    print_summary(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0 if report['inventory']['ok'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,349 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import schema
+from db import DatabaseManager
+from benchmarks.generator import START_DATE, populate
+
+# Report layout version; bump when fields change meaning
+REPORT_VERSION = 1
+
+PERCENTILES = (50, 95, 99)
+
+class Workload:
+    """Seeded arguments for the timed calls, drawn from the generated data
+    
+    Routes and users are picked with the same skew the data was generated
+    with, so lookups mostly hit the busy routes and heavy users.
+    """
+    def __init__(self, db, days, seed):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.days = days
+        with db.get_connection() as conn:
+            self.routes = conn.execute('''
+                SELECT source, destination FROM trips
+                GROUP BY source, destination
+                ORDER BY COUNT(*) DESC, source, destination
+            ''').fetchall()
+            self.users = [row[0] for row in conn.execute('''
+                SELECT user_id FROM bookings
+                GROUP BY user_id
+                ORDER BY COUNT(*) DESC, user_id
+            ''')]
+            self.trip_ids = [row[0] for row in conn.execute(
+                "SELECT trip_id FROM trips WHERE available_seats >= 4 ORDER BY trip_id")]
+            self.bookings = conn.execute(
+                "SELECT booking_id, user_id FROM bookings WHERE status = 'confirmed' ORDER BY booking_id").fetchall()
+        self.rng.shuffle(self.bookings)
+    
+    def reseed(self, name):
+        """Restart the random draws for one operation, so its arguments do not depend on the others run"""
+        self.rng = random.Random(f"{self.seed}:{name}")
+    
+    def skewed(self, items):
+        """Pick an item, the first ones far more often than the rest"""
+        return items[min(int(self.rng.paretovariate(1.2)) - 1, len(items) - 1)]
+    
+    def route(self):
+        return self.skewed(self.routes)
+    
+    def date(self):
+        return (START_DATE + timedelta(days=self.rng.randrange(self.days))).isoformat()
+    
+    def user(self):
+        return self.skewed(self.users)
+    
+    def trip(self):
+        return self.rng.choice(self.trip_ids)
+    
+    def booking(self):
+        """A confirmed booking not cancelled yet by this run"""
+        return self.bookings.pop()
+
+def search_route(db, workload):
+    source, destination = workload.route()
+    return db.search_trips(source, destination, workload.date())
+
+def search_city_prefix(db, workload):
+    source, destination = workload.route()
+    return db.search_trips(source[:3], date=workload.date())
+
+def search_filtered(db, workload):
+    source, destination = workload.route()
+    date = workload.date()
+    return db.search_trips(source, destination, sort="price", date_from=date,
+                           date_to=(datetime.fromisoformat(date) + timedelta(days=7)).date().isoformat(),
+                           departure_from=6 * 60, departure_to=12 * 60, max_price=5000)
+
+def search_page(db, workload):
+    return db.search_trips_page(date=workload.date(), page_size=100)[0]
+
+def count_route(db, workload):
+    source, destination = workload.route()
+    return db.count_trips(source, destination)
+
+def fare_calendar(db, workload):
+    source, destination = workload.route()
+    return db.get_fare_calendar(source, destination, workload.date())
+
+def find_connections(db, workload):
+    source, destination = workload.route()
+    return db.find_connections(source, destination, workload.date())
+
+def get_trip(db, workload):
+    return db.get_trip(workload.trip())
+
+def user_bookings(db, workload):
+    return db.get_user_bookings(workload.user())
+
+def user_bookings_page(db, workload):
+    return db.get_user_bookings_page(workload.user())[0]
+
+def user_statistics(db, workload):
+    return db.get_user_booking_statistics(workload.user())
+
+def all_bookings(db, workload):
+    return db.get_all_bookings()
+
+def all_bookings_page(db, workload):
+    return db.get_all_bookings_page()[0]
+
+def booking_statistics(db, workload):
+    return db.get_booking_statistics()
+
+def rollup_report(db, workload):
+    return db.get_rollup_report(group_by="route")
+
+def book_trip(db, workload):
+    success, message = db.book_trip(workload.user(), workload.trip())
+    if not success:
+        raise RuntimeError(message)
+
+def cancel_booking(db, workload):
+    success, message = db.cancel_booking(*workload.booking())
+    if not success:
+        raise RuntimeError(message)
+
+# Timed operations in run order: name -> (function, share of --iterations).
+# Whole-table reads get fewer calls; writes run last so every read sees the generated data.
+OPERATIONS = {
+    'search_trips': (search_route, 1.0),
+    'search_trips_prefix': (search_city_prefix, 1.0),
+    'search_trips_filtered': (search_filtered, 1.0),
+    'search_trips_page': (search_page, 1.0),
+    'count_trips': (count_route, 1.0),
+    'get_fare_calendar': (fare_calendar, 1.0),
+    'find_connections': (find_connections, 0.5),
+    'get_trip': (get_trip, 1.0),
+    'get_user_bookings': (user_bookings, 1.0),
+    'get_user_bookings_page': (user_bookings_page, 1.0),
+    'get_user_booking_statistics': (user_statistics, 1.0),
+    'get_all_bookings': (all_bookings, 0.05),
+    'get_all_bookings_page': (all_bookings_page, 1.0),
+    'get_booking_statistics': (booking_statistics, 0.1),
+    'get_rollup_report': (rollup_report, 0.2),
+    'book_trip': (book_trip, 1.0),
+    'cancel_booking': (cancel_booking, 1.0),
+}
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)]
+
+def summarize(timings, errors, elapsed):
+    """Latency percentiles (milliseconds) and throughput for one operation"""
+    timings = sorted(timings)
+    result = {
+        'calls': len(timings),
+        'errors': errors,
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 4) if timings else None,
+        'max_ms': round(timings[-1] * 1000, 4) if timings else None,
+        'ops_per_sec': round(len(timings) / elapsed, 2) if elapsed > 0 else None,
+    }
+    for percent in PERCENTILES:
+        value = percentile(timings, percent)
+        result[f'p{percent}_ms'] = round(value * 1000, 4) if value is not None else None
+    return result
+
+def time_operation(db, workload, function, calls, warmup):
+    """Call function(db, workload) warmup + calls times, timing the last calls"""
+    for _ in range(warmup):
+        try:
+            function(db, workload)
+        except Exception:
+            pass
+    
+    timings = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(calls):
+        start = time.perf_counter()
+        try:
+            function(db, workload)
+        except Exception:
+            errors += 1
+            continue
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, errors, time.perf_counter() - started)
+
+def run_size(path, trips, args, on_progress=None):
+    """Generate one database and time every selected operation against it"""
+    db = DatabaseManager(path, storage=args.storage)
+    try:
+        started = time.perf_counter()
+        generated = populate(db, trips, max(trips // 20, 1), trips // 4,
+                             cities=args.cities, days=args.days, seed=args.seed)
+        generate_seconds = time.perf_counter() - started
+        db.checkpoint("TRUNCATE")
+        
+        workload = Workload(db, args.days, args.seed)
+        operations = {}
+        for name, (function, share) in OPERATIONS.items():
+            if args.operations and name not in args.operations:
+                continue
+            if on_progress:
+                on_progress(f"{trips} trips: {name}")
+            calls = max(int(args.iterations * share), 3)
+            workload.reseed(name)
+            operations[name] = time_operation(db, workload, function, calls, min(args.warmup, calls))
+    finally:
+        db.close()
+    
+    return {
+        'trips': trips,
+        'generated': generated,
+        'generate_seconds': round(generate_seconds, 2),
+        'database_bytes': os.path.getsize(path),
+        'operations': operations,
+    }
+
+def environment():
+    """Where the numbers were taken, for telling comparable reports apart"""
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'schema_version': schema.LATEST_VERSION,
+    }
+
+def run_benchmarks(args, on_progress=None):
+    """Run every size in args.sizes and return the report dict"""
+    workdir = args.keep or tempfile.mkdtemp(prefix="travelbook-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    runs = []
+    try:
+        for trips in args.sizes:
+            path = os.path.join(workdir, f"bench_{trips}.db")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            runs.append(run_size(path, trips, args, on_progress))
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    return {
+        'version': REPORT_VERSION,
+        'created': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'environment': environment(),
+        'config': {
+            'seed': args.seed,
+            'sizes': args.sizes,
+            'cities': args.cities,
+            'days': args.days,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'storage': args.storage,
+        },
+        'runs': runs,
+    }
+
+def compare(report, baseline, metric='p95_ms', threshold=1.2):
+    """List (trips, operation, baseline, current, ratio) where metric grew past threshold
+    
+    Only sizes and operations present in both reports are compared.
+    """
+    previous = {run['trips']: run['operations'] for run in baseline['runs']}
+    regressions = []
+    for run in report['runs']:
+        for name, result in run['operations'].items():
+            before = previous.get(run['trips'], {}).get(name, {}).get(metric)
+            after = result.get(metric)
+            if not before or after is None:
+                continue
+            if after / before > threshold:
+                regressions.append((run['trips'], name, before, after, round(after / before, 2)))
+    return regressions
+
+def print_summary(report):
+    """Print one table per size"""
+    for run in report['runs']:
+        generated = run['generated']
+        print(f"\n{run['trips']} trips requested: {generated['trips']} trips, {generated['users']} users, "
+              f"{generated['bookings']} bookings (generated in {run['generate_seconds']}s)")
+        print(f"  {'operation':<30}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>11}")
+        for name, result in run['operations'].items():
+            cells = [result[key] if result[key] is not None else '-'
+                     for key in ('p50_ms', 'p95_ms', 'p99_ms', 'ops_per_sec')]
+            errors = f"  ({result['errors']} errors)" if result['errors'] else ""
+            print(f"  {name:<30}{result['calls']:>7}{cells[0]:>10}{cells[1]:>10}{cells[2]:>10}{cells[3]:>11}{errors}")
+
+def main(argv=None):
+    """Run the benchmark suite from the command line"""
+    parser = argparse.ArgumentParser(description="Time DatabaseManager operations on synthetic data")
+    parser.add_argument('--sizes', default="10000,100000",
+                        type=lambda text: [int(size) for size in text.split(',')],
+                        help="comma-separated trip counts; each gets trips/20 users and trips/4 bookings "
+                             "(default: %(default)s)")
+    parser.add_argument('--iterations', type=int, default=200, help="timed calls per operation (default: %(default)s)")
+    parser.add_argument('--warmup', type=int, default=5, help="untimed calls first (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed (default: %(default)s)")
+    parser.add_argument('--cities', type=int, default=60, help="number of cities (default: %(default)s)")
+    parser.add_argument('--days', type=int, default=180, help="travel days covered (default: %(default)s)")
+    parser.add_argument('--storage', default="multiprocess", help="storage profile (default: %(default)s)")
+    parser.add_argument('--operation', dest='operations', action='append', choices=list(OPERATIONS),
+                        help="only time this operation (repeatable)")
+    parser.add_argument('--keep', metavar='DIR', help="keep the generated databases in DIR")
+    parser.add_argument('--output', '-o', help="write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="earlier JSON report to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="p95 ratio over the baseline reported as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+    
+    progress = lambda message: print(message, file=sys.stderr, flush=True)
+    report = run_benchmarks(args, on_progress=progress)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print_summary(report)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), threshold=args.threshold)
+        for trips, name, before, after, ratio in regressions:
+            print(f"REGRESSION {trips} trips {name}: p95 {before} ms -> {after} ms ({ratio}x)", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -1,13 +1,18 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime
-from db import DatabaseManager
+from tkinter import ttk
+import dialogs
+from db import get_database_manager, format_clock, format_duration, format_timestamp
+from virtual_list import VirtualTreeview
+from data_service import DataService
+from ui_monitor import timed_handler
 
 class BookingWindow:
-    def __init__(self, parent_frame, user_data):
+    def __init__(self, parent_frame, user_data, data_service=None, on_cancel_booking=None):
         self.parent_frame = parent_frame
         self.user_data = user_data
-        self.db = DatabaseManager()
+        self.on_cancel_booking = on_cancel_booking
+        self.db = get_database_manager()
+        self.data_service = data_service or DataService(parent_frame)
         
         # Create booking interface
         self.create_widgets()
@@ -31,9 +36,8 @@ class BookingWindow:
         bookings_frame = ttk.LabelFrame(self.parent_frame, text="Booking History", padding="15")
         bookings_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Create treeview for bookings
+        # Create virtual treeview for bookings; only the visible rows become Treeview items
         columns = ('Booking ID', 'Route', 'Date', 'Mode', 'Time', 'Duration', 'Passengers', 'Amount', 'Status', 'Booked On')
-        self.bookings_tree = ttk.Treeview(bookings_frame, columns=columns, show='headings', height=15)
         
         # Define column headings and widths
         column_widths = {
@@ -49,22 +53,12 @@ class BookingWindow:
             'Booked On': 120
         }
         
-        for col in columns:
-            self.bookings_tree.heading(col, text=col)
-            self.bookings_tree.column(col, width=column_widths[col], minwidth=50)
+        # Color code by status
+        tag_colors = {'confirmed': '#dcfce7', 'cancelled': '#fecaca', 'pending': '#fef3c7'}
         
-        # Scrollbars
-        v_scrollbar = ttk.Scrollbar(bookings_frame, orient=tk.VERTICAL, command=self.bookings_tree.yview)
-        h_scrollbar = ttk.Scrollbar(bookings_frame, orient=tk.HORIZONTAL, command=self.bookings_tree.xview)
-        self.bookings_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-        
-        # Pack treeview and scrollbars
-        self.bookings_tree.grid(row=0, column=0, sticky='nsew')
-        v_scrollbar.grid(row=0, column=1, sticky='ns')
-        h_scrollbar.grid(row=1, column=0, sticky='ew')
-        
-        bookings_frame.grid_rowconfigure(0, weight=1)
-        bookings_frame.grid_columnconfigure(0, weight=1)
+        self.bookings_tree = VirtualTreeview(bookings_frame, columns, column_widths, self.format_booking,
+                                             height=15, tag_colors=tag_colors, minwidth=50,
+                                             data_service=self.data_service)
         
         # Action buttons
         action_frame = ttk.Frame(self.parent_frame)
@@ -86,79 +80,71 @@ class BookingWindow:
         # Bind double-click to view details
         self.bookings_tree.bind('<Double-1>', lambda e: self.view_booking_details())
     
+    @timed_handler("load bookings")
     def load_bookings(self):
         """Load user bookings"""
-        bookings = self.db.get_user_bookings(self.user_data['user_id'])
-        self.display_bookings(bookings)
-        self.update_statistics(bookings)
+        user_id = self.user_data['user_id']
+        self.bookings_tree.set_source(
+            lambda after, page_size: self.db.get_user_bookings_page(user_id, page_size=page_size, after=after))
+        self.update_statistics()
+    
+    def add_booking(self, booking):
+        """Add one new booking at the top instead of reloading the list"""
+        self.bookings_tree.insert_row(0, booking)
+        self.update_statistics()
     
     def display_bookings(self, bookings):
         """Display bookings in the treeview"""
-        # Clear existing items
-        for item in self.bookings_tree.get_children():
-            self.bookings_tree.delete(item)
+        self.bookings_tree.set_rows(bookings)
+    
+    def format_booking(self, booking):
+        """Format a booking row for display; returns (values, tags)"""
+        booking_id, passengers, total_amount, booking_epoch, status, source, destination, date, mode, departure_minute, arrival_minute, duration_minutes = booking
         
-        # Insert booking data
-        for booking in bookings:
-            booking_id, passengers, total_amount, booking_date, status, source, destination, date, mode, departure_time, arrival_time, duration = booking
-            
-            # Format data
-            route = f"{source} → {destination}"
-            time_range = f"{departure_time} - {arrival_time}"
-            amount_str = f"₹{total_amount:,.0f}"
-            
-            # Format booking date
-            booking_dt = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
-            booked_on = booking_dt.strftime('%Y-%m-%d %H:%M')
-            
-            # Color code by status
-            tags = ()
-            if status == 'confirmed':
-                tags = ('confirmed',)
-            elif status == 'cancelled':
-                tags = ('cancelled',)
-            elif status == 'pending':
-                tags = ('pending',)
-            
-            self.bookings_tree.insert('', tk.END, values=(
-                booking_id, route, date, mode.title(), time_range, 
-                duration, passengers, amount_str, status.title(), booked_on
-            ), tags=tags)
-        
-        # Configure tag colors
-        self.bookings_tree.tag_configure('confirmed', background='#dcfce7')
-        self.bookings_tree.tag_configure('cancelled', background='#fecaca')
-        self.bookings_tree.tag_configure('pending', background='#fef3c7')
+        # Format data
+        route = f"{source} → {destination}"
+        time_range = f"{format_clock(departure_minute)} - {format_clock(arrival_minute)}"
+        amount_str = f"₹{total_amount:,.0f}"
+        
+        booked_on = format_timestamp(booking_epoch)
+        
+        # Color code by status
+        tags = ()
+        if status in ('confirmed', 'cancelled', 'pending'):
+            tags = (status,)
+        
+        values = (
+            booking_id, route, date, mode.title(), time_range, 
+            format_duration(duration_minutes), passengers, amount_str, status.title(), booked_on
+        )
+        return values, tags
     
-    def update_statistics(self, bookings):
+    def update_statistics(self):
         """Update booking statistics"""
-        total_bookings = len(bookings)
-        confirmed_bookings = len([b for b in bookings if b[4] == 'confirmed'])
-        cancelled_bookings = len([b for b in bookings if b[4] == 'cancelled'])
-        total_spent = sum([b[2] for b in bookings if b[4] == 'confirmed'])
-        total_passengers = sum([b[1] for b in bookings if b[4] == 'confirmed'])
-        
+        self.data_service.submit(
+            self.db.get_user_booking_statistics, self.user_data['user_id'],
+            on_success=self.show_statistics, key="user-statistics", owner=self.parent_frame
+        )
+    
+    def show_statistics(self, stats):
+        """Display the aggregated booking statistics"""
         stats_text = (
-            f"Total Bookings: {total_bookings} | "
-            f"Confirmed: {confirmed_bookings} | "
-            f"Cancelled: {cancelled_bookings} | "
-            f"Total Spent: ₹{total_spent:,.0f} | "
-            f"Total Passengers: {total_passengers}"
+            f"Total Bookings: {stats['total_bookings']} | "
+            f"Confirmed: {stats['confirmed_bookings']} | "
+            f"Cancelled: {stats['cancelled_bookings']} | "
+            f"Total Spent: ₹{stats['total_spent']:,.0f} | "
+            f"Total Passengers: {stats['total_passengers']}"
         )
         
         self.stats_label.configure(text=stats_text)
     
     def view_booking_details(self):
         """View detailed booking information"""
-        selection = self.bookings_tree.selection()
-        if not selection:
-            messagebox.showwarning("No Selection", "Please select a booking to view details.")
+        booking_data = self.bookings_tree.selected_values()
+        if booking_data is None:
+            dialogs.showwarning("No Selection", "Please select a booking to view details.")
             return
         
-        # Get selected booking data
-        item = self.bookings_tree.item(selection[0])
-        booking_data = item['values']
-        
         # Create details window
         details_window = tk.Toplevel(self.parent_frame)
         details_window.title("Booking Details")
@@ -202,25 +188,24 @@ class BookingWindow:
         close_button = ttk.Button(details_frame, text="Close", command=details_window.destroy)
         close_button.pack(pady=(20, 0))
     
+    @timed_handler("cancel")
     def cancel_booking(self):
         """Cancel selected booking"""
-        selection = self.bookings_tree.selection()
-        if not selection:
-            messagebox.showwarning("No Selection", "Please select a booking to cancel.")
+        booking_data = self.bookings_tree.selected_values()
+        if booking_data is None:
+            dialogs.showwarning("No Selection", "Please select a booking to cancel.")
             return
         
         # Get selected booking data
-        item = self.bookings_tree.item(selection[0])
-        booking_data = item['values']
         booking_id = booking_data[0]
         status = booking_data[8].lower()
         
         if status != 'confirmed':
-            messagebox.showwarning("Cannot Cancel", "Only confirmed bookings can be cancelled.")
+            dialogs.showwarning("Cannot Cancel", "Only confirmed bookings can be cancelled.")
             return
         
         # Confirm cancellation
-        confirmation = messagebox.askyesno(
+        confirmation = dialogs.askyesno(
             "Confirm Cancellation",
             f"Are you sure you want to cancel booking #{booking_id}?\n\n"
             f"Route: {booking_data[1]}\n"
@@ -230,9 +215,35 @@ class BookingWindow:
         )
         
         if confirmation:
-            success, message = self.db.cancel_booking(booking_id, self.user_data['user_id'])
-            if success:
-                messagebox.showinfo("Success", "Booking cancelled successfully!")
-                self.load_bookings()  # Refresh the list
-            else:
-                messagebox.showerror("Cancellation Failed", message)
\ No newline at end of file
+            self.cancel_button.configure(state=tk.DISABLED)
+            self.data_service.submit(
+                self.cancel_and_fetch, booking_id,
+                on_success=self.on_cancel_result, on_error=self.on_cancel_error, owner=self.parent_frame
+            )
+    
+    def cancel_and_fetch(self, booking_id):
+        """Cancel a booking and fetch the rows the UI has to patch (runs on a worker thread)"""
+        success, message = self.db.cancel_booking(booking_id, self.user_data['user_id'])
+        if not success:
+            return False, message, None, None
+        return True, message, self.db.get_user_booking(booking_id), self.db.get_trip_for_booking(booking_id)
+    
+    def on_cancel_error(self, error):
+        """Handle a cancellation request that raised"""
+        self.cancel_button.configure(state=tk.NORMAL)
+        dialogs.showerror("Cancellation Failed", f"Failed to cancel booking: {str(error)}")
+    
+    def on_cancel_result(self, result):
+        """Handle the cancellation result"""
+        self.cancel_button.configure(state=tk.NORMAL)
+        success, message, booking, trip = result
+        if success:
+            # Patch the one booking row instead of reloading the list
+            if booking is not None:
+                self.bookings_tree.update_row(booking)
+                self.update_statistics()
+            if self.on_cancel_booking:
+                self.on_cancel_booking(trip)  # Callback to parent
+            dialogs.showinfo("Success", "Booking cancelled successfully!")
+        else:
+            dialogs.showerror("Cancellation Failed", message)
\ No newline at end of file
@@ -0,0 +1,67 @@
+import csv
+import json
+import os
+
+from db import format_clock, format_duration, format_timestamp
+
+# Column names written for each export, in query column order
+BOOKING_EXPORT_COLUMNS = (
+    'booking_id', 'user_name', 'email', 'passengers', 'total_amount', 'booking_date',
+    'status', 'source', 'destination', 'date', 'mode'
+)
+TRIP_EXPORT_COLUMNS = (
+    'trip_id', 'source', 'destination', 'date', 'price', 'mode', 'duration',
+    'departure_time', 'arrival_time', 'available_seats', 'created_at'
+)
+
+# Rows written between progress callbacks
+PROGRESS_INTERVAL = 10000
+
+def export_format(path):
+    """Pick the export format from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'ndjson'
+    raise ValueError(f"Unsupported export file type: {extension or path} (use .csv, .jsonl or .ndjson)")
+
+def write_rows(rows, columns, path, on_progress=None):
+    """Write rows to a CSV or newline-delimited JSON file as they arrive
+    
+    Only the row being written is held in memory. on_progress(count) runs
+    every PROGRESS_INTERVAL rows. Returns the number of rows written.
+    """
+    fmt = export_format(path)
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            write = writer.writerow
+        else:
+            write = lambda row: f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n')
+        
+        for row in rows:
+            write(row)
+            count += 1
+            if on_progress and count % PROGRESS_INTERVAL == 0:
+                on_progress(count)
+    
+    if on_progress:
+        on_progress(count)
+    return count
+
+def export_bookings(db, path, on_progress=None, **filters):
+    """Export bookings; filters are those of DatabaseManager.iter_all_bookings"""
+    # Booking times are stored as epoch seconds; files get the familiar text form
+    rows = (booking[:5] + (format_timestamp(booking[5], '%Y-%m-%d %H:%M:%S'),) + booking[6:]
+            for booking in db.iter_all_bookings(batch_size=1000, **filters))
+    return write_rows(rows, BOOKING_EXPORT_COLUMNS, path, on_progress)
+
+def export_trips(db, path, on_progress=None, **filters):
+    """Export trips; filters are those of DatabaseManager.iter_all_trips"""
+    # Times go out as text, so an exported file can be imported again
+    rows = (trip[:6] + (format_duration(trip[6]), format_clock(trip[7]), format_clock(trip[8])) + trip[9:]
+            for trip in db.iter_all_trips(batch_size=1000, **filters))
+    return write_rows(rows, TRIP_EXPORT_COLUMNS, path, on_progress)
\ No newline at end of file
@@ -0,0 +1,174 @@
+import queue
+import sys
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+import dialogs
+
+class DataRequest:
+    """Handle for a submitted query"""
+    def __init__(self, key, future, action=None):
+        self.key = key
+        self.future = future
+        self.cancelled = False
+        # UIAction the request is timed under, when the service has a monitor
+        self.action = action
+    
+    def cancel(self):
+        """Drop the result; also stops the query if it has not started yet"""
+        self.cancelled = True
+        self.future.cancel()
+
+class DataService:
+    """Runs database calls on worker threads and hands results back to Tk
+    
+    Workers never touch widgets. Finished calls are queued and picked up by
+    a root.after poll on the Tk thread, which then runs the callbacks.
+    Requests submitted with the same key supersede each other, so an older
+    search overtaken by a newer one is cancelled and its result dropped.
+    With a UIMonitor, each request's worker time and callback are timed as
+    part of the handler that submitted it.
+    """
+    def __init__(self, root, max_workers=4, poll_interval=25, monitor=None):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.monitor = monitor
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        
+        self._results = queue.Queue()
+        self._pending = set()
+        self._latest = {}
+        self._polling = False
+        self._busy_listeners = []
+        self._last_busy_count = 0
+    
+    def submit(self, func, *args, on_success=None, on_error=None, key=None, owner=None, **kwargs):
+        """Run func(*args, **kwargs) on a worker thread
+        
+        on_success(result) or on_error(exception) run on the Tk thread.
+        A newer request with the same key cancels this one. Callbacks are
+        skipped if the owner widget has been destroyed meanwhile.
+        """
+        if key is not None and key in self._latest:
+            self._latest[key].cancel()
+        
+        action = None
+        if self.monitor is not None:
+            action = self.monitor.request_started(key, func)
+            func = action.timed(func)
+        
+        future = self.executor.submit(func, *args, **kwargs)
+        request = DataRequest(key, future, action)
+        if key is not None:
+            self._latest[key] = request
+        
+        self._pending.add(request)
+        future.add_done_callback(
+            lambda f: self._results.put((request, on_success, on_error, owner)))
+        
+        self._notify_busy()
+        self._start_polling()
+        return request
+    
+    def post(self, callback, *args, owner=None):
+        """Run callback(*args) on the Tk thread, e.g. progress from a running request
+        
+        Safe to call from worker threads. Posts are delivered by the same poll
+        as results, so they are only picked up while a request is outstanding.
+        """
+        self._results.put((None, lambda: callback(*args), None, owner))
+    
+    def cancel(self, key):
+        """Cancel the outstanding request for a key, if any"""
+        request = self._latest.pop(key, None)
+        if request is not None:
+            request.cancel()
+    
+    def busy_count(self):
+        """Number of requests whose results have not been delivered yet"""
+        return len([request for request in self._pending if not request.cancelled])
+    
+    def add_busy_listener(self, callback):
+        """Call callback(busy_count) on the Tk thread whenever the count changes"""
+        self._busy_listeners.append(callback)
+    
+    def remove_busy_listener(self, callback):
+        """Stop notifying a busy listener"""
+        if callback in self._busy_listeners:
+            self._busy_listeners.remove(callback)
+    
+    def shutdown(self):
+        """Stop the workers; queued requests are dropped"""
+        for request in self._pending:
+            request.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _notify_busy(self):
+        """Tell listeners how many requests are outstanding, if that changed"""
+        count = self.busy_count()
+        if count == self._last_busy_count:
+            return
+        self._last_busy_count = count
+        for callback in list(self._busy_listeners):
+            try:
+                callback(count)
+            except tk.TclError:
+                # Listener's widgets were destroyed
+                self.remove_busy_listener(callback)
+    
+    def _start_polling(self):
+        """Poll for results only while requests are outstanding"""
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+    
+    def _poll(self):
+        """Deliver finished results on the Tk thread"""
+        while True:
+            try:
+                request, on_success, on_error, owner = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                self._pending.discard(request)
+                if self._latest.get(request.key) is request:
+                    del self._latest[request.key]
+            action = request.action if request is not None else None
+            try:
+                if self.monitor is not None and action is not None:
+                    with self.monitor.callback(action):
+                        self._deliver(request, on_success, on_error, owner)
+                else:
+                    self._deliver(request, on_success, on_error, owner)
+            except Exception:
+                # Report like any other Tk callback error without stopping the poll loop
+                self.root.report_callback_exception(*sys.exc_info())
+            finally:
+                if action is not None:
+                    self.monitor.request_finished(action)
+        
+        self._notify_busy()
+        
+        if self._pending:
+            self.root.after(self.poll_interval, self._poll)
+        else:
+            self._polling = False
+    
+    def _deliver(self, request, on_success, on_error, owner):
+        """Run the callback for one finished request, or one posted callback"""
+        if owner is not None and not owner.winfo_exists():
+            return
+        if request is None:
+            # Posted by a worker while its request runs
+            on_success()
+            return
+        if request.cancelled or request.future.cancelled():
+            return
+        
+        error = request.future.exception()
+        if error is None:
+            if on_success:
+                on_success(request.future.result())
+        elif on_error:
+            on_error(error)
+        else:
+            dialogs.showerror("Error", f"Database error: {str(error)}")
\ No newline at end of file
@@ -1,92 +1,379 @@
 import sqlite3
 import hashlib
+import math
+import re
 from datetime import datetime, date
 import os
+import random
+import threading
+import time
+import schema
+from pool import ConnectionPool
+from storage import get_storage_profile
+from routing import ConnectionIndex
+
+# Column list matching the tuples the UI unpacks for a trip row; times are
+# integer minutes, formatted for display with format_clock/format_duration
+TRIP_COLUMNS = (
+    "trip_id, source, destination, date, price, mode, duration_minutes, "
+    "departure_minute, arrival_minute, available_seats, created_at"
+)
+
+# Orderings offered by the trip searches: name -> (column, position in a trip row)
+# pairs. Each ends with trip_id so the order is total, as keyset paging needs.
+TRIP_SORTS = {
+    'departure': (('date', 3), ('departure_minute', 7), ('trip_id', 0)),
+    'price': (('price', 4), ('date', 3), ('departure_minute', 7), ('trip_id', 0)),
+    'duration': (('duration_minutes', 6), ('date', 3), ('departure_minute', 7), ('trip_id', 0)),
+}
+
+# Booking rows as shown in My Bookings
+USER_BOOKINGS_QUERY = '''
+    SELECT b.booking_id, b.passengers, b.total_amount, b.booking_epoch, b.status,
+           t.source, t.destination, t.date, t.mode, t.departure_minute, t.arrival_minute, t.duration_minutes
+    FROM bookings b
+    JOIN trips t ON b.trip_id = t.trip_id
+'''
+
+# Every booking with its user, newest first (admin only)
+ALL_BOOKINGS_QUERY = '''
+    SELECT b.booking_id, u.name, u.email, b.passengers, b.total_amount, 
+           b.booking_epoch, b.status, t.source, t.destination, t.date, t.mode
+    FROM bookings b
+    JOIN users u ON b.user_id = u.user_id
+    JOIN trips t ON b.trip_id = t.trip_id
+    WHERE 1 = 1
+'''
+
+# Travel modes allowed by the trips table
+TRIP_MODES = ('flight', 'train', 'bus')
+
+# add_trip's arguments, also the field names expected by import_trips
+TRIP_FIELDS = (
+    'source', 'destination', 'date', 'price', 'mode', 'duration',
+    'departure_time', 'arrival_time', 'available_seats'
+)
+
+DURATION_PATTERN = re.compile(r'^(?:(\d+)\s*h)?\s*(?:(\d+)\s*m?)?$', re.IGNORECASE)
+
+def parse_clock(value):
+    """Minutes after midnight for an HH:MM time; raises ValueError"""
+    match = re.match(r'^(\d{1,2}):(\d{2})$', str(value).strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError("Invalid time format. Use HH:MM")
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+def parse_duration(value):
+    """Minutes in a duration like '2h 15m', '3h' or '45m'; raises ValueError"""
+    match = DURATION_PATTERN.match(str(value).strip())
+    minutes = int(match.group(1) or 0) * 60 + int(match.group(2) or 0) if match else 0
+    if not minutes:
+        raise ValueError("Invalid duration. Use e.g. 2h 15m")
+    return minutes
+
+def format_clock(minute):
+    """Format minutes after midnight as HH:MM"""
+    return f"{minute // 60 % 24:02d}:{minute % 60:02d}"
+
+def format_duration(minutes):
+    """Format a number of minutes like '2h 15m'"""
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+def format_timestamp(epoch, fmt='%Y-%m-%d %H:%M'):
+    """Format a UTC epoch timestamp the way booking dates are shown"""
+    return time.strftime(fmt, time.gmtime(epoch))
+
+def validate_trip(source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats):
+    """Check and normalise the fields of a new trip
+    
+    Returns the values in add_trip's argument order; raises ValueError
+    describing the first problem found.
+    """
+    values = dict(zip(TRIP_FIELDS, (source, destination, date, price, mode, duration,
+                                    departure_time, arrival_time, available_seats)))
+    missing = [field for field, value in values.items() if value is None or str(value).strip() == '']
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    
+    source, destination, date, mode, duration, departure_time, arrival_time = (
+        str(values[field]).strip() for field in
+        ('source', 'destination', 'date', 'mode', 'duration', 'departure_time', 'arrival_time')
+    )
+    
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+    
+    try:
+        price = float(price)
+        available_seats = int(available_seats)
+    except (TypeError, ValueError):
+        raise ValueError("Price and seats must be numbers")
+    
+    if not math.isfinite(price) or price <= 0 or available_seats <= 0:
+        raise ValueError("Price and seats must be positive")
+    
+    # The text is stored as entered; the integer time columns are derived from it
+    parse_clock(departure_time)
+    parse_clock(arrival_time)
+    parse_duration(duration)
+    
+    mode = mode.lower()
+    if mode not in TRIP_MODES:
+        raise ValueError(f"Mode must be one of: {', '.join(TRIP_MODES)}")
+    
+    return source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats
+
+# Bit i of a schedule's days_of_week is set when it runs on WEEKDAYS[i]
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+# Column list matching the tuples returned for a schedule row
+SCHEDULE_COLUMNS = (
+    "schedule_id, source, destination, mode, price, duration, departure_time, "
+    "arrival_time, seats, days_of_week, valid_from, valid_to"
+)
+
+# Schedule columns copied onto each generated trip
+SCHEDULE_TRIP_FIELDS = ('source', 'destination', 'mode', 'price', 'duration', 'departure_time', 'arrival_time')
+
+def validate_schedule(source, destination, mode, price, duration, departure_time, arrival_time, seats,
+                      days_of_week, valid_from, valid_to):
+    """Check and normalise a schedule with the same rules as a single trip
+    
+    Returns the values in argument order; raises ValueError.
+    """
+    source, destination, valid_from, price, mode, duration, departure_time, arrival_time, seats = validate_trip(
+        source, destination, valid_from, price, mode, duration, departure_time, arrival_time, seats)
+    
+    try:
+        valid_to = str(valid_to).strip()
+        datetime.strptime(valid_to, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+    if valid_to < valid_from:
+        raise ValueError("Schedule must end on or after its first day")
+    
+    try:
+        days_of_week = int(days_of_week)
+    except (TypeError, ValueError):
+        raise ValueError("Days of week must be a number")
+    if not 1 <= days_of_week <= 127:
+        raise ValueError("Select at least one day of the week")
+    
+    return (source, destination, mode, price, duration, departure_time, arrival_time, seats,
+            days_of_week, valid_from, valid_to)
+
+_shared_managers = {}
+_shared_lock = threading.Lock()
+
+def get_database_manager(db_name="travel_booking.db", **options):
+    """Get the process-wide DatabaseManager for a database file
+    
+    options are passed to DatabaseManager and only take effect for the call
+    that creates the manager.
+    """
+    key = db_name if db_name == ":memory:" else os.path.abspath(db_name)
+    with _shared_lock:
+        if key not in _shared_managers:
+            _shared_managers[key] = DatabaseManager(db_name, **options)
+        return _shared_managers[key]
+
+class _BulkBookingFailed(Exception):
+    """Aborts a bulk booking transaction while carrying the per-leg results"""
+    def __init__(self, results):
+        super().__init__("Bulk booking failed")
+        self.results = results
+
+def is_busy_error(error):
+    """Check whether an OperationalError means another connection holds the lock"""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
 
 class DatabaseManager:
-    def __init__(self, db_name="travel_booking.db"):
+    def __init__(self, db_name="travel_booking.db", pool_size=5, pragmas=None,
+                 busy_timeout=None, write_retries=5, retry_backoff=0.05, query_cache=None, storage=None,
+                 monitor=None):
         self.db_name = db_name
+        # Storage profile (name or StorageProfile); explicit pragmas and busy_timeout override it
+        self.storage = get_storage_profile(storage)
+        connection_pragmas = self.storage.pragmas()
+        if pragmas:
+            connection_pragmas.update(pragmas)
+        if busy_timeout is None:
+            busy_timeout = self.storage.busy_timeout
+        
+        # Optional QueryMonitor; None leaves the methods and connections uninstrumented
+        self.monitor = monitor
+        self.pool = ConnectionPool(db_name, size=pool_size, pragmas=connection_pragmas, busy_timeout=busy_timeout,
+                                   factory=monitor.connection_factory if monitor else None,
+                                   on_connect=schema.register_functions)
+        self.write_retries = write_retries
+        self.retry_backoff = retry_backoff
+        # Optional QueryCache for trip searches; None disables caching
+        self.query_cache = query_cache
+        # Callbacks told which trips a committed write touched; see add_trip_listener
+        self._trip_listeners = []
+        # Bumped by every committed write; see data_version
+        self._data_version = 0
+        self._data_version_lock = threading.Lock()
+        self._connection_index = None
+        self._connection_index_lock = threading.Lock()
+        self.journal_mode = self._set_journal_mode()
         self.init_database()
+        if monitor is not None:
+            monitor.attach(self)
     
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_name)
+        """Check out a pooled database connection (use as a context manager)"""
+        return self.pool.connection()
     
-    def init_database(self):
-        """Initialize database with required tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def transaction(self, mode="DEFERRED"):
+        """Check out a pooled connection inside a transaction (use as a context manager)"""
+        return self.pool.transaction(mode)
+    
+    def run_write(self, work):
+        """Run work(cursor) in a BEGIN IMMEDIATE transaction, retrying with backoff while busy
         
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                is_admin BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        Taking the write lock up front means the reads inside work() see exactly
+        the rows they are about to change. Inside an outer transaction the work
+        joins it and is not retried on its own.
+        """
+        current = self.pool.current()
+        if current is not None and current.in_transaction:
+            return work(current.cursor())
         
-        # Create trips table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS trips (
-                trip_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source TEXT NOT NULL,
-                destination TEXT NOT NULL,
-                date DATE NOT NULL,
-                price REAL NOT NULL,
-                mode TEXT NOT NULL CHECK(mode IN ('flight', 'train', 'bus')),
-                duration TEXT NOT NULL,
-                departure_time TEXT NOT NULL,
-                arrival_time TEXT NOT NULL,
-                available_seats INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        delay = self.retry_backoff
+        for attempt in range(self.write_retries + 1):
+            try:
+                with self.transaction("IMMEDIATE") as conn:
+                    return work(conn.cursor())
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == self.write_retries:
+                    raise
+                # Exponential backoff with jitter so competing writers spread out
+                time.sleep(delay + random.uniform(0, delay))
+                delay *= 2
+    
+    def pool_stats(self):
+        """Get connection pool statistics"""
+        return self.pool.stats()
+    
+    def cache_stats(self):
+        """Get query cache statistics, or None when caching is off"""
+        if self.query_cache is None:
+            return None
+        return self.query_cache.stats()
+    
+    def query_stats(self):
+        """Get query instrumentation (see QueryMonitor.snapshot), or None when monitoring is off"""
+        if self.monitor is None:
+            return None
+        return self.monitor.snapshot()
+    
+    def _cached(self, key, loader):
+        """Serve a read through the query cache when one is configured"""
+        if self.query_cache is None:
+            return loader()
+        return self.query_cache.get_or_load(key, loader)
+    
+    def _data_changed(self, trip_ids=None):
+        """Invalidate cached searches after a committed write to trips or seat counts
         
-        # Create bookings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bookings (
-                booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                trip_id INTEGER NOT NULL,
-                passengers INTEGER DEFAULT 1,
-                total_amount REAL NOT NULL,
-                booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'confirmed' CHECK(status IN ('confirmed', 'cancelled', 'pending')),
-                FOREIGN KEY (user_id) REFERENCES users (user_id),
-                FOREIGN KEY (trip_id) REFERENCES trips (trip_id)
-            )
-        ''')
+        trip_ids names the trips that were written; None means any trip may
+        have changed.
+        """
+        with self._data_version_lock:
+            self._data_version += 1
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+        for listener in list(self._trip_listeners):
+            listener(trip_ids)
+    
+    def data_version(self):
+        """Number that changes after every committed write to trips or bookings
         
-        # Insert sample admin user
-        cursor.execute('''
-            INSERT OR IGNORE INTO users (name, email, password, is_admin)
-            VALUES ('Admin User', 'admin@travel.com', ?, 1)
-        ''', (self.hash_password('admin123'),))
-        
-        # Insert sample trips
-        sample_trips = [
-            ('Delhi', 'Mumbai', '2025-01-25', 5500.0, 'flight', '2h 15m', '06:00', '08:15', 45),
-            ('Delhi', 'Mumbai', '2025-01-25', 1200.0, 'train', '16h 30m', '22:30', '15:00', 120),
-            ('Mumbai', 'Bangalore', '2025-01-26', 4200.0, 'flight', '1h 45m', '14:30', '16:15', 30),
-            ('Delhi', 'Bangalore', '2025-01-27', 800.0, 'bus', '24h 00m', '20:00', '20:00', 25),
-            ('Chennai', 'Kolkata', '2025-01-28', 6200.0, 'flight', '2h 30m', '09:15', '11:45', 60),
-            ('Bangalore', 'Chennai', '2025-01-29', 3800.0, 'flight', '1h 30m', '11:00', '12:30', 50),
-            ('Mumbai', 'Delhi', '2025-01-30', 5200.0, 'flight', '2h 10m', '16:45', '18:55', 40),
-            ('Kolkata', 'Delhi', '2025-01-31', 900.0, 'train', '17h 15m', '18:30', '11:45', 100)
-        ]
+        Cheap enough to poll from the Tk thread, e.g. to decide whether a
+        view needs reloading. Only counts writes made through this manager;
+        other processes sharing the file are not seen.
+        """
+        return self._data_version
+    
+    def invalidate(self, trip_ids=None):
+        """Tell the manager rows were written to trips or bookings outside its write methods
+        
+        Drops cached reads, moves data_version() on and notifies trip
+        listeners, as the manager's own writes do. trip_ids names the trips
+        written; None means any trip may have changed.
+        """
+        self._data_changed(trip_ids)
+    
+    def add_trip_listener(self, listener):
+        """Call listener(trip_ids) after every committed write to trips
+        
+        trip_ids is a list of the trips written, or None when a bulk write
+        may have changed any of them. Listeners run on the writing thread
+        and should only record the change.
+        """
+        self._trip_listeners.append(listener)
+    
+    def remove_trip_listener(self, listener):
+        """Stop calling a listener added with add_trip_listener"""
+        self._trip_listeners.remove(listener)
+    
+    def _set_journal_mode(self):
+        """Switch the file to the profile's journal mode; returns the mode in effect"""
+        if self.storage.journal_mode is None:
+            with self.get_connection() as conn:
+                return conn.execute("PRAGMA journal_mode").fetchone()[0]
         
-        cursor.executemany('''
-            INSERT OR IGNORE INTO trips 
-            (source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_trips)
+        # Changing the mode needs a moment without other writers, so retry like run_write
+        delay = self.retry_backoff
+        for attempt in range(self.write_retries + 1):
+            try:
+                with self.get_connection() as conn:
+                    return conn.execute(f"PRAGMA journal_mode = {self.storage.journal_mode}").fetchone()[0]
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == self.write_retries:
+                    raise
+                time.sleep(delay + random.uniform(0, delay))
+                delay *= 2
+    
+    def checkpoint(self, mode="PASSIVE"):
+        """Copy WAL contents back into the database file
         
-        conn.commit()
-        conn.close()
+        mode is PASSIVE (never waits), FULL, RESTART or TRUNCATE (also
+        empties the WAL file). Returns (busy, wal_pages, checkpointed_pages);
+        outside WAL mode there is nothing to do and (0, -1, -1) comes back.
+        """
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+        with self.get_connection() as conn:
+            return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+    
+    def storage_settings(self):
+        """Get the storage settings in effect on a pooled connection"""
+        settings = {}
+        with self.get_connection() as conn:
+            for pragma in ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size",
+                           "wal_autocheckpoint", "journal_size_limit"):
+                settings[pragma] = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+        return settings
+    
+    def close(self):
+        """Close all pooled connections, checkpointing first if the profile asks for it"""
+        if self.storage.checkpoint_on_close and self.journal_mode == "wal":
+            try:
+                self.checkpoint(self.storage.checkpoint_on_close)
+            except sqlite3.Error:
+                # Another process holds the database; its own checkpoints will catch up
+                pass
+        self.pool.close()
+    
+    def init_database(self):
+        """Bring the database schema up to date (runs pending migrations only)"""
+        with self.get_connection() as conn:
+            return schema.migrate(conn)
     
     def hash_password(self, password):
         """Hash password using SHA-256"""
@@ -95,17 +382,15 @@ class DatabaseManager:
     def register_user(self, name, email, password):
         """Register a new user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                
+                hashed_password = self.hash_password(password)
+                cursor.execute('''
+                    INSERT INTO users (name, email, password)
+                    VALUES (?, ?, ?)
+                ''', (name, email, hashed_password))
             
-            hashed_password = self.hash_password(password)
-            cursor.execute('''
-                INSERT INTO users (name, email, password)
-                VALUES (?, ?, ?)
-            ''', (name, email, hashed_password))
-            
-            conn.commit()
-            conn.close()
             return True, "User registered successfully"
         except sqlite3.IntegrityError:
             return False, "Email already exists"
@@ -114,17 +399,16 @@ class DatabaseManager:
     
     def login_user(self, email, password):
         """Authenticate user login"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        hashed_password = self.hash_password(password)
-        cursor.execute('''
-            SELECT user_id, name, email, is_admin FROM users
-            WHERE email = ? AND password = ?
-        ''', (email, hashed_password))
-        
-        user = cursor.fetchone()
-        conn.close()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            hashed_password = self.hash_password(password)
+            cursor.execute('''
+                SELECT user_id, name, email, is_admin FROM users
+                WHERE email = ? AND password = ?
+            ''', (email, hashed_password))
+            
+            user = cursor.fetchone()
         
         if user:
             return True, {
@@ -135,21 +419,45 @@ class DatabaseManager:
             }
         return False, "Invalid credentials"
     
-    def search_trips(self, source=None, destination=None, date=None, mode=None):
-        """Search for trips based on criteria"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def _city_filter(self, column, value, match, params):
+        """Build the WHERE fragment for one city criterion"""
+        key = schema.city_key(value)
         
-        query = "SELECT * FROM trips WHERE available_seats > 0"
-        params = []
+        if match == "exact":
+            params.append(key)
+            return f" AND {column}_key = ?"
+        
+        if match == "prefix":
+            # Half-open range instead of LIKE so the index on the key column is used
+            params.extend([key, key[:-1] + chr(ord(key[-1]) + 1)])
+            return f" AND {column}_key >= ? AND {column}_key < ?"
+        
+        if match == "substring":
+            # Fallback: cannot use an index, scans every candidate row
+            params.append(f"%{key}%")
+            return f" AND {column}_key LIKE ?"
         
-        if source:
-            query += " AND LOWER(source) LIKE LOWER(?)"
-            params.append(f"%{source}%")
+        raise ValueError(f"Unknown match mode: {match}")
+    
+    def _trip_filters(self, source=None, destination=None, date=None, mode=None, match="prefix",
+                      date_from=None, date_to=None, departure_from=None, departure_to=None, max_duration=None,
+                      min_price=None, max_price=None, min_seats=1):
+        """Build the WHERE clause and parameters shared by the trip searches
+        
+        Besides the equality filters: date_from/date_to bound the travel
+        date, departure_from/departure_to the departure time (minutes after
+        midnight), min_price/max_price the fare, all inclusive; max_duration
+        caps the duration in minutes and min_seats asks for that many free
+        seats. Every range is on a plain column, so the indexes serve it.
+        """
+        query = " WHERE available_seats >= ?"
+        params = [max(min_seats or 1, 1)]
         
-        if destination:
-            query += " AND LOWER(destination) LIKE LOWER(?)"
-            params.append(f"%{destination}%")
+        if source and source.strip():
+            query += self._city_filter("source", source, match, params)
+        
+        if destination and destination.strip():
+            query += self._city_filter("destination", destination, match, params)
         
         if date:
             query += " AND date = ?"
@@ -159,157 +467,844 @@ class DatabaseManager:
             query += " AND mode = ?"
             params.append(mode)
         
-        query += " ORDER BY date, departure_time"
+        ranges = [
+            ("date >= ?", date_from),
+            ("date <= ?", date_to),
+            ("departure_minute >= ?", departure_from),
+            ("departure_minute <= ?", departure_to),
+            ("duration_minutes <= ?", max_duration),
+            ("price >= ?", min_price),
+            ("price <= ?", max_price),
+        ]
+        for condition, value in ranges:
+            if value is not None and value != '':
+                query += " AND " + condition
+                params.append(value)
+        
+        return query, params
+    
+    def _trip_order(self, sort):
+        """ORDER BY clause, keyset column list and cursor function for a TRIP_SORTS key"""
+        if sort not in TRIP_SORTS:
+            raise ValueError(f"Unknown sort order: {sort}")
+        columns = ", ".join(column for column, position in TRIP_SORTS[sort])
+        positions = [position for column, position in TRIP_SORTS[sort]]
+        return " ORDER BY " + columns, columns, lambda trip: tuple(trip[position] for position in positions)
+    
+    def _search_key(self, criteria):
+        """Normalise search criteria the way _trip_filters compares them"""
+        def fold(value):
+            return schema.city_key(value) if value and value.strip() else None
+        key = dict(criteria, source=fold(criteria.get('source')), destination=fold(criteria.get('destination')))
+        return tuple(sorted((name, value) for name, value in key.items() if value not in (None, '')))
+    
+    def _fetch_page(self, query, params, page_size, cursor_key):
+        """Run a keyset-paginated query; returns (rows, next_cursor or None)"""
+        with self.get_connection() as conn:
+            # One extra row tells us whether another page exists
+            rows = conn.execute(query + " LIMIT ?", params + [page_size + 1]).fetchall()
+        
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            return rows, cursor_key(rows[-1])
+        return rows, None
+    
+    def _stream(self, query, params, batch_size):
+        """Yield rows straight from the cursor without building a list"""
+        # Private connection: the cursor stays open while the caller iterates
+        with self.pool.connection(shared=False) as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+    
+    def search_trips(self, source=None, destination=None, date=None, mode=None, match="prefix",
+                     sort="departure", **ranges):
+        """Search for trips based on criteria
+        
+        match selects how cities are compared: "exact" and "prefix" are
+        index-backed, "substring" is the unindexed fallback. ranges are the
+        range filters of _trip_filters; sort is a TRIP_SORTS key.
+        """
+        criteria = dict(source=source, destination=destination, date=date, mode=mode, match=match, **ranges)
+        where, params = self._trip_filters(**criteria)
+        order_by, _, _ = self._trip_order(sort)
+        query = f"SELECT {TRIP_COLUMNS} FROM trips" + where + order_by
+        
+        def load():
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                return cursor.fetchall()
+        
+        key = ('search_trips', sort) + self._search_key(criteria)
+        return self._cached(key, load)
+    
+    def get_trip(self, trip_id):
+        """Get a single trip row, or None"""
+        with self.get_connection() as conn:
+            return conn.execute(f"SELECT {TRIP_COLUMNS} FROM trips WHERE trip_id = ?", (trip_id,)).fetchone()
+    
+    def get_trips(self, trip_ids):
+        """Get the trip rows for several IDs; missing trips are left out"""
+        trip_ids = list(trip_ids)
+        if not trip_ids:
+            return []
+        with self.get_connection() as conn:
+            return conn.execute(
+                f"SELECT {TRIP_COLUMNS} FROM trips WHERE trip_id IN ({', '.join('?' for _ in trip_ids)})",
+                trip_ids
+            ).fetchall()
+    
+    def get_trip_for_booking(self, booking_id):
+        """Get the trip row a booking belongs to, or None"""
+        with self.get_connection() as conn:
+            return conn.execute(f'''
+                SELECT {TRIP_COLUMNS} FROM trips
+                WHERE trip_id = (SELECT trip_id FROM bookings WHERE booking_id = ?)
+            ''', (booking_id,)).fetchone()
+    
+    def count_trips(self, source=None, destination=None, date=None, mode=None, match="prefix", **ranges):
+        """Count trips matching the search criteria"""
+        criteria = dict(source=source, destination=destination, date=date, mode=mode, match=match, **ranges)
+        where, params = self._trip_filters(**criteria)
+        
+        def load():
+            with self.get_connection() as conn:
+                return conn.execute("SELECT COUNT(*) FROM trips" + where, params).fetchone()[0]
+        
+        key = ('count_trips',) + self._search_key(criteria)
+        return self._cached(key, load)
+    
+    def search_trips_page(self, source=None, destination=None, date=None, mode=None, match="prefix",
+                          sort="departure", page_size=100, after=None, **ranges):
+        """Get one page of search results
+        
+        after is the cursor returned with the previous page, a tuple of the
+        sort's TRIP_SORTS columns. Returns (trips, next_cursor); next_cursor
+        is None on the last page.
+        """
+        criteria = dict(source=source, destination=destination, date=date, mode=mode, match=match, **ranges)
+        where, params = self._trip_filters(**criteria)
+        order_by, columns, cursor_key = self._trip_order(sort)
+        if after is not None:
+            where += f" AND ({columns}) > ({', '.join('?' for _ in after)})"
+            params.extend(after)
+        query = f"SELECT {TRIP_COLUMNS} FROM trips" + where + order_by
+        
+        key = ('search_trips_page', sort) + self._search_key(criteria) + (page_size, after)
+        return self._cached(key, lambda: self._fetch_page(query, params, page_size, cursor_key))
+    
+    def iter_trips(self, source=None, destination=None, date=None, mode=None, match="prefix",
+                   sort="departure", batch_size=500, **ranges):
+        """Stream search results in the same order as search_trips"""
+        where, params = self._trip_filters(source, destination, date, mode, match, **ranges)
+        order_by, _, _ = self._trip_order(sort)
+        query = f"SELECT {TRIP_COLUMNS} FROM trips" + where + order_by
+        
+        return self._stream(query, params, batch_size)
+    
+    def get_fare_calendar(self, source, destination, date, days=3, mode=None):
+        """Cheapest fare and free seats per day around a date for one route
+        
+        Covers date - days to date + days in a single grouped query over the
+        route index; cities match exactly, ignoring case. Returns rows of
+        (date, mode, min_price, available_seats, trips) ordered by date and
+        mode, for days and modes with seats left.
+        """
+        query = '''
+            SELECT date, mode, MIN(price), SUM(available_seats), COUNT(*)
+            FROM trips
+            WHERE available_seats > 0
+              AND date BETWEEN date(?, '-' || ? || ' days') AND date(?, '+' || ? || ' days')
+        '''
+        params = [date, days, date, days]
+        query += self._city_filter("source", source, "exact", params)
+        query += self._city_filter("destination", destination, "exact", params)
+        if mode:
+            query += " AND mode = ?"
+            params.append(mode)
+        query += " GROUP BY date, mode ORDER BY date, mode"
+        
+        def load():
+            with self.get_connection() as conn:
+                return conn.execute(query, params).fetchall()
+        
+        key = ('fare_calendar',) + self._search_key(dict(source=source, destination=destination, date=date,
+                                                          days=days, mode=mode))
+        return self._cached(key, load)
+    
+    def find_connections(self, source, destination, date, objective="cheapest", min_layover=60,
+                         passengers=1, mode=None, max_legs=3, limit=10):
+        """Find direct trips and connections leaving on date
+        
+        See ConnectionIndex.search; the index is built on first use and
+        kept up to date with this manager's writes. Returns a list of
+        routing.Connection tuples, best first.
+        """
+        with self._connection_index_lock:
+            if self._connection_index is None:
+                self._connection_index = ConnectionIndex(self)
+                self.add_trip_listener(self._connection_index.trips_changed)
+        return self._connection_index.search(
+            source, destination, date, objective=objective, min_layover=min_layover,
+            passengers=passengers, mode=mode, max_legs=max_legs, limit=limit
+        )
+    
+    def _reserve_seats(self, cursor, user_id, trip_id, passengers):
+        """Take seats and insert the booking; must run inside a write transaction"""
+        if passengers < 1:
+            return False, "Passengers must be at least 1", None
+        
+        # Conditional decrement: only succeeds if enough seats remain
+        cursor.execute('''
+            UPDATE trips SET available_seats = available_seats - ?
+            WHERE trip_id = ? AND available_seats >= ?
+        ''', (passengers, trip_id, passengers))
+        reserved = cursor.rowcount == 1
+        
+        cursor.execute("SELECT price FROM trips WHERE trip_id = ?", (trip_id,))
+        trip = cursor.fetchone()
+        
+        if not trip:
+            return False, "Trip not found", None
+        
+        if not reserved:
+            return False, "Not enough seats available", None
         
-        cursor.execute(query, params)
-        trips = cursor.fetchall()
-        conn.close()
+        total_amount = trip[0] * passengers
         
-        return trips
+        # Create booking
+        cursor.execute('''
+            INSERT INTO bookings (user_id, trip_id, passengers, total_amount)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, trip_id, passengers, total_amount))
+        
+        return True, "Booking successful", cursor.lastrowid
     
     def book_trip(self, user_id, trip_id, passengers=1):
         """Book a trip for a user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Get trip details
-            cursor.execute("SELECT price, available_seats FROM trips WHERE trip_id = ?", (trip_id,))
-            trip = cursor.fetchone()
-            
-            if not trip:
-                return False, "Trip not found"
-            
-            price, available_seats = trip
-            
-            if available_seats < passengers:
-                return False, "Not enough seats available"
-            
-            total_amount = price * passengers
-            
-            # Create booking
-            cursor.execute('''
-                INSERT INTO bookings (user_id, trip_id, passengers, total_amount)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, trip_id, passengers, total_amount))
-            
-            # Update available seats
-            cursor.execute('''
-                UPDATE trips SET available_seats = available_seats - ?
-                WHERE trip_id = ?
-            ''', (passengers, trip_id))
-            
-            conn.commit()
-            conn.close()
-            return True, "Booking successful"
+            success, message, _ = self.run_write(
+                lambda cursor: self._reserve_seats(cursor, user_id, trip_id, passengers))
+            if success:
+                self._data_changed([trip_id])
+            return success, message
         except Exception as e:
             return False, f"Booking failed: {str(e)}"
     
+    def book_trips(self, user_id, legs):
+        """Book several (trip_id, passengers) legs in one all-or-nothing transaction
+        
+        Returns (success, results) with one result dict per leg. Either every
+        leg is booked with a single commit, or none are.
+        """
+        legs = list(legs)
+        
+        def reserve_all(cursor):
+            results = []
+            for trip_id, passengers in legs:
+                try:
+                    success, message, booking_id = self._reserve_seats(cursor, user_id, trip_id, passengers)
+                except sqlite3.IntegrityError as e:
+                    success, message, booking_id = False, f"Booking failed: {str(e)}", None
+                results.append({
+                    'trip_id': trip_id,
+                    'passengers': passengers,
+                    'success': success,
+                    'message': message,
+                    'booking_id': booking_id
+                })
+            
+            if not all(result['success'] for result in results):
+                # Undo the legs that did go through
+                raise _BulkBookingFailed(results)
+            return results
+        
+        if not legs:
+            return False, []
+        
+        try:
+            results = self.run_write(reserve_all)
+            self._data_changed([trip_id for trip_id, passengers in legs])
+            return True, results
+        except _BulkBookingFailed as failed:
+            for result in failed.results:
+                if result['success']:
+                    result.update(success=False, booking_id=None,
+                                  message="Not booked: another leg failed")
+            return False, failed.results
+        except Exception as e:
+            return False, [{
+                'trip_id': trip_id,
+                'passengers': passengers,
+                'success': False,
+                'message': f"Booking failed: {str(e)}",
+                'booking_id': None
+            } for trip_id, passengers in legs]
+    
     def get_user_bookings(self, user_id):
         """Get all bookings for a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT b.booking_id, b.passengers, b.total_amount, b.booking_date, b.status,
-                   t.source, t.destination, t.date, t.mode, t.departure_time, t.arrival_time, t.duration
-            FROM bookings b
-            JOIN trips t ON b.trip_id = t.trip_id
-            WHERE b.user_id = ?
-            ORDER BY b.booking_date DESC
-        ''', (user_id,))
-        
-        bookings = cursor.fetchall()
-        conn.close()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(USER_BOOKINGS_QUERY + " WHERE b.user_id = ? ORDER BY b.booking_epoch DESC, b.booking_id DESC", (user_id,))
+            bookings = cursor.fetchall()
         return bookings
     
+    def get_user_booking(self, booking_id):
+        """Get a single booking row in the get_user_bookings shape, or None"""
+        with self.get_connection() as conn:
+            return conn.execute(USER_BOOKINGS_QUERY + " WHERE b.booking_id = ?", (booking_id,)).fetchone()
+    
+    def get_user_bookings_page(self, user_id, page_size=100, after=None):
+        """Get one page of a user's bookings, newest first
+        
+        after is the (booking_epoch, booking_id) cursor returned with the
+        previous page. Returns (bookings, next_cursor).
+        """
+        query = USER_BOOKINGS_QUERY + " WHERE b.user_id = ?"
+        params = [user_id]
+        if after is not None:
+            query += " AND (b.booking_epoch, b.booking_id) < (?, ?)"
+            params.extend(after)
+        query += " ORDER BY b.booking_epoch DESC, b.booking_id DESC"
+        
+        return self._fetch_page(query, params, page_size, lambda booking: (booking[3], booking[0]))
+    
+    def iter_user_bookings(self, user_id, batch_size=500):
+        """Stream a user's bookings, newest first"""
+        query = USER_BOOKINGS_QUERY + " WHERE b.user_id = ? ORDER BY b.booking_epoch DESC, b.booking_id DESC"
+        return self._stream(query, [user_id], batch_size)
+    
     def get_all_bookings(self):
         """Get all bookings (admin only)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT b.booking_id, u.name, u.email, b.passengers, b.total_amount, 
-                   b.booking_date, b.status, t.source, t.destination, t.date, t.mode
-            FROM bookings b
-            JOIN users u ON b.user_id = u.user_id
-            JOIN trips t ON b.trip_id = t.trip_id
-            ORDER BY b.booking_date DESC
-        ''')
-        
-        bookings = cursor.fetchall()
-        conn.close()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(ALL_BOOKINGS_QUERY + " ORDER BY b.booking_epoch DESC, b.booking_id DESC")
+            bookings = cursor.fetchall()
         return bookings
     
-    def add_trip(self, source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats):
-        """Add a new trip (admin only)"""
-        try:
-            conn = self.get_connection()
+    def get_all_bookings_page(self, page_size=100, after=None):
+        """Get one page of all bookings, newest first (admin only)
+        
+        after is the (booking_epoch, booking_id) cursor returned with the
+        previous page. Returns (bookings, next_cursor).
+        """
+        query = ALL_BOOKINGS_QUERY
+        params = []
+        if after is not None:
+            query += " AND (b.booking_epoch, b.booking_id) < (?, ?)"
+            params.extend(after)
+        query += " ORDER BY b.booking_epoch DESC, b.booking_id DESC"
+        
+        return self._fetch_page(query, params, page_size, lambda booking: (booking[5], booking[0]))
+    
+    def iter_all_bookings(self, batch_size=500, start_date=None, end_date=None, status=None,
+                          source=None, destination=None):
+        """Stream all bookings, newest first (admin only)
+        
+        start_date and end_date bound the booking date (inclusive,
+        YYYY-MM-DD); source and destination match cities exactly, ignoring case.
+        """
+        query = ALL_BOOKINGS_QUERY
+        params = []
+        
+        if start_date:
+            query += " AND b.booking_epoch >= CAST(strftime('%s', ?) AS INTEGER)"
+            params.append(start_date)
+        
+        if end_date:
+            query += " AND b.booking_epoch < CAST(strftime('%s', ?, '+1 day') AS INTEGER)"
+            params.append(end_date)
+        
+        if status:
+            query += " AND b.status = ?"
+            params.append(status)
+        
+        if source and source.strip():
+            query += self._city_filter("t.source", source, "exact", params)
+        
+        if destination and destination.strip():
+            query += self._city_filter("t.destination", destination, "exact", params)
+        
+        query += " ORDER BY b.booking_epoch DESC, b.booking_id DESC"
+        return self._stream(query, params, batch_size)
+    
+    def iter_all_trips(self, batch_size=500, start_date=None, end_date=None, source=None,
+                       destination=None, mode=None):
+        """Stream every trip, sold out or not, in schedule order (admin only)
+        
+        start_date and end_date bound the travel date (inclusive); source and
+        destination match cities exactly, ignoring case.
+        """
+        query = f"SELECT {TRIP_COLUMNS} FROM trips WHERE 1 = 1"
+        params = []
+        
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
+        
+        if source and source.strip():
+            query += self._city_filter("source", source, "exact", params)
+        
+        if destination and destination.strip():
+            query += self._city_filter("destination", destination, "exact", params)
+        
+        if mode:
+            query += " AND mode = ?"
+            params.append(mode)
+        
+        query += " ORDER BY date, departure_minute, trip_id"
+        return self._stream(query, params, batch_size)
+    
+    def get_booking_statistics(self):
+        """Get booking totals and the most booked route and mode (admin only)
+        
+        Returns a dict with total_bookings, total_revenue, total_passengers,
+        popular_route ((source, destination) or None) and popular_mode.
+        Revenue, passengers and popularity only count confirmed bookings.
+        """
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
-                INSERT INTO trips (source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats))
+                SELECT COUNT(*),
+                       COALESCE(SUM(CASE WHEN status = 'confirmed' THEN total_amount END), 0),
+                       COALESCE(SUM(CASE WHEN status = 'confirmed' THEN passengers END), 0)
+                FROM bookings
+            ''')
+            total_bookings, total_revenue, total_passengers = cursor.fetchone()
+            
+            cursor.execute('''
+                SELECT t.source, t.destination
+                FROM bookings b
+                JOIN trips t ON b.trip_id = t.trip_id
+                WHERE b.status = 'confirmed'
+                GROUP BY t.source, t.destination
+                ORDER BY COUNT(*) DESC, t.source, t.destination
+                LIMIT 1
+            ''')
+            popular_route = cursor.fetchone()
             
-            conn.commit()
-            conn.close()
+            cursor.execute('''
+                SELECT t.mode
+                FROM bookings b
+                JOIN trips t ON b.trip_id = t.trip_id
+                WHERE b.status = 'confirmed'
+                GROUP BY t.mode
+                ORDER BY COUNT(*) DESC, t.mode
+                LIMIT 1
+            ''')
+            popular_mode = cursor.fetchone()
+        
+        return {
+            'total_bookings': total_bookings,
+            'total_revenue': total_revenue,
+            'total_passengers': total_passengers,
+            'popular_route': tuple(popular_route) if popular_route else None,
+            'popular_mode': popular_mode[0] if popular_mode else None
+        }
+    
+    def get_user_booking_statistics(self, user_id):
+        """Get a user's booking counts and confirmed totals
+        
+        Returns a dict with total_bookings, confirmed_bookings,
+        cancelled_bookings, total_spent and total_passengers.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COUNT(*),
+                       COUNT(CASE WHEN status = 'confirmed' THEN 1 END),
+                       COUNT(CASE WHEN status = 'cancelled' THEN 1 END),
+                       COALESCE(SUM(CASE WHEN status = 'confirmed' THEN total_amount END), 0),
+                       COALESCE(SUM(CASE WHEN status = 'confirmed' THEN passengers END), 0)
+                FROM bookings
+                WHERE user_id = ?
+            ''', (user_id,))
+            row = cursor.fetchone()
+        
+        keys = ('total_bookings', 'confirmed_bookings', 'cancelled_bookings', 'total_spent', 'total_passengers')
+        return dict(zip(keys, row))
+    
+    def get_rollup_report(self, group_by="day", start_date=None, end_date=None, mode=None):
+        """Get revenue, passengers and load factor from the rollup table (admin only)
+        
+        group_by is "day" (travel date), "route" or "mode". Returns rows of
+        (label, trips, bookings, passengers, revenue, load_factor); the load
+        factor is the share of seats sold on those trips, or None without seats.
+        """
+        labels = {
+            'day': "date",
+            'route': "source || ' → ' || destination",
+            'mode': "mode",
+        }
+        if group_by not in labels:
+            raise ValueError(f"Unknown report grouping: {group_by}")
+        
+        conditions = []
+        params = []
+        if start_date:
+            conditions.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("date <= ?")
+            params.append(end_date)
+        if mode:
+            conditions.append("mode = ?")
+            params.append(mode)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        
+        label = labels[group_by]
+        query = f'''
+            SELECT {label} AS label, SUM(trips), SUM(bookings), SUM(passengers), SUM(revenue),
+                   SUM(passengers) * 1.0 / NULLIF(SUM(passengers) + SUM(available_seats), 0)
+            FROM trip_rollups{where}
+            GROUP BY label
+            ORDER BY label
+        '''
+        with self.get_connection() as conn:
+            return conn.execute(query, params).fetchall()
+    
+    def rebuild_rollups(self):
+        """Recompute the rollup table from trips and bookings (admin only)"""
+        try:
+            self.run_write(schema.rebuild_rollups)
+            return True, "Rollups rebuilt successfully"
+        except Exception as e:
+            return False, f"Failed to rebuild rollups: {str(e)}"
+    
+    def add_trip(self, source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats):
+        """Add a new trip (admin only)"""
+        try:
+            trip = validate_trip(source, destination, date, price, mode, duration,
+                                 departure_time, arrival_time, available_seats)
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO trips (source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', trip)
+                trip_id = cursor.lastrowid
+            
+            self._data_changed([trip_id])
             return True, "Trip added successfully"
         except Exception as e:
             return False, f"Failed to add trip: {str(e)}"
     
+    def import_trips(self, rows, batch_size=5000, on_progress=None, on_reject=None):
+        """Bulk-insert trips, validating each row like add_trip (admin only)
+        
+        rows yields (line_number, mapping) pairs with TRIP_FIELDS keys; a
+        ValueError in place of the mapping rejects that row. Valid
+        rows are inserted with executemany, batch_size rows per transaction;
+        rows matching an existing service are skipped as duplicates. Invalid
+        rows go to on_reject(line_number, row, reason); on_progress(summary)
+        runs after every batch. Returns the summary dict of read, imported,
+        duplicates and rejected counts.
+        """
+        summary = {'read': 0, 'imported': 0, 'duplicates': 0, 'rejected': 0}
+        
+        def insert(cursor, batch):
+            cursor.executemany('''
+                INSERT OR IGNORE INTO trips (source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            return cursor.rowcount
+        
+        def flush(batch):
+            if batch:
+                inserted = self.run_write(lambda cursor: insert(cursor, batch))
+                summary['imported'] += inserted
+                summary['duplicates'] += len(batch) - inserted
+                self._data_changed()
+            if on_progress:
+                on_progress(dict(summary))
+        
+        batch = []
+        for line_number, row in rows:
+            summary['read'] += 1
+            try:
+                if isinstance(row, Exception):
+                    # The reader could not parse this row
+                    raise row
+                batch.append(validate_trip(*(row.get(field) for field in TRIP_FIELDS)))
+            except ValueError as e:
+                summary['rejected'] += 1
+                if on_reject:
+                    on_reject(line_number, row, str(e))
+            
+            # Flush every batch_size rows read, so progress moves even through rejected rows
+            if summary['read'] % batch_size == 0:
+                flush(batch)
+                batch = []
+        
+        if summary['read'] % batch_size:
+            flush(batch)
+        return summary
+    
     def delete_trip(self, trip_id):
         """Delete a trip (admin only)"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Check if trip has bookings
-            cursor.execute("SELECT COUNT(*) FROM bookings WHERE trip_id = ?", (trip_id,))
-            booking_count = cursor.fetchone()[0]
-            
-            if booking_count > 0:
-                return False, "Cannot delete trip with existing bookings"
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                
+                # Check if trip has bookings
+                cursor.execute("SELECT COUNT(*) FROM bookings WHERE trip_id = ?", (trip_id,))
+                booking_count = cursor.fetchone()[0]
+                
+                if booking_count > 0:
+                    return False, "Cannot delete trip with existing bookings"
+                
+                cursor.execute("DELETE FROM trips WHERE trip_id = ?", (trip_id,))
             
-            cursor.execute("DELETE FROM trips WHERE trip_id = ?", (trip_id,))
-            conn.commit()
-            conn.close()
+            self._data_changed([trip_id])
             return True, "Trip deleted successfully"
         except Exception as e:
             return False, f"Failed to delete trip: {str(e)}"
     
-    def cancel_booking(self, booking_id, user_id):
-        """Cancel a booking"""
+    def get_schedules(self):
+        """Get all schedules (admin only)"""
+        with self.get_connection() as conn:
+            return conn.execute(
+                f"SELECT {SCHEDULE_COLUMNS} FROM schedules ORDER BY source, destination, departure_time, schedule_id"
+            ).fetchall()
+    
+    def _expand_schedules(self, cursor, start_date, end_date, schedule_ids=None):
+        """Insert the dated trips of schedules between two dates; returns how many were new
+        
+        Trips that already exist for a service and day are left alone.
+        """
+        schedule_filter = ""
+        params = [start_date, end_date]
+        if schedule_ids is not None:
+            schedule_filter = f" AND s.schedule_id IN ({', '.join('?' for _ in schedule_ids)})"
+            params.extend(schedule_ids)
+        
+        # One statement: a calendar of days joined against every schedule running on them
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO trips
+            (source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats, schedule_id)
+            WITH RECURSIVE days(day) AS (
+                SELECT ?
+                UNION ALL
+                SELECT date(day, '+1 day') FROM days WHERE day < ?
+            )
+            SELECT s.source, s.destination, d.day, s.price, s.mode, s.duration, s.departure_time,
+                   s.arrival_time, s.seats, s.schedule_id
+            FROM schedules s
+            JOIN days d ON d.day BETWEEN s.valid_from AND s.valid_to
+            WHERE (s.days_of_week >> ((CAST(strftime('%w', d.day) AS INTEGER) + 6) % 7)) & 1{schedule_filter}
+            ORDER BY d.day, s.schedule_id
+        ''', params)
+        return cursor.rowcount
+    
+    def expand_schedules(self, start_date=None, end_date=None, schedule_ids=None):
+        """Generate dated trips for schedules in one transaction (admin only)
+        
+        start_date defaults to today and end_date to the last day any of the
+        schedules runs. Returns (success, message, trips_created).
+        """
+        start_date = start_date or date.today().isoformat()
+        
+        def expand(cursor):
+            last_day = end_date
+            if last_day is None:
+                cursor.execute("SELECT MAX(valid_to) FROM schedules")
+                last_day = cursor.fetchone()[0]
+            if last_day is None or last_day < start_date:
+                return 0
+            return self._expand_schedules(cursor, start_date, last_day, schedule_ids)
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            created = self.run_write(expand)
+            self._data_changed()
+            return True, f"{created} trip(s) generated", created
+        except Exception as e:
+            return False, f"Failed to generate trips: {str(e)}", 0
+    
+    def add_schedule(self, source, destination, mode, price, duration, departure_time, arrival_time, seats,
+                     days_of_week, valid_from, valid_to):
+        """Add a recurring schedule (admin only); trips are generated by expand_schedules"""
+        try:
+            schedule = validate_schedule(source, destination, mode, price, duration, departure_time,
+                                         arrival_time, seats, days_of_week, valid_from, valid_to)
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO schedules
+                    (source, destination, mode, price, duration, departure_time, arrival_time, seats,
+                     days_of_week, valid_from, valid_to)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', schedule)
+                schedule_id = cursor.lastrowid
             
-            # Get booking details
-            cursor.execute('''
-                SELECT trip_id, passengers FROM bookings 
-                WHERE booking_id = ? AND user_id = ? AND status = 'confirmed'
-            ''', (booking_id, user_id))
+            return True, "Schedule added successfully", schedule_id
+        except Exception as e:
+            return False, f"Failed to add schedule: {str(e)}", None
+    
+    def update_schedule(self, schedule_id, source, destination, mode, price, duration, departure_time,
+                        arrival_time, seats, days_of_week, valid_from, valid_to, from_date=None):
+        """Change a schedule and bring its future trips in line (admin only)
+        
+        Only trips dated from_date (default today) onwards are touched, and
+        only in the columns that changed: trips keep their bookings, seat
+        counts are recomputed from the new capacity and the confirmed
+        bookings, days no longer served are removed unless booked, and newly
+        served days are added up to the furthest date already generated.
+        Shrinking the capacity below the seats already booked on one of
+        those trips is refused. Returns (success, message).
+        """
+        from_date = from_date or date.today().isoformat()
+        
+        def update(cursor):
+            cursor.execute(f"SELECT {SCHEDULE_COLUMNS} FROM schedules WHERE schedule_id = ?", (schedule_id,))
+            old = cursor.fetchone()
+            if not old:
+                return False, "Schedule not found"
+            old = dict(zip(SCHEDULE_COLUMNS.replace(' ', '').split(','), old))
             
-            booking = cursor.fetchone()
-            if not booking:
-                return False, "Booking not found or already cancelled"
+            new = dict(zip(
+                ('source', 'destination', 'mode', 'price', 'duration', 'departure_time', 'arrival_time', 'seats',
+                 'days_of_week', 'valid_from', 'valid_to'),
+                validate_schedule(source, destination, mode, price, duration, departure_time, arrival_time,
+                                  seats, days_of_week, valid_from, valid_to)
+            ))
             
-            trip_id, passengers = booking
+            # Checked before anything is written, so a refusal leaves the schedule as it was
+            if new['seats'] < old['seats']:
+                cursor.execute('''
+                    SELECT COUNT(*) FROM trips
+                    WHERE schedule_id = ? AND date >= ?
+                      AND (SELECT COALESCE(SUM(passengers), 0) FROM bookings
+                           WHERE bookings.trip_id = trips.trip_id AND status = 'confirmed') > ?
+                ''', (schedule_id, from_date, new['seats']))
+                overbooked = cursor.fetchone()[0]
+                if overbooked:
+                    return False, (f"Cannot reduce seats to {new['seats']}: {overbooked} trip(s) already "
+                                   f"have more seats booked")
             
-            # Update booking status
             cursor.execute('''
-                UPDATE bookings SET status = 'cancelled'
-                WHERE booking_id = ?
-            ''', (booking_id,))
+                UPDATE schedules SET source = ?, destination = ?, mode = ?, price = ?, duration = ?,
+                    departure_time = ?, arrival_time = ?, seats = ?, days_of_week = ?, valid_from = ?, valid_to = ?
+                WHERE schedule_id = ?
+            ''', tuple(new.values()) + (schedule_id,))
+            
+            # Furthest day generated so far; regeneration never goes beyond it
+            cursor.execute("SELECT MAX(date) FROM trips WHERE schedule_id = ?", (schedule_id,))
+            horizon = cursor.fetchone()[0]
             
-            # Return seats to trip
+            updated = 0
+            changed = [field for field in SCHEDULE_TRIP_FIELDS if new[field] != old[field]]
+            if changed:
+                # OR IGNORE: a trip that would collide with another service keeps its old values
+                assignments = ", ".join(f"{field} = ?" for field in changed)
+                cursor.execute(
+                    f"UPDATE OR IGNORE trips SET {assignments} WHERE schedule_id = ? AND date >= ?",
+                    [new[field] for field in changed] + [schedule_id, from_date]
+                )
+                updated = cursor.rowcount
+            
+            if new['seats'] != old['seats']:
+                cursor.execute('''
+                    UPDATE trips SET available_seats = ? - (
+                        SELECT COALESCE(SUM(passengers), 0) FROM bookings
+                        WHERE bookings.trip_id = trips.trip_id AND status = 'confirmed'
+                    )
+                    WHERE schedule_id = ? AND date >= ?
+                ''', (new['seats'], schedule_id, from_date))
+                updated = max(updated, cursor.rowcount)
+            
+            # Days the schedule no longer serves; booked trips stay
             cursor.execute('''
-                UPDATE trips SET available_seats = available_seats + ?
-                WHERE trip_id = ?
-            ''', (passengers, trip_id))
+                DELETE FROM trips
+                WHERE schedule_id = ? AND date >= ?
+                  AND NOT (date BETWEEN ? AND ?
+                           AND (? >> ((CAST(strftime('%w', date) AS INTEGER) + 6) % 7)) & 1)
+                  AND NOT EXISTS (SELECT 1 FROM bookings WHERE bookings.trip_id = trips.trip_id)
+            ''', (schedule_id, from_date, new['valid_from'], new['valid_to'], new['days_of_week']))
+            removed = cursor.rowcount
             
-            conn.commit()
-            conn.close()
-            return True, "Booking cancelled successfully"
+            added = 0
+            if horizon is not None and horizon >= from_date:
+                added = self._expand_schedules(cursor, from_date, horizon, [schedule_id])
+            
+            return True, f"Schedule updated: {updated} trip(s) changed, {added} added, {removed} removed"
+        
+        try:
+            success, message = self.run_write(update)
+            if success:
+                self._data_changed()
+            return success, message
+        except Exception as e:
+            return False, f"Failed to update schedule: {str(e)}"
+    
+    def delete_schedule(self, schedule_id, from_date=None):
+        """Delete a schedule and its unbooked trips from from_date on (admin only)
+        
+        Earlier and booked trips are kept as one-off trips.
+        """
+        from_date = from_date or date.today().isoformat()
+        
+        def delete(cursor):
+            cursor.execute('''
+                DELETE FROM trips
+                WHERE schedule_id = ? AND date >= ?
+                  AND NOT EXISTS (SELECT 1 FROM bookings WHERE bookings.trip_id = trips.trip_id)
+            ''', (schedule_id, from_date))
+            removed = cursor.rowcount
+            cursor.execute("UPDATE trips SET schedule_id = NULL WHERE schedule_id = ?", (schedule_id,))
+            cursor.execute("DELETE FROM schedules WHERE schedule_id = ?", (schedule_id,))
+            if cursor.rowcount == 0:
+                return False, "Schedule not found"
+            return True, f"Schedule deleted, {removed} future trip(s) removed"
+        
+        try:
+            success, message = self.run_write(delete)
+            if success:
+                self._data_changed()
+            return success, message
+        except Exception as e:
+            return False, f"Failed to delete schedule: {str(e)}"
+    
+    def _release_seats(self, cursor, booking_id, user_id):
+        """Cancel a confirmed booking and return its seats; must run inside a write transaction
+        
+        Returns (success, message, trip_id).
+        """
+        cursor.execute("SELECT trip_id, passengers FROM bookings WHERE booking_id = ?", (booking_id,))
+        booking = cursor.fetchone()
+        
+        # Flip the status first so two cancellations cannot both return the seats
+        cursor.execute('''
+            UPDATE bookings SET status = 'cancelled'
+            WHERE booking_id = ? AND user_id = ? AND status = 'confirmed'
+        ''', (booking_id, user_id))
+        
+        if cursor.rowcount == 0:
+            return False, "Booking not found or already cancelled", None
+        
+        # Return seats to trip
+        trip_id, passengers = booking
+        cursor.execute("UPDATE trips SET available_seats = available_seats + ? WHERE trip_id = ?",
+                       (passengers, trip_id))
+        
+        return True, "Booking cancelled successfully", trip_id
+    
+    def cancel_booking(self, booking_id, user_id):
+        """Cancel a booking"""
+        try:
+            success, message, trip_id = self.run_write(
+                lambda cursor: self._release_seats(cursor, booking_id, user_id))
+            if success:
+                self._data_changed([trip_id])
+            return success, message
         except Exception as e:
             return False, f"Failed to cancel booking: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,32 @@
+import functools
+from tkinter import messagebox, filedialog
+
+# UIMonitor that times open dialogs; set by UIMonitor.start
+_monitor = None
+
+def set_monitor(monitor):
+    """Report dialog time to monitor (a UIMonitor), or to nobody when None"""
+    global _monitor
+    _monitor = monitor
+
+def get_monitor():
+    """The UIMonitor dialogs currently report to, or None"""
+    return _monitor
+
+def _modal(function):
+    """Wrap a tkinter dialog so the time it is open is not counted against a handler"""
+    @functools.wraps(function)
+    def show(*args, **kwargs):
+        if _monitor is None:
+            return function(*args, **kwargs)
+        return _monitor.dialog(function, *args, **kwargs)
+    return show
+
+# The application's modal dialogs; use these rather than tkinter.messagebox/filedialog
+showinfo = _modal(messagebox.showinfo)
+showwarning = _modal(messagebox.showwarning)
+showerror = _modal(messagebox.showerror)
+askyesno = _modal(messagebox.askyesno)
+askokcancel = _modal(messagebox.askokcancel)
+askopenfilename = _modal(filedialog.askopenfilename)
+asksaveasfilename = _modal(filedialog.asksaveasfilename)
\ No newline at end of file
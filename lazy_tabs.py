@@ -0,0 +1,74 @@
+from tkinter import ttk
+
+class LazyTab:
+    """One notebook tab: how to build it, how to reload it and the data version it shows"""
+    __slots__ = ('build', 'refresh', 'versioned', 'built', 'version')
+    
+    def __init__(self, build, refresh, versioned):
+        self.build = build
+        self.refresh = refresh
+        self.versioned = versioned
+        self.built = False
+        self.version = None
+
+class LazyTabs:
+    """Builds the tabs of a ttk.Notebook when they are first selected
+    
+    build() fills the tab's frame (returned by add) and loads its data the
+    first time the tab is shown, so opening a notebook only costs the tab on screen.
+    When the tab is shown again, refresh() runs if data_version() has moved
+    on since the tab last loaded; tabs added with versioned=False (whose
+    contents change without a data write) refresh every time they are shown.
+    A tab that applies a write to its rows in place calls mark_patched, so
+    that write alone does not cause a reload.
+    """
+    def __init__(self, notebook, data_version=None):
+        self.notebook = notebook
+        self.data_version = data_version or (lambda: None)
+        self._tabs = {}
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+    
+    def add(self, text, build, refresh=None, versioned=True):
+        """Add an empty tab; returns its frame"""
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text=text)
+        self._tabs[str(frame)] = LazyTab(build, refresh, versioned)
+        return frame
+    
+    def is_built(self, frame):
+        """Check whether a tab's widgets exist yet"""
+        tab = self._tabs.get(str(frame))
+        return tab is not None and tab.built
+    
+    def mark_patched(self, frame):
+        """Count one data write as already shown by a tab that patched its rows in place
+        
+        Call it once per write, however many rows that write touched; each
+        call forgives exactly one bump of the data version.
+        """
+        tab = self._tabs.get(str(frame))
+        if tab is None or not tab.built or tab.version is None:
+            return
+        # Only the patched write is forgiven; any other write since the last load still reloads
+        tab.version = min(tab.version + 1, self.data_version())
+    
+    def on_tab_changed(self, event=None):
+        """Build or refresh the selected tab"""
+        self.show(self.notebook.select())
+    
+    def show(self, frame=None):
+        """Build the tab (the selected one by default) if needed, else reload it if its data is stale"""
+        name = str(frame or self.notebook.select())
+        tab = self._tabs.get(name)
+        if tab is None:
+            return
+        
+        # Read before loading, so a write that lands during the load marks the tab stale again
+        version = self.data_version()
+        if not tab.built:
+            tab.built = True
+            tab.version = version
+            tab.build()
+        elif tab.refresh is not None and (not tab.versioned or tab.version != version):
+            tab.version = version
+            tab.refresh()
\ No newline at end of file
@@ -1,14 +1,17 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk
+import dialogs
 from tkinter import font
-from db import DatabaseManager
+from db import get_database_manager
+from data_service import DataService
 import re
 
 class LoginWindow:
-    def __init__(self, root, on_login_success):
+    def __init__(self, root, on_login_success, data_service=None):
         self.root = root
         self.on_login_success = on_login_success
-        self.db = DatabaseManager()
+        self.db = get_database_manager()
+        self.data_service = data_service or DataService(root)
         
         # Configure window
         self.root.title("TravelBook - Login")
@@ -150,11 +153,11 @@ class LoginWindow:
         password = self.password_entry.get().strip()
         
         if not email or not password:
-            messagebox.showerror("Error", "Please fill in all required fields")
+            dialogs.showerror("Error", "Please fill in all required fields")
             return
         
         if not self.validate_email(email):
-            messagebox.showerror("Error", "Please enter a valid email address")
+            dialogs.showerror("Error", "Please enter a valid email address")
             return
         
         if self.is_login_mode.get():
@@ -162,33 +165,62 @@ class LoginWindow:
         else:
             name = self.name_entry.get().strip()
             if not name:
-                messagebox.showerror("Error", "Please enter your full name")
+                dialogs.showerror("Error", "Please enter your full name")
                 return
             self.handle_register(name, email, password)
     
+    def set_busy(self, busy):
+        """Disable the submit button while a request is in flight"""
+        self.submit_button.configure(state=tk.DISABLED if busy else tk.NORMAL)
+    
+    def on_request_error(self, error):
+        """Handle a failed login or registration request"""
+        self.set_busy(False)
+        dialogs.showerror("Error", f"Request failed: {str(error)}")
+    
     def handle_login(self, email, password):
         """Handle login process"""
-        success, result = self.db.login_user(email, password)
+        self.set_busy(True)
+        self.data_service.submit(
+            self.db.login_user, email, password,
+            on_success=self.on_login_result, on_error=self.on_request_error,
+            key="login", owner=self.submit_button
+        )
+    
+    def on_login_result(self, result):
+        """Handle the login result"""
+        self.set_busy(False)
+        success, result = result
         
         if success:
-            messagebox.showinfo("Success", f"Welcome back, {result['name']}!")
+            dialogs.showinfo("Success", f"Welcome back, {result['name']}!")
             self.on_login_success(result)
         else:
-            messagebox.showerror("Login Failed", result)
+            dialogs.showerror("Login Failed", result)
     
     def handle_register(self, name, email, password):
         """Handle registration process"""
         if len(password) < 6:
-            messagebox.showerror("Error", "Password must be at least 6 characters long")
+            dialogs.showerror("Error", "Password must be at least 6 characters long")
             return
         
-        success, message = self.db.register_user(name, email, password)
+        self.set_busy(True)
+        self.data_service.submit(
+            self.db.register_user, name, email, password,
+            on_success=self.on_register_result, on_error=self.on_request_error,
+            key="register", owner=self.submit_button
+        )
+    
+    def on_register_result(self, result):
+        """Handle the registration result"""
+        self.set_busy(False)
+        success, message = result
         
         if success:
-            messagebox.showinfo("Success", "Account created successfully! Please sign in.")
+            dialogs.showinfo("Success", "Account created successfully! Please sign in.")
             self.is_login_mode.set(True)
             self.toggle_mode()
             self.name_entry.delete(0, tk.END)
             self.password_entry.delete(0, tk.END)
         else:
-            messagebox.showerror("Registration Failed", message)
\ No newline at end of file
+            dialogs.showerror("Registration Failed", message)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk
+import dialogs
 import sys
 import os
 
@@ -8,7 +9,12 @@ from login import LoginWindow
 from search import SearchWindow
 from booking import BookingWindow
 from admin import AdminPanel
-from db import DatabaseManager
+from lazy_tabs import LazyTabs
+from db import get_database_manager
+from data_service import DataService
+from query_cache import QueryCache
+from query_monitor import QueryMonitor
+from ui_monitor import UIMonitor, timed_handler
 
 class TravelBookingApp:
     def __init__(self):
@@ -17,8 +23,19 @@ class TravelBookingApp:
         self.root.geometry("1200x700")
         self.root.minsize(1000, 600)
         
-        # Initialize database
-        self.db = DatabaseManager()
+        # Initialize database; several app instances may share the file,
+        # repeated trip searches are served from the query cache, and query
+        # timings feed the admin Diagnostics tab
+        self.db = get_database_manager(storage="multiprocess", query_cache=QueryCache(max_entries=256, ttl=30.0),
+                                       monitor=QueryMonitor(slow_threshold=0.1))
+        
+        # Event loop stalls and handler timings, summarised in the status bar
+        self.ui_monitor = UIMonitor(self.root)
+        self.ui_monitor.start()
+        
+        # Database calls run on worker threads; results come back via root.after
+        self.data_service = DataService(self.root, monitor=self.ui_monitor)
+        self.data_service.add_busy_listener(self.update_busy_indicator)
         
         # User data
         self.current_user = None
@@ -59,7 +76,7 @@ class TravelBookingApp:
             widget.destroy()
         
         # Create login window
-        self.login_window = LoginWindow(self.root, self.on_login_success)
+        self.login_window = LoginWindow(self.root, self.on_login_success, self.data_service)
     
     def on_login_success(self, user_data):
         """Handle successful login"""
@@ -75,6 +92,7 @@ class TravelBookingApp:
         # Create main layout
         self.create_main_layout()
     
+    @timed_handler("load tabs")
     def create_main_layout(self):
         """Create main application layout"""
         # Header
@@ -102,48 +120,122 @@ class TravelBookingApp:
         logout_button = ttk.Button(user_frame, text="Logout", command=self.logout)
         logout_button.pack(side=tk.LEFT)
         
+        # Status bar (packed before the notebook so it always keeps its space)
+        self.status_bar = ttk.Label(self.root, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
         # Create notebook for tabs
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Search Trips Tab
-        self.search_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.search_frame, text="🔍 Search Trips")
-        self.search_window = SearchWindow(self.search_frame, self.current_user, self.refresh_bookings)
+        # Tabs are built when first selected, so logging in only loads the
+        # search tab however much data the other tabs would show; a tab
+        # shown again reloads only if trips or bookings were written meanwhile
+        self.search_window = None
+        self.booking_window = None
+        self.admin_window = None
+        self.tabs = LazyTabs(self.notebook, self.db.data_version)
         
-        # My Bookings Tab
-        self.booking_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.booking_frame, text="📅 My Bookings")
-        self.booking_window = BookingWindow(self.booking_frame, self.current_user)
+        # Search results are kept current by patch_trip, so the tab is not reloaded
+        self.search_frame = self.tabs.add("🔍 Search Trips", self.create_search_tab)
+        self.booking_frame = self.tabs.add("📅 My Bookings", self.create_booking_tab,
+                                           lambda: self.booking_window.load_bookings())
         
         # Admin Panel Tab (only for admins)
         if self.current_user['is_admin']:
-            self.admin_frame = ttk.Frame(self.notebook)
-            self.notebook.add(self.admin_frame, text="⚙️ Admin Panel")
-            self.admin_window = AdminPanel(self.admin_frame, self.current_user)
-        
-        # Status bar
-        self.status_bar = ttk.Label(self.root, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
-        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+            self.admin_frame = self.tabs.add("⚙️ Admin Panel", self.create_admin_tab,
+                                             lambda: self.admin_window.refresh())
+        self.tabs.show()
         
         # Bind window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        self.update_ui_report()
+    
+    def create_search_tab(self):
+        """Build the Search Trips tab"""
+        self.search_window = SearchWindow(self.search_frame, self.current_user, self.refresh_bookings,
+                                          self.data_service)
     
-    def refresh_bookings(self):
-        """Refresh bookings display"""
-        if hasattr(self, 'booking_window'):
-            self.booking_window.load_bookings()
+    @timed_handler("open bookings tab")
+    def create_booking_tab(self):
+        """Build the My Bookings tab"""
+        self.booking_window = BookingWindow(self.booking_frame, self.current_user, self.data_service,
+                                            self.on_booking_cancelled)
+    
+    @timed_handler("open admin tab")
+    def create_admin_tab(self):
+        """Build the Admin Panel tab"""
+        self.admin_window = AdminPanel(self.admin_frame, self.current_user, self.data_service)
+    
+    def update_busy_indicator(self, busy_count):
+        """Show outstanding database work in the status bar"""
+        if not hasattr(self, 'status_bar') or not self.status_bar.winfo_exists():
+            return
+        
+        if busy_count:
+            self.status_bar.configure(text=f"Loading... ({busy_count} request(s) in progress)")
+            self.root.configure(cursor="watch")
+        else:
+            self.status_bar.configure(text=self.ready_text())
+            self.root.configure(cursor="")
+    
+    def ready_text(self):
+        """Idle status bar text with the UI responsiveness summary"""
+        summary = self.ui_monitor.summary()
+        return f"Ready  |  {summary}" if summary else "Ready"
+    
+    def update_ui_report(self):
+        """Refresh the responsiveness summary every few seconds while idle"""
+        if not hasattr(self, 'status_bar') or not self.status_bar.winfo_exists():
+            return
+        if not self.data_service.busy_count():
+            self.status_bar.configure(text=self.ready_text())
+        self.status_bar.after(2000, self.update_ui_report)
+    
+    def refresh_bookings(self, booked=None):
+        """Refresh bookings display after one booking write
+        
+        booked lists the (trip, booking) rows of every leg the write booked;
+        new bookings only add their own rows. None reloads the list.
+        """
+        if self.booking_window is not None:
+            if booked is None or any(booking is None for trip, booking in booked):
+                self.booking_window.load_bookings()
+            else:
+                for trip, booking in booked:
+                    self.booking_window.add_booking(booking)
+                # One write however many legs it booked
+                self.tabs.mark_patched(self.booking_frame)
+        
+        if booked and self.admin_window is not None:
+            self.admin_window.patch_trips([trip for trip, booking in booked if trip is not None])
+    
+    def on_booking_cancelled(self, trip):
+        """Return the cancelled seats to the trip rows on screen"""
+        # The My Bookings tab patched the cancelled row itself
+        self.tabs.mark_patched(self.booking_frame)
+        if trip is None:
+            return
+        
+        if self.search_window is not None:
+            self.search_window.patch_trip(trip)
+        if self.admin_window is not None:
+            self.admin_window.patch_trip(trip)
     
     def logout(self):
         """Logout user"""
-        confirmation = messagebox.askyesno("Confirm Logout", "Are you sure you want to logout?")
+        confirmation = dialogs.askyesno("Confirm Logout", "Are you sure you want to logout?")
         if confirmation:
             self.current_user = None
             self.show_login()
     
     def on_closing(self):
         """Handle application closing"""
-        if messagebox.askokcancel("Quit", "Do you want to quit the application?"):
+        if dialogs.askokcancel("Quit", "Do you want to quit the application?"):
+            self.ui_monitor.stop()
+            self.data_service.shutdown()
+            self.db.close()
             self.root.destroy()
     
     def run(self):
@@ -151,14 +243,14 @@ class TravelBookingApp:
         try:
             self.root.mainloop()
         except Exception as e:
-            messagebox.showerror("Error", f"Application error: {str(e)}")
+            dialogs.showerror("Error", f"Application error: {str(e)}")
             sys.exit(1)
 
 def main():
     """Main function"""
     # Check if running from correct directory
     if not os.path.exists('db.py'):
-        messagebox.showerror("Error", "Please run this application from the correct directory.")
+        dialogs.showerror("Error", "Please run this application from the correct directory.")
         sys.exit(1)
     
     # Create and run application
@@ -0,0 +1,122 @@
+import argparse
+import sys
+from datetime import date, timedelta
+
+import schema
+from db import DatabaseManager
+from trip_import import import_trip_file
+from data_export import export_bookings, export_trips
+
+def migrate(db, args):
+    """Bring the database schema up to date"""
+    # Opening the DatabaseManager already applied any pending migrations
+    print(f"Database schema is at version {schema.LATEST_VERSION}")
+    return True
+
+def rebuild_rollups(db, args):
+    """Recompute the report rollups from trips and bookings"""
+    success, message = db.rebuild_rollups()
+    print(message)
+    return success
+
+def checkpoint(db, args):
+    """Write the WAL back into the database file and truncate it"""
+    busy, wal_pages, checkpointed = db.checkpoint("TRUNCATE")
+    if busy:
+        print("Checkpoint incomplete: another connection is still reading or writing")
+        return False
+    print(f"Checkpointed {max(checkpointed, 0)} page(s)")
+    return True
+
+def import_trips(db, args):
+    """Import a CSV, JSON or NDJSON timetable"""
+    def progress(summary):
+        percent = 100 * summary['bytes_read'] / summary['total_bytes'] if summary['total_bytes'] else 100
+        print(f"\r{percent:5.1f}%  {summary['read']} read, {summary['imported']} imported, "
+              f"{summary['duplicates']} duplicates, {summary['rejected']} rejected", end='', flush=True)
+    
+    rejects_path = args.rejects or args.file + ".rejects.csv"
+    summary = import_trip_file(db, args.file, batch_size=args.batch_size,
+                               on_progress=None if args.quiet else progress, rejects_path=rejects_path)
+    if not args.quiet:
+        print()
+    
+    print(f"Imported {summary['imported']} of {summary['read']} rows "
+          f"({summary['duplicates']} duplicates skipped, {summary['rejected']} rejected)")
+    if summary['rejects_path']:
+        print(f"Rejected rows written to {summary['rejects_path']}")
+    return summary['rejected'] == 0
+
+def expand_schedules(db, args):
+    """Generate dated trips from the recurring schedules"""
+    start = date.today()
+    end = start + timedelta(days=args.days - 1)
+    success, message, created = db.expand_schedules(start.isoformat(), end.isoformat())
+    print(message)
+    return success
+
+def export_data(db, args):
+    """Stream bookings or trips to a .csv or .jsonl/.ndjson file"""
+    filters = {'start_date': args.start_date, 'end_date': args.end_date,
+               'source': args.source, 'destination': args.destination}
+    if args.command == 'export-bookings':
+        count = export_bookings(db, args.file, status=args.status, **filters)
+    else:
+        count = export_trips(db, args.file, mode=args.mode, **filters)
+    print(f"Exported {count} row(s) to {args.file}")
+    return True
+
+# Filters shared by the export commands
+EXPORT_ARGUMENTS = [
+    (('file',), {'help': "output file (.csv, .jsonl or .ndjson)"}),
+    (('--from',), {'dest': 'start_date', 'help': "first date, YYYY-MM-DD"}),
+    (('--to',), {'dest': 'end_date', 'help': "last date, YYYY-MM-DD"}),
+    (('--source',), {'help': "departure city"}),
+    (('--destination',), {'help': "arrival city"}),
+]
+
+# Maintenance commands: name -> (function, help text, arguments)
+COMMANDS = {
+    'migrate': (migrate, "apply pending schema migrations", []),
+    'rebuild-rollups': (rebuild_rollups, "recompute report rollups from existing bookings", []),
+    'checkpoint': (checkpoint, "write the WAL back into the database file", []),
+    'import-trips': (import_trips, "bulk-load trips from a .csv, .json or .jsonl/.ndjson file", [
+        (('file',), {'help': "timetable file"}),
+        (('--batch-size',), {'type': int, 'default': 5000, 'help': "rows per transaction (default: %(default)s)"}),
+        (('--rejects',), {'help': "where to write rejected rows (default: FILE.rejects.csv)"}),
+        (('--quiet',), {'action': 'store_true', 'help': "do not print progress"}),
+    ]),
+    'expand-schedules': (expand_schedules, "generate trips from recurring schedules", [
+        (('--days',), {'type': int, 'default': 90, 'help': "days ahead to generate, from today (default: %(default)s)"}),
+    ]),
+    'export-bookings': (export_data, "export bookings; dates filter the booking date", EXPORT_ARGUMENTS + [
+        (('--status',), {'choices': ('confirmed', 'cancelled', 'pending'), 'help': "booking status"}),
+    ]),
+    'export-trips': (export_data, "export trips; dates filter the travel date", EXPORT_ARGUMENTS + [
+        (('--mode',), {'choices': ('flight', 'train', 'bus'), 'help': "travel mode"}),
+    ]),
+}
+
+def main(argv=None):
+    """Run a maintenance command without starting the UI"""
+    parser = argparse.ArgumentParser(description="TravelBook maintenance commands")
+    parser.add_argument('--db', default="travel_booking.db", help="database file (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, (function, help_text, arguments) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        for flags, options in arguments:
+            subparser.add_argument(*flags, **options)
+    
+    args = parser.parse_args(argv)
+    db = DatabaseManager(args.db, storage="multiprocess")
+    try:
+        command = COMMANDS[args.command][0]
+        return 0 if command(db, args) else 1
+    except (ValueError, OSError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,236 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# PRAGMAs applied to every new pooled connection
+DEFAULT_PRAGMAS = {
+    'foreign_keys': 'ON',
+    'temp_store': 'MEMORY',
+}
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free in time"""
+
+class ConnectionPool:
+    def __init__(self, db_name, size=5, timeout=30.0, pragmas=None, statement_cache_size=128, busy_timeout=5.0,
+                 factory=None, on_connect=None):
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self.busy_timeout = busy_timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self.statement_cache_size = statement_cache_size
+        # sqlite3.Connection subclass to open, e.g. QueryMonitor.connection_factory
+        self.factory = factory or sqlite3.Connection
+        # Called with each new connection, e.g. to register SQL functions
+        self.on_connect = on_connect
+        
+        self._lock = threading.Condition()
+        self._idle = []
+        self._checked_out = {}
+        self._created = 0
+        self._closed = False
+        self._local = threading.local()
+        
+        # Pool statistics
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'leaks': 0,
+            'connections_created': 0,
+            # Time BEGIN IMMEDIATE/EXCLUSIVE spent waiting for another writer's lock
+            'write_transactions': 0,
+            'lock_wait_time': 0.0,
+            'max_lock_wait': 0.0,
+            'lock_timeouts': 0,
+        }
+    
+    def _create_connection(self):
+        """Open a new connection and apply the configured PRAGMAs"""
+        # Autocommit mode: transactions are opened explicitly by transaction().
+        # cached_statements keeps prepared statements alive for the connection's lifetime.
+        # timeout is SQLite's busy timeout: how long a statement waits on another writer's lock.
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+            factory=self.factory
+        )
+        for pragma, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        
+        self._stats['connections_created'] += 1
+        return conn
+    
+    def _reclaim_leaked(self):
+        """Reclaim connections still held by threads that have exited"""
+        for conn, (thread, _) in list(self._checked_out.items()):
+            if not thread.is_alive():
+                del self._checked_out[conn]
+                self._stats['leaks'] += 1
+                try:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    self._idle.append(conn)
+                except sqlite3.Error:
+                    conn.close()
+                    self._created -= 1
+    
+    def acquire(self, timeout=None):
+        """Check a connection out of the pool"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        wait_started = None
+        
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                
+                if self._created < self.size:
+                    conn = self._create_connection()
+                    self._created += 1
+                    break
+                
+                self._reclaim_leaked()
+                if self._idle:
+                    continue
+                
+                # Pool exhausted, wait for a connection to be released
+                if not waited:
+                    waited = True
+                    wait_started = time.monotonic()
+                    self._stats['waits'] += 1
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._stats['wait_time'] += time.monotonic() - wait_started
+                    raise PoolTimeout("Timed out waiting for a database connection")
+                self._lock.wait(remaining)
+            
+            if waited:
+                self._stats['wait_time'] += time.monotonic() - wait_started
+            self._stats['checkouts'] += 1
+            self._checked_out[conn] = (threading.current_thread(), time.monotonic())
+            return conn
+    
+    def release(self, conn):
+        """Return a connection to the pool"""
+        with self._lock:
+            if self._checked_out.pop(conn, None) is None:
+                return
+            
+            # Never hand out a connection with a half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+            
+            if self._closed:
+                conn.close()
+                self._created -= 1
+            else:
+                self._idle.append(conn)
+            self._lock.notify()
+    
+    def current(self):
+        """Return the connection held by the calling thread, if any"""
+        return getattr(self._local, 'conn', None)
+    
+    @contextmanager
+    def connection(self, shared=True):
+        """Context-managed checkout; nested use in one thread shares the connection
+        
+        Pass shared=False for a private connection that is not handed to other
+        code on this thread, e.g. to keep a cursor open while a generator is
+        suspended.
+        """
+        held = getattr(self._local, 'conn', None)
+        if shared and held is not None:
+            yield held
+            return
+        
+        conn = self.acquire()
+        if shared:
+            self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            if shared:
+                self._local.conn = None
+            self.release(conn)
+    
+    @contextmanager
+    def transaction(self, mode="DEFERRED"):
+        """Run a block in a transaction; commit on success, roll back on error"""
+        with self.connection() as conn:
+            # Nested transactions join the outer one
+            if conn.in_transaction:
+                yield conn
+                return
+            
+            self._begin(conn, mode)
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            else:
+                if conn.in_transaction:
+                    conn.commit()
+    
+    def _begin(self, conn, mode):
+        """Open a transaction, timing how long a write transaction waits for the lock"""
+        if mode == "DEFERRED":
+            conn.execute("BEGIN DEFERRED")
+            return
+        
+        started = time.monotonic()
+        timed_out = False
+        try:
+            conn.execute(f"BEGIN {mode}")
+        except sqlite3.OperationalError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.monotonic() - started
+            with self._lock:
+                self._stats['write_transactions'] += 1
+                self._stats['lock_wait_time'] += waited
+                self._stats['max_lock_wait'] = max(self._stats['max_lock_wait'], waited)
+                if timed_out:
+                    self._stats['lock_timeouts'] += 1
+    
+    def stats(self):
+        """Return a snapshot of pool statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._created
+            stats['in_use'] = len(self._checked_out)
+            stats['idle'] = len(self._idle)
+            return stats
+    
+    def close(self):
+        """Close idle connections; checked-out ones close when released"""
+        with self._lock:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._created -= len(self._idle)
+            self._idle = []
+            self._lock.notify_all()
\ No newline at end of file
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+class QueryCache:
+    """Thread-safe LRU cache with a time-to-live for query results
+    
+    Entries are dropped when they are older than ttl seconds, when more
+    than max_entries are held (least recently used first), or all at once
+    when invalidate() records that the underlying data changed. Cached
+    values are shared between callers and must not be modified.
+    """
+    def __init__(self, max_entries=256, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Bumped on every invalidation; a load that overlapped one is not stored
+        self._version = 0
+        
+        # Cache statistics
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+    
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            version = self._version
+        
+        # Load outside the lock so other threads keep hitting the cache
+        value = loader()
+        
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        return value
+    
+    def invalidate(self):
+        """Drop every entry because the data behind them changed"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+    
+    def stats(self):
+        """Return a snapshot of cache statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['version'] = self._version
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+            return stats
\ No newline at end of file
@@ -0,0 +1,409 @@
+import inspect
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Latency histogram bucket upper bounds in milliseconds; one more bucket holds anything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# DatabaseManager methods that are plumbing rather than operations
+UNMONITORED_METHODS = {
+    'get_connection', 'transaction', 'run_write', 'pool_stats', 'cache_stats', 'query_stats',
+    'add_trip_listener', 'remove_trip_listener', 'data_version', 'invalidate', 'storage_settings', 'checkpoint', 'close',
+    'init_database', 'hash_password',
+}
+
+# Statements EXPLAIN QUERY PLAN can describe
+EXPLAINABLE = re.compile(r'\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+# Runs of placeholders, as in "IN (?, ?, ?)", collapse so one statement is not counted per list length
+PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+WHITESPACE = re.compile(r'\s+')
+
+# Methods whose parameters (emails, names, password hashes) are never logged, even with log_params
+SENSITIVE_METHODS = {'login_user', 'register_user'}
+
+# Parameters kept per slow query, and characters kept per text parameter
+MAX_LOGGED_PARAMS = 20
+MAX_PARAM_LENGTH = 200
+
+def normalize_sql(sql):
+    """Statement text with whitespace and placeholder lists collapsed"""
+    return PLACEHOLDER_LIST.sub('?, ...', WHITESPACE.sub(' ', sql).strip())
+
+def full_scans(plan):
+    """Plan lines that read a whole table rather than seeking an index"""
+    return [detail for detail in plan
+            if detail.startswith('SCAN ') and ' USING ' not in detail and detail != 'SCAN CONSTANT ROW']
+
+def count_rows(result):
+    """Rows a DatabaseManager call handed back, judged by the shape of its result"""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result:
+        # (rows, next_cursor) pages; (success, message) writes return no rows
+        if isinstance(result[0], list):
+            return len(result[0])
+        if isinstance(result[0], bool):
+            return 0
+        return 1
+    if isinstance(result, (dict, int, float)) and not isinstance(result, bool):
+        return 1
+    return 0
+
+class LatencyStats:
+    """Call count, latency histogram and rows for one operation or statement"""
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    
+    def add(self, elapsed, rows=0, error=False):
+        self.calls += 1
+        self.errors += error
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.rows += rows
+        milliseconds = elapsed * 1000
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if milliseconds <= bound:
+                break
+        else:
+            index = len(LATENCY_BUCKETS_MS)
+        self.buckets[index] += 1
+    
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the percentile, in ms (the max for the open bucket)"""
+        if not self.calls:
+            return None
+        wanted = percent / 100 * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted and count:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return round(min(LATENCY_BUCKETS_MS[index], self.max * 1000), 3)
+                break
+        return round(self.max * 1000, 3)
+    
+    def snapshot(self):
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.calls, 3) if self.calls else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max * 1000, 3),
+            'rows': self.rows,
+            'histogram': dict(zip(labels, self.buckets)),
+        }
+
+class _Statement:
+    """One execution of a statement, timed across execute and every fetch"""
+    __slots__ = ('key', 'sql', 'params', 'method', 'elapsed', 'rows', 'started_at')
+    
+    def __init__(self, key, sql, params, method):
+        self.key = key
+        self.sql = sql
+        self.params = params
+        self.method = method
+        self.elapsed = 0.0
+        self.rows = 0
+        self.started_at = time.time()
+
+class MonitoredCursor(sqlite3.Cursor):
+    """Cursor that times its statement from execute until the last row is fetched"""
+    _statement = None
+    
+    def _start(self, sql, parameters, many=False):
+        self._finish()
+        self._statement = self.connection.monitor._start_statement(self.connection, sql, parameters, many)
+    
+    def _finish(self):
+        statement = self._statement
+        if statement is not None:
+            self._statement = None
+            self.connection.monitor._finish_statement(statement)
+    
+    def _timed(self, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            if self._statement is not None:
+                self._statement.elapsed += time.perf_counter() - started
+    
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._finish()
+        return self
+    
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, None, many=True)
+        self._timed(super().executemany, sql, seq_of_parameters)
+        if self._statement is not None:
+            self._statement.rows = max(self.rowcount, 0)
+        self._finish()
+        return self
+    
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._statement is not None:
+            self._statement.rows += 1
+        return row
+    
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if self._statement is not None:
+            self._statement.rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+    
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._statement is not None:
+            self._statement.rows += len(rows)
+        self._finish()
+        return rows
+    
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._statement is not None:
+            self._statement.rows += 1
+        return row
+    
+    def close(self):
+        self._finish()
+        super().close()
+    
+    def __del__(self):
+        # A statement read with a single fetchone() ends when its cursor is dropped
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class MonitoredConnection(sqlite3.Connection):
+    """Connection whose cursors report to a QueryMonitor; see QueryMonitor.connection_factory"""
+    monitor = None
+    
+    def cursor(self, factory=None):
+        return super().cursor(factory or MonitoredCursor)
+    
+    # The built-in shortcuts bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+class QueryMonitor:
+    """Thread-safe instrumentation for a DatabaseManager
+    
+    Pass one as DatabaseManager(monitor=...). Every public manager method
+    gets a call count, latency histogram and rows returned; every SQL
+    statement, grouped by its normalized text, gets the same, timed from
+    execute until its last row is fetched. Statements that take longer than
+    slow_threshold seconds go to a slow-query log with the method that ran
+    them, newest last, keeping slow_log_size entries. Their parameters are
+    redacted unless log_params is set, and always for SENSITIVE_METHODS. When explain is set, each distinct statement's EXPLAIN QUERY
+    PLAN is captured the first time it runs and full table scans flagged.
+    """
+    def __init__(self, slow_threshold=0.1, slow_log_size=200, explain=True, max_statements=500, log_params=False):
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        # Parameters can hold personal data, so the slow-query log only keeps them on request
+        self.log_params = log_params
+        self.max_statements = max_statements
+        # sqlite3.connect(factory=...) for connections that report to this monitor
+        self.connection_factory = type('MonitoredConnection', (MonitoredConnection,), {'monitor': self})
+        
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._methods = {}
+        # Normalized SQL -> {'stats', 'plan', 'full_scans'}
+        self._statements = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._started_at = time.time()
+    
+    def attach(self, db):
+        """Wrap the public methods of one DatabaseManager instance"""
+        for name, method in inspect.getmembers(db, inspect.ismethod):
+            if name.startswith('_') or name in UNMONITORED_METHODS:
+                continue
+            setattr(db, name, self._wrap(name, method))
+    
+    def _wrap(self, name, method):
+        def monitored(*args, **kwargs):
+            previous = getattr(self._local, 'method', None)
+            self._local.method = name
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                self._record_call(name, time.perf_counter() - started, 0, error=True)
+                raise
+            finally:
+                self._local.method = previous
+            elapsed = time.perf_counter() - started
+            
+            if inspect.isgenerator(result):
+                return self._stream(name, result, elapsed)
+            self._record_call(name, elapsed, count_rows(result))
+            return result
+        
+        monitored.__name__ = name
+        monitored.__doc__ = method.__doc__
+        monitored.__wrapped__ = method
+        return monitored
+    
+    def _stream(self, name, rows, elapsed):
+        """Pass a streaming method's rows through, timing only the time spent producing them"""
+        count = 0
+        error = False
+        try:
+            while True:
+                previous = getattr(self._local, 'method', None)
+                self._local.method = name
+                started = time.perf_counter()
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - started
+                    self._local.method = previous
+                count += 1
+                yield row
+        except Exception:
+            error = True
+            raise
+        finally:
+            rows.close()
+            self._record_call(name, elapsed, count, error)
+    
+    def _record_call(self, name, elapsed, rows, error=False):
+        with self._lock:
+            stats = self._methods.get(name)
+            if stats is None:
+                stats = self._methods[name] = LatencyStats()
+            stats.add(elapsed, rows, error)
+    
+    def _start_statement(self, conn, sql, parameters, many):
+        key = normalize_sql(sql)
+        with self._lock:
+            known = key in self._statements
+            if not known and len(self._statements) >= self.max_statements:
+                # Past the limit new statements share one entry and are not explained
+                key = '(other statements)'
+                known = key in self._statements
+        if not known:
+            plan = self._explain(conn, sql, parameters) if self.explain and not many else None
+            with self._lock:
+                self._statements.setdefault(key, {
+                    'stats': LatencyStats(),
+                    'plan': plan,
+                    'full_scans': full_scans(plan) if plan else [],
+                })
+        
+        method = getattr(self._local, 'method', None)
+        if many:
+            params = "(executemany)"
+        elif not self.log_params or method in SENSITIVE_METHODS:
+            params = "(redacted)"
+        elif isinstance(parameters, dict):
+            params = {name: self._loggable(value) for name, value in list(parameters.items())[:MAX_LOGGED_PARAMS]}
+        else:
+            params = [self._loggable(value) for value in list(parameters)[:MAX_LOGGED_PARAMS]]
+        return _Statement(key, sql, params, method)
+    
+    def _loggable(self, value):
+        if isinstance(value, str) and len(value) > MAX_PARAM_LENGTH:
+            return value[:MAX_PARAM_LENGTH] + '...'
+        if isinstance(value, bytes):
+            return f"<{len(value)} bytes>"
+        return value
+    
+    def _explain(self, conn, sql, parameters):
+        """EXPLAIN QUERY PLAN details for a statement, or None when it cannot be explained"""
+        if not EXPLAINABLE.match(sql):
+            return None
+        try:
+            # A plain cursor, so explaining is not itself recorded
+            rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        except sqlite3.Error:
+            return None
+        return [row[3] for row in rows]
+    
+    def _finish_statement(self, statement):
+        with self._lock:
+            entry = self._statements.get(statement.key)
+            if entry is not None:
+                entry['stats'].add(statement.elapsed, statement.rows)
+            if statement.elapsed >= self.slow_threshold:
+                self._slow.append({
+                    'time': datetime.fromtimestamp(statement.started_at).strftime('%Y-%m-%d %H:%M:%S'),
+                    'elapsed_ms': round(statement.elapsed * 1000, 3),
+                    'rows': statement.rows,
+                    'method': statement.method,
+                    'sql': normalize_sql(statement.sql),
+                    'params': statement.params,
+                    'full_scans': entry['full_scans'] if entry else [],
+                })
+    
+    def snapshot(self):
+        """Return the collected statistics as plain data
+        
+        methods maps method names to their stats; statements lists each
+        statement's stats with its query plan and flagged full scans, most
+        total time first; slow_queries is the slow-query log, oldest first.
+        """
+        with self._lock:
+            methods = {name: stats.snapshot() for name, stats in sorted(self._methods.items())}
+            statements = [dict(entry['stats'].snapshot(), sql=key, plan=entry['plan'], full_scans=entry['full_scans'])
+                          for key, entry in self._statements.items()]
+            slow = list(self._slow)
+        statements.sort(key=lambda statement: statement['total_ms'], reverse=True)
+        return {
+            'since': datetime.fromtimestamp(self._started_at).strftime('%Y-%m-%d %H:%M:%S'),
+            'slow_threshold_ms': self.slow_threshold * 1000,
+            'methods': methods,
+            'statements': statements,
+            'slow_queries': slow,
+        }
+    
+    def reset(self):
+        """Forget everything collected so far; captured query plans are kept"""
+        with self._lock:
+            self._methods = {}
+            for entry in self._statements.values():
+                entry['stats'] = LatencyStats()
+            self._slow.clear()
+            self._started_at = time.time()
+    
+    def dump(self, path, **sections):
+        """Write the snapshot, plus any extra sections (e.g. pool stats), to a JSON file"""
+        report = self.snapshot()
+        report.update(sections)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+        return report
\ No newline at end of file
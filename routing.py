@@ -0,0 +1,272 @@
+import bisect
+import heapq
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date as Date
+from schema import city_key
+
+# Ranking used by ConnectionIndex.search
+OBJECTIVES = ('cheapest', 'fastest', 'fewest_transfers')
+
+MINUTES_PER_DAY = 24 * 60
+
+# One itinerary: legs are trip rows (TRIP_COLUMNS order) taken one after another.
+# key joins the trip IDs so the row can sit in a VirtualTreeview next to single trips;
+# price is per passenger, duration in minutes from first departure to last arrival.
+Connection = namedtuple('Connection', 'key legs price duration arrival_date seats')
+
+# A bookable trip as the search sees it; times are minutes since 0001-01-01
+Leg = namedtuple('Leg', 'departs arrives trip_id source destination price mode seats row')
+
+def make_leg(trip):
+    """Turn a trip row into a Leg; None if its date or times are unusable"""
+    trip_id, source, destination, day, price, mode, duration, departure, arrival, seats, created_at = trip
+    if duration is None or departure is None:
+        return None
+    try:
+        departs = Date.fromisoformat(day).toordinal() * MINUTES_PER_DAY + departure
+    except ValueError:
+        return None
+    return Leg(departs, departs + duration, trip_id, city_key(source), city_key(destination),
+               price, mode, seats, trip)
+
+class ConnectionIndex:
+    """In-memory departure index for multi-leg connection searches
+    
+    Trips are loaded a travel day at a time, when a search first needs that
+    day, into per-day, per-city lists sorted by departure. A search is a
+    Dijkstra-style walk over this time-expanded graph: each trip is a node,
+    and a trip leads to every later departure from its destination that
+    leaves at least min_layover minutes after it arrives.
+    
+    The index follows writes incrementally: register trips_changed with
+    DatabaseManager.add_trip_listener and the trips it names are re-read
+    and re-filed before the next search, so new trips appear and sold-out
+    ones drop out without reloading whole days. Days are dropped when more
+    than max_days are loaded, least recently used first, and reloaded after
+    max_age seconds to pick up writes made by other processes.
+    """
+    def __init__(self, db, window_days=2, max_days=60, max_age=300.0):
+        self.db = db
+        self.window_days = window_days
+        self.max_days = max_days
+        self.max_age = max_age
+        
+        self._lock = threading.Lock()
+        # Loaded day ordinal -> load time, least recently used first
+        self._days = OrderedDict()
+        # Day ordinal -> {source city -> sorted [(departs, trip_id)]}
+        self._departures = {}
+        self._legs = {}
+        # Trip IDs written since they were loaded; None when every day must be reloaded
+        self._pending = set()
+        
+        # Index statistics
+        self._stats = {
+            'searches': 0,
+            'days_loaded': 0,
+            'trips_updated': 0,
+            'reloads': 0,
+        }
+    
+    def trips_changed(self, trip_ids=None):
+        """Note that trips were written; None means any trip may have changed"""
+        with self._lock:
+            if trip_ids is None or self._pending is None:
+                self._pending = None
+            else:
+                self._pending.update(trip_ids)
+    
+    def stats(self):
+        """Return a snapshot of index statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['days'] = len(self._days)
+            stats['trips'] = len(self._legs)
+            return stats
+    
+    def _add_leg(self, leg):
+        day = leg.departs // MINUTES_PER_DAY
+        if day not in self._days or leg.seats <= 0:
+            return
+        self._legs[leg.trip_id] = leg
+        bisect.insort(self._departures[day].setdefault(leg.source, []), (leg.departs, leg.trip_id))
+    
+    def _remove_leg(self, trip_id):
+        leg = self._legs.pop(trip_id, None)
+        if leg is None:
+            return
+        departures = self._departures[leg.departs // MINUTES_PER_DAY][leg.source]
+        del departures[bisect.bisect_left(departures, (leg.departs, leg.trip_id))]
+    
+    def _drop_day(self, day):
+        for departures in self._departures.pop(day, {}).values():
+            for departs, trip_id in departures:
+                del self._legs[trip_id]
+        self._days.pop(day, None)
+    
+    def _apply_pending(self):
+        """Re-read the trips written since the last search"""
+        if self._pending is None:
+            for day in list(self._days):
+                self._drop_day(day)
+            self._pending = set()
+            self._stats['reloads'] += 1
+            return
+        if not self._pending:
+            return
+        
+        trip_ids = list(self._pending)
+        self._pending = set()
+        for trip_id in trip_ids:
+            self._remove_leg(trip_id)
+        for trip in self.db.get_trips(trip_ids):
+            leg = make_leg(trip)
+            if leg is not None:
+                self._add_leg(leg)
+        self._stats['trips_updated'] += len(trip_ids)
+    
+    def _load_days(self, first_day, last_day):
+        """Make sure every day in the range is loaded and fresh"""
+        now = time.monotonic()
+        missing = []
+        for day in range(first_day, last_day + 1):
+            loaded_at = self._days.get(day)
+            if loaded_at is not None and now - loaded_at > self.max_age:
+                self._drop_day(day)
+                loaded_at = None
+            if loaded_at is None:
+                missing.append(day)
+            else:
+                self._days.move_to_end(day)
+        
+        if missing:
+            for day in missing:
+                self._days[day] = now
+                self._departures[day] = {}
+            # One query covering all missing days; days already loaded are skipped
+            start, end = Date.fromordinal(missing[0]).isoformat(), Date.fromordinal(missing[-1]).isoformat()
+            for trip in self.db.iter_all_trips(batch_size=1000, start_date=start, end_date=end):
+                if trip[0] in self._legs:
+                    continue
+                leg = make_leg(trip)
+                if leg is not None:
+                    self._add_leg(leg)
+            self._stats['days_loaded'] += len(missing)
+        
+        while len(self._days) > max(self.max_days, last_day - first_day + 1):
+            self._drop_day(next(iter(self._days)))
+    
+    def _departures_between(self, city, earliest, latest):
+        """Yield legs leaving a city between two times, in departure order"""
+        for day in range(earliest // MINUTES_PER_DAY, latest // MINUTES_PER_DAY + 1):
+            departures = self._departures.get(day, {}).get(city)
+            if not departures:
+                continue
+            start = bisect.bisect_left(departures, (earliest,))
+            end = bisect.bisect_right(departures, (latest, float('inf')))
+            for departs, trip_id in departures[start:end]:
+                yield self._legs[trip_id]
+    
+    def search(self, source, destination, date, objective='cheapest', min_layover=60, max_layover=24 * 60,
+               passengers=1, mode=None, max_legs=3, limit=10):
+        """Find itineraries from source to destination leaving on date
+        
+        objective ranks them: 'cheapest' by total price, 'fastest' by time
+        from first departure to last arrival, 'fewest_transfers' by number
+        of legs; the other two break ties. Each leg needs passengers free
+        seats and, when given, the travel mode. Returns up to limit
+        Connection tuples, best first, each ending with a different trip.
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+        origin = city_key(source)
+        target = city_key(destination)
+        first_day = Date.fromisoformat(date).toordinal()
+        last_day = first_day + self.window_days
+        latest = (last_day + 1) * MINUTES_PER_DAY - 1
+        
+        def rank(price, elapsed, legs):
+            if objective == 'cheapest':
+                return price, elapsed, legs
+            if objective == 'fastest':
+                return elapsed, price, legs
+            return legs, elapsed, price
+        
+        def usable(leg):
+            return leg.seats >= passengers and (mode is None or leg.mode == mode)
+        
+        with self._lock:
+            self._stats['searches'] += 1
+            self._apply_pending()
+            self._load_days(first_day, last_day)
+            
+            # Labels: (rank, tie-breaker, leg, legs so far, start time, price so far, previous label)
+            heap = []
+            counter = 0
+            for leg in self._departures_between(origin, first_day * MINUTES_PER_DAY,
+                                                (first_day + 1) * MINUTES_PER_DAY - 1):
+                if usable(leg):
+                    counter += 1
+                    heap.append((rank(leg.price, leg.arrives - leg.departs, 1), counter, leg, 1, leg.departs,
+                                 leg.price, None))
+            heapq.heapify(heap)
+            
+            settled = set()
+            # Final trips already returned; the best itinerary ending with a trip is popped first
+            arrived = set()
+            results = []
+            while heap and len(results) < limit:
+                label = heapq.heappop(heap)
+                _, _, leg, count, start, price, previous = label
+                if (leg.trip_id, count) in settled:
+                    continue
+                settled.add((leg.trip_id, count))
+                
+                if leg.destination == target:
+                    if leg.trip_id not in arrived:
+                        arrived.add(leg.trip_id)
+                        results.append(self._connection(label))
+                    continue
+                if count >= max_legs:
+                    continue
+                
+                # Cities already on this itinerary are not visited again
+                visited = {origin}
+                step = label
+                while step is not None:
+                    visited.add(step[2].destination)
+                    step = step[6]
+                
+                earliest = leg.arrives + min_layover
+                for next_leg in self._departures_between(leg.destination, earliest,
+                                                         min(leg.arrives + max_layover, latest)):
+                    if next_leg.destination in visited:
+                        continue
+                    if not usable(next_leg) or (next_leg.trip_id, count + 1) in settled:
+                        continue
+                    counter += 1
+                    total = price + next_leg.price
+                    heapq.heappush(heap, (rank(total, next_leg.arrives - start, count + 1), counter, next_leg,
+                                          count + 1, start, total, label))
+            return results
+    
+    def _connection(self, label):
+        """Build the Connection ending at a label"""
+        legs = []
+        step = label
+        while step is not None:
+            legs.append(step[2])
+            step = step[6]
+        legs.reverse()
+        
+        _, _, last, count, start, price, _ = label
+        return Connection(
+            key='+'.join(str(leg.trip_id) for leg in legs),
+            legs=tuple(leg.row for leg in legs),
+            price=price,
+            duration=last.arrives - start,
+            arrival_date=Date.fromordinal(last.arrives // MINUTES_PER_DAY).isoformat(),
+            seats=min(leg.seats for leg in legs)
+        )
\ No newline at end of file
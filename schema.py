@@ -0,0 +1,644 @@
+import hashlib
+import string
+
+# Sample data loaded once by the seeding migration
+SAMPLE_TRIPS = [
+    ('Delhi', 'Mumbai', '2025-01-25', 5500.0, 'flight', '2h 15m', '06:00', '08:15', 45),
+    ('Delhi', 'Mumbai', '2025-01-25', 1200.0, 'train', '16h 30m', '22:30', '15:00', 120),
+    ('Mumbai', 'Bangalore', '2025-01-26', 4200.0, 'flight', '1h 45m', '14:30', '16:15', 30),
+    ('Delhi', 'Bangalore', '2025-01-27', 800.0, 'bus', '24h 00m', '20:00', '20:00', 25),
+    ('Chennai', 'Kolkata', '2025-01-28', 6200.0, 'flight', '2h 30m', '09:15', '11:45', 60),
+    ('Bangalore', 'Chennai', '2025-01-29', 3800.0, 'flight', '1h 30m', '11:00', '12:30', 50),
+    ('Mumbai', 'Delhi', '2025-01-30', 5200.0, 'flight', '2h 10m', '16:45', '18:55', 40),
+    ('Kolkata', 'Delhi', '2025-01-31', 900.0, 'train', '17h 15m', '18:30', '11:45', 100)
+]
+
+# SQLite's built-in LOWER() only folds ASCII letters
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def city_key(name):
+    """Search form of a city name, exactly as the triggers' LOWER(TRIM(name)) stores it
+    
+    Only spaces are trimmed and only ASCII letters are lowercased, so a
+    search term folds to the same key as the stored name whichever writer
+    inserted the row.
+    """
+    if name is None:
+        return None
+    return str(name).strip(' ').translate(ASCII_LOWER)
+
+def register_functions(conn):
+    """Register the SQL functions older migrations rely on (city_key, used by migration 10)"""
+    conn.create_function('city_key', 1, city_key, deterministic=True)
+
+def create_tables(cursor):
+    """Create the base users, trips and bookings tables"""
+    # Create users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            is_admin BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create trips table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trips (
+            trip_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            date DATE NOT NULL,
+            price REAL NOT NULL,
+            mode TEXT NOT NULL CHECK(mode IN ('flight', 'train', 'bus')),
+            duration TEXT NOT NULL,
+            departure_time TEXT NOT NULL,
+            arrival_time TEXT NOT NULL,
+            available_seats INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create bookings table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            trip_id INTEGER NOT NULL,
+            passengers INTEGER DEFAULT 1,
+            total_amount REAL NOT NULL,
+            booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'confirmed' CHECK(status IN ('confirmed', 'cancelled', 'pending')),
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            FOREIGN KEY (trip_id) REFERENCES trips (trip_id)
+        )
+    ''')
+
+def dedupe_trips(cursor):
+    """Merge duplicate trips left behind by repeated sample seeding"""
+    # Map every duplicate onto the oldest trip with the same service key
+    cursor.execute('''
+        CREATE TEMP TABLE trip_duplicates AS
+        SELECT t.trip_id AS dup_id, k.keep_id
+        FROM trips t
+        JOIN (
+            SELECT MIN(trip_id) AS keep_id, source, destination, date, mode, departure_time
+            FROM trips
+            GROUP BY source, destination, date, mode, departure_time
+            HAVING COUNT(*) > 1
+        ) k ON t.source = k.source AND t.destination = k.destination AND t.date = k.date
+           AND t.mode = k.mode AND t.departure_time = k.departure_time
+        WHERE t.trip_id != k.keep_id
+    ''')
+    
+    # Seats sold on a duplicate are taken from the surviving trip
+    cursor.execute('''
+        UPDATE trips SET available_seats = MAX(0, available_seats - (
+            SELECT COALESCE(SUM(b.passengers), 0)
+            FROM bookings b
+            JOIN trip_duplicates d ON b.trip_id = d.dup_id
+            WHERE d.keep_id = trips.trip_id AND b.status = 'confirmed'
+        ))
+        WHERE trip_id IN (SELECT keep_id FROM trip_duplicates)
+    ''')
+    
+    cursor.execute('''
+        UPDATE bookings SET trip_id = (
+            SELECT keep_id FROM trip_duplicates WHERE dup_id = bookings.trip_id
+        )
+        WHERE trip_id IN (SELECT dup_id FROM trip_duplicates)
+    ''')
+    
+    cursor.execute("DELETE FROM trips WHERE trip_id IN (SELECT dup_id FROM trip_duplicates)")
+    cursor.execute("DROP TABLE trip_duplicates")
+    
+    # Give INSERT OR IGNORE a key to ignore on
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_trips_service
+        ON trips (source, destination, date, mode, departure_time)
+    ''')
+
+def seed_sample_data(cursor):
+    """Insert the sample admin user and trips"""
+    # Same hashing scheme as DatabaseManager.hash_password
+    admin_password = hashlib.sha256('admin123'.encode()).hexdigest()
+    cursor.execute('''
+        INSERT OR IGNORE INTO users (name, email, password, is_admin)
+        VALUES ('Admin User', 'admin@travel.com', ?, 1)
+    ''', (admin_password,))
+    
+    cursor.executemany('''
+        INSERT OR IGNORE INTO trips
+        (source, destination, date, price, mode, duration, departure_time, arrival_time, available_seats)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', SAMPLE_TRIPS)
+
+def add_search_indexes(cursor):
+    """Add case-folded city columns and the indexes used by trip and booking lookups"""
+    cursor.execute("ALTER TABLE trips ADD COLUMN source_key TEXT")
+    cursor.execute("ALTER TABLE trips ADD COLUMN destination_key TEXT")
+    cursor.execute("UPDATE trips SET source_key = LOWER(TRIM(source)), destination_key = LOWER(TRIM(destination))")
+    
+    # Keep the folded columns in step with every writer, not just DatabaseManager
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_trips_city_keys_insert
+        AFTER INSERT ON trips
+        BEGIN
+            UPDATE trips SET source_key = LOWER(TRIM(NEW.source)), destination_key = LOWER(TRIM(NEW.destination))
+            WHERE trip_id = NEW.trip_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_trips_city_keys_update
+        AFTER UPDATE OF source, destination ON trips
+        BEGIN
+            UPDATE trips SET source_key = LOWER(TRIM(NEW.source)), destination_key = LOWER(TRIM(NEW.destination))
+            WHERE trip_id = NEW.trip_id;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_route
+        ON trips (source_key, destination_key, date, mode)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_destination
+        ON trips (destination_key, date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_schedule
+        ON trips (date, departure_time)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_user
+        ON bookings (user_id, booking_date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_trip
+        ON bookings (trip_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_date
+        ON bookings (booking_date)
+    ''')
+
+def rebuild_table(cursor, table, create_sql, select_sql):
+    """Recreate a table with a new definition, keeping its rows, indexes and triggers
+    
+    SQLite cannot add constraints with ALTER TABLE, so the table is copied into
+    a new definition. create_sql must create "<table>_new"; select_sql supplies
+    its rows. Foreign keys must be off (migrate() takes care of that).
+    """
+    cursor.execute('''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''', (table,))
+    dependents = [row[0] for row in cursor.fetchall()]
+    
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+    sequence = cursor.fetchone()
+    
+    cursor.execute(create_sql)
+    cursor.execute(f"INSERT INTO {table}_new {select_sql}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    
+    # Keep AUTOINCREMENT from reusing ids of rows deleted before the rebuild
+    if sequence:
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+    
+    for sql in dependents:
+        cursor.execute(sql)
+
+def add_seat_check(cursor):
+    """Rebuild trips with a CHECK that available seats never go negative"""
+    rebuild_table(cursor, "trips", '''
+        CREATE TABLE trips_new (
+            trip_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            date DATE NOT NULL,
+            price REAL NOT NULL,
+            mode TEXT NOT NULL CHECK(mode IN ('flight', 'train', 'bus')),
+            duration TEXT NOT NULL,
+            departure_time TEXT NOT NULL,
+            arrival_time TEXT NOT NULL,
+            available_seats INTEGER NOT NULL CHECK(available_seats >= 0),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            source_key TEXT,
+            destination_key TEXT
+        )
+    ''', '''
+        SELECT trip_id, source, destination, date, price, mode, duration, departure_time,
+               arrival_time, MAX(available_seats, 0), created_at, source_key, destination_key
+        FROM trips
+    ''')
+
+def rebuild_rollups(cursor):
+    """Recompute trip_rollups from the trips and bookings tables"""
+    cursor.execute("DELETE FROM trip_rollups")
+    cursor.execute('''
+        INSERT INTO trip_rollups (date, source, destination, mode, trips, available_seats, bookings, passengers, revenue)
+        SELECT t.date, t.source, t.destination, t.mode, COUNT(*), SUM(t.available_seats),
+               COALESCE(SUM(b.bookings), 0), COALESCE(SUM(b.passengers), 0), COALESCE(SUM(b.revenue), 0)
+        FROM trips t
+        LEFT JOIN (
+            SELECT trip_id, COUNT(*) AS bookings, SUM(passengers) AS passengers, SUM(total_amount) AS revenue
+            FROM bookings
+            WHERE status = 'confirmed'
+            GROUP BY trip_id
+        ) b ON b.trip_id = t.trip_id
+        GROUP BY t.date, t.source, t.destination, t.mode
+    ''')
+
+def add_rollups(cursor):
+    """Add per day, route and mode totals kept current by triggers"""
+    # One row per travel date, route and mode; the row count follows the
+    # timetable, not the number of bookings
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trip_rollups (
+            date DATE NOT NULL,
+            source TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            trips INTEGER NOT NULL DEFAULT 0,
+            available_seats INTEGER NOT NULL DEFAULT 0,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            passengers INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, source, destination, mode)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Every trip owns a share of exactly one rollup row
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_trip_insert
+        AFTER INSERT ON trips
+        BEGIN
+            INSERT INTO trip_rollups (date, source, destination, mode, trips, available_seats)
+            VALUES (NEW.date, NEW.source, NEW.destination, NEW.mode, 1, NEW.available_seats)
+            ON CONFLICT (date, source, destination, mode) DO UPDATE SET
+                trips = trips + 1,
+                available_seats = available_seats + excluded.available_seats;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_trip_delete
+        AFTER DELETE ON trips
+        BEGIN
+            UPDATE trip_rollups SET trips = trips - 1, available_seats = available_seats - OLD.available_seats
+            WHERE (date, source, destination, mode) = (OLD.date, OLD.source, OLD.destination, OLD.mode);
+            DELETE FROM trip_rollups
+            WHERE trips = 0 AND (date, source, destination, mode) = (OLD.date, OLD.source, OLD.destination, OLD.mode);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_trip_seats
+        AFTER UPDATE OF available_seats ON trips
+        WHEN (OLD.date, OLD.source, OLD.destination, OLD.mode) IS (NEW.date, NEW.source, NEW.destination, NEW.mode)
+        BEGIN
+            UPDATE trip_rollups SET available_seats = available_seats + NEW.available_seats - OLD.available_seats
+            WHERE (date, source, destination, mode) = (NEW.date, NEW.source, NEW.destination, NEW.mode);
+        END
+    ''')
+    
+    # A trip moved to another date, route or mode takes its seats and bookings along
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_trip_move
+        AFTER UPDATE OF date, source, destination, mode ON trips
+        WHEN (OLD.date, OLD.source, OLD.destination, OLD.mode) IS NOT (NEW.date, NEW.source, NEW.destination, NEW.mode)
+        BEGIN
+            UPDATE trip_rollups SET
+                trips = trips - 1,
+                available_seats = available_seats - OLD.available_seats,
+                bookings = bookings - (SELECT COUNT(*) FROM bookings WHERE trip_id = OLD.trip_id AND status = 'confirmed'),
+                passengers = passengers - (SELECT COALESCE(SUM(passengers), 0) FROM bookings WHERE trip_id = OLD.trip_id AND status = 'confirmed'),
+                revenue = revenue - (SELECT COALESCE(SUM(total_amount), 0) FROM bookings WHERE trip_id = OLD.trip_id AND status = 'confirmed')
+            WHERE (date, source, destination, mode) = (OLD.date, OLD.source, OLD.destination, OLD.mode);
+            DELETE FROM trip_rollups
+            WHERE trips = 0 AND (date, source, destination, mode) = (OLD.date, OLD.source, OLD.destination, OLD.mode);
+            
+            INSERT INTO trip_rollups (date, source, destination, mode, trips, available_seats, bookings, passengers, revenue)
+            SELECT NEW.date, NEW.source, NEW.destination, NEW.mode, 1, NEW.available_seats,
+                   COUNT(*), COALESCE(SUM(passengers), 0), COALESCE(SUM(total_amount), 0)
+            FROM bookings
+            WHERE trip_id = NEW.trip_id AND status = 'confirmed'
+            ON CONFLICT (date, source, destination, mode) DO UPDATE SET
+                trips = trips + 1,
+                available_seats = available_seats + excluded.available_seats,
+                bookings = bookings + excluded.bookings,
+                passengers = passengers + excluded.passengers,
+                revenue = revenue + excluded.revenue;
+        END
+    ''')
+    
+    # Only confirmed bookings count towards passengers and revenue
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_booking_insert
+        AFTER INSERT ON bookings
+        WHEN NEW.status = 'confirmed'
+        BEGIN
+            UPDATE trip_rollups SET
+                bookings = bookings + 1,
+                passengers = passengers + NEW.passengers,
+                revenue = revenue + NEW.total_amount
+            WHERE (date, source, destination, mode) = (
+                SELECT date, source, destination, mode FROM trips WHERE trip_id = NEW.trip_id
+            );
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_booking_update
+        AFTER UPDATE OF trip_id, status, passengers, total_amount ON bookings
+        BEGIN
+            UPDATE trip_rollups SET
+                bookings = bookings - 1,
+                passengers = passengers - OLD.passengers,
+                revenue = revenue - OLD.total_amount
+            WHERE OLD.status = 'confirmed' AND (date, source, destination, mode) = (
+                SELECT date, source, destination, mode FROM trips WHERE trip_id = OLD.trip_id
+            );
+            
+            UPDATE trip_rollups SET
+                bookings = bookings + 1,
+                passengers = passengers + NEW.passengers,
+                revenue = revenue + NEW.total_amount
+            WHERE NEW.status = 'confirmed' AND (date, source, destination, mode) = (
+                SELECT date, source, destination, mode FROM trips WHERE trip_id = NEW.trip_id
+            );
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_booking_delete
+        AFTER DELETE ON bookings
+        WHEN OLD.status = 'confirmed'
+        BEGIN
+            UPDATE trip_rollups SET
+                bookings = bookings - 1,
+                passengers = passengers - OLD.passengers,
+                revenue = revenue - OLD.total_amount
+            WHERE (date, source, destination, mode) = (
+                SELECT date, source, destination, mode FROM trips WHERE trip_id = OLD.trip_id
+            );
+        END
+    ''')
+    
+    rebuild_rollups(cursor)
+
+def add_schedules(cursor):
+    """Add recurring schedules and link the trips generated from them"""
+    # days_of_week is a bitmask, Monday = 1 through Sunday = 64
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedules (
+            schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            mode TEXT NOT NULL CHECK(mode IN ('flight', 'train', 'bus')),
+            price REAL NOT NULL CHECK(price > 0),
+            duration TEXT NOT NULL,
+            departure_time TEXT NOT NULL,
+            arrival_time TEXT NOT NULL,
+            seats INTEGER NOT NULL CHECK(seats > 0),
+            days_of_week INTEGER NOT NULL CHECK(days_of_week BETWEEN 1 AND 127),
+            valid_from DATE NOT NULL,
+            valid_to DATE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CHECK(valid_to >= valid_from)
+        )
+    ''')
+    
+    cursor.execute("ALTER TABLE trips ADD COLUMN schedule_id INTEGER REFERENCES schedules (schedule_id)")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_schedule_id
+        ON trips (schedule_id, date)
+    ''')
+
+def minute_of_day_sql(column):
+    """SQL for the minute after midnight of an 'HH:MM' column"""
+    return f"(CAST({column} AS INTEGER) * 60 + CAST(substr({column}, instr({column}, ':') + 1) AS INTEGER))"
+
+def duration_minutes_sql(duration, departure, arrival):
+    """SQL for the minutes in a '2h 15m' duration column
+    
+    Falls back to the arrival time less the departure time, wrapping past
+    midnight, when the duration holds no minutes.
+    """
+    parsed = (
+        f"CASE WHEN instr(lower({duration}), 'h') "
+        f"THEN CAST({duration} AS INTEGER) * 60 + CAST(trim(substr({duration}, instr(lower({duration}), 'h') + 1)) AS INTEGER) "
+        f"ELSE CAST({duration} AS INTEGER) END"
+    )
+    wrapped = f"({minute_of_day_sql(arrival)} - {minute_of_day_sql(departure)} + 1440) % 1440"
+    return f"COALESCE(NULLIF({parsed}, 0), NULLIF({wrapped}, 0), 1440)"
+
+def trip_times_sql(row):
+    """SQL assignments for the integer time columns from the text ones of row ('' or 'NEW.')"""
+    return (
+        f"departure_minute = {minute_of_day_sql(row + 'departure_time')}, "
+        f"arrival_minute = {minute_of_day_sql(row + 'arrival_time')}, "
+        f"duration_minutes = {duration_minutes_sql(row + 'duration', row + 'departure_time', row + 'arrival_time')}"
+    )
+
+def add_time_columns(cursor):
+    """Add integer minute and epoch columns for trip times and booking dates"""
+    cursor.execute("ALTER TABLE trips ADD COLUMN departure_minute INTEGER")
+    cursor.execute("ALTER TABLE trips ADD COLUMN arrival_minute INTEGER")
+    cursor.execute("ALTER TABLE trips ADD COLUMN duration_minutes INTEGER")
+    cursor.execute("ALTER TABLE bookings ADD COLUMN booking_epoch INTEGER")
+    
+    cursor.execute(f"UPDATE trips SET {trip_times_sql('')}")
+    cursor.execute("UPDATE bookings SET booking_epoch = CAST(strftime('%s', booking_date) AS INTEGER)")
+    
+    # One trigger fills the city keys and the times, so an insert costs one extra update, not two
+    cursor.execute("DROP TRIGGER IF EXISTS trg_trips_city_keys_insert")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_trips_derived_insert
+        AFTER INSERT ON trips
+        BEGIN
+            UPDATE trips SET source_key = LOWER(TRIM(NEW.source)), destination_key = LOWER(TRIM(NEW.destination)),
+                {trip_times_sql('NEW.')}
+            WHERE trip_id = NEW.trip_id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_trips_times_update
+        AFTER UPDATE OF departure_time, arrival_time, duration ON trips
+        BEGIN
+            UPDATE trips SET {trip_times_sql('NEW.')}
+            WHERE trip_id = NEW.trip_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_epoch_insert
+        AFTER INSERT ON bookings
+        BEGIN
+            UPDATE bookings SET booking_epoch = CAST(strftime('%s', NEW.booking_date) AS INTEGER)
+            WHERE booking_id = NEW.booking_id;
+        END
+    ''')
+    
+    # Orderings and range filters move to the integer columns
+    cursor.execute("DROP INDEX IF EXISTS idx_trips_schedule")
+    cursor.execute("DROP INDEX IF EXISTS idx_bookings_user")
+    cursor.execute("DROP INDEX IF EXISTS idx_bookings_date")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_departure
+        ON trips (date, departure_minute)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_route_departure
+        ON trips (source_key, destination_key, date, departure_minute)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_user_epoch
+        ON bookings (user_id, booking_epoch)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_epoch
+        ON bookings (booking_epoch)
+    ''')
+
+def add_sort_indexes(cursor):
+    """Add indexes that serve the price and duration orderings of trip searches"""
+    # The rowid (trip_id) ends every index, so each matches its TRIP_SORTS order exactly
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_price
+        ON trips (price, date, departure_minute)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_duration
+        ON trips (duration_minutes, date, departure_minute)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_route_price
+        ON trips (source_key, destination_key, date, price)
+    ''')
+
+def fold_city_keys(cursor):
+    """Fold the city key columns with city_key() instead of SQLite's ASCII-only LOWER()"""
+    cursor.execute("UPDATE trips SET source_key = city_key(source), destination_key = city_key(destination)")
+    
+    # Writers must register city_key (register_functions); DatabaseManager does for its connections
+    cursor.execute("DROP TRIGGER IF EXISTS trg_trips_derived_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_trips_city_keys_update")
+    cursor.execute(f'''
+        CREATE TRIGGER trg_trips_derived_insert
+        AFTER INSERT ON trips
+        BEGIN
+            UPDATE trips SET source_key = city_key(NEW.source), destination_key = city_key(NEW.destination),
+                {trip_times_sql('NEW.')}
+            WHERE trip_id = NEW.trip_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_trips_city_keys_update
+        AFTER UPDATE OF source, destination ON trips
+        BEGIN
+            UPDATE trips SET source_key = city_key(NEW.source), destination_key = city_key(NEW.destination)
+            WHERE trip_id = NEW.trip_id;
+        END
+    ''')
+
+def fold_city_keys_in_sql(cursor):
+    """Go back to plain SQL city key triggers so every writer can insert trips
+    
+    The city_key() triggers of migration 10 failed for connections that had
+    not registered the function, such as the sqlite3 shell.
+    """
+    cursor.execute("UPDATE trips SET source_key = LOWER(TRIM(source)), destination_key = LOWER(TRIM(destination))")
+    
+    cursor.execute("DROP TRIGGER IF EXISTS trg_trips_derived_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_trips_city_keys_update")
+    cursor.execute(f'''
+        CREATE TRIGGER trg_trips_derived_insert
+        AFTER INSERT ON trips
+        BEGIN
+            UPDATE trips SET source_key = LOWER(TRIM(NEW.source)), destination_key = LOWER(TRIM(NEW.destination)),
+                {trip_times_sql('NEW.')}
+            WHERE trip_id = NEW.trip_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_trips_city_keys_update
+        AFTER UPDATE OF source, destination ON trips
+        BEGIN
+            UPDATE trips SET source_key = LOWER(TRIM(NEW.source)), destination_key = LOWER(TRIM(NEW.destination))
+            WHERE trip_id = NEW.trip_id;
+        END
+    ''')
+
+# Ordered migrations: (version, description, function). Never edit or reorder
+# an entry once released; append a new one instead.
+MIGRATIONS = [
+    (1, "create base tables", create_tables),
+    (2, "deduplicate trips and add service key", dedupe_trips),
+    (3, "seed sample data", seed_sample_data),
+    (4, "add city keys and search indexes", add_search_indexes),
+    (5, "forbid negative seat counts", add_seat_check),
+    (6, "add trip rollups", add_rollups),
+    (7, "add recurring schedules", add_schedules),
+    (8, "add integer time columns", add_time_columns),
+    (9, "add trip sort indexes", add_sort_indexes),
+    (10, "fold city keys with city_key()", fold_city_keys),
+    (11, "fold city keys in plain SQL", fold_city_keys_in_sql),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(cursor):
+    """Return the highest applied migration version, or 0"""
+    cursor.execute('''
+        SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'
+    ''')
+    if not cursor.fetchone():
+        return 0
+    
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+def migrate(conn):
+    """Apply pending migrations in order; returns the list of versions applied"""
+    cursor = conn.cursor()
+    
+    # Cheap check first so an up-to-date database never takes the write lock
+    if get_schema_version(cursor) >= LATEST_VERSION:
+        return []
+    
+    applied = []
+    
+    # Table rebuilds need foreign keys off, and the setting cannot change inside a transaction
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Re-read under the write lock in case another process migrated meanwhile
+            current = get_schema_version(cursor)
+            for version, description, migration in MIGRATIONS:
+                if version <= current:
+                    continue
+                migration(cursor)
+                cursor.execute('''
+                    INSERT INTO schema_version (version, description) VALUES (?, ?)
+                ''', (version, description))
+                applied.append(version)
+            
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    
+    return applied
\ No newline at end of file
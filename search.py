@@ -1,14 +1,23 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime, date
-from db import DatabaseManager
+from tkinter import ttk
+import dialogs
+from datetime import datetime, date, timedelta
+from db import get_database_manager, format_clock, format_duration, parse_clock
+from routing import Connection
+from virtual_list import VirtualTreeview
+from data_service import DataService
+from ui_monitor import timed_handler
+
+# Days either side of the searched date shown in the fare calendar
+FARE_CALENDAR_DAYS = 3
 
 class SearchWindow:
-    def __init__(self, parent_frame, user_data, on_book_trip):
+    def __init__(self, parent_frame, user_data, on_book_trip, data_service=None):
         self.parent_frame = parent_frame
         self.user_data = user_data
         self.on_book_trip = on_book_trip
-        self.db = DatabaseManager()
+        self.db = get_database_manager()
+        self.data_service = data_service or DataService(parent_frame)
         
         # Create search interface
         self.create_widgets()
@@ -56,6 +65,62 @@ class SearchWindow:
         mode_combo['values'] = ('', 'flight', 'train', 'bus')
         mode_combo.grid(row=1, column=3, padx=(0, 20), pady=(10, 0))
         
+        # Search type; connections chain trips through other cities
+        ttk.Label(criteria_frame, text="Search:", font=('Arial', 10, 'bold')).grid(row=3, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.search_type_var = tk.StringVar(value='Direct trips')
+        search_type_combo = ttk.Combobox(criteria_frame, textvariable=self.search_type_var, width=15, state='readonly')
+        search_type_combo['values'] = ('Direct trips', 'Connections')
+        search_type_combo.grid(row=3, column=1, padx=(0, 20), pady=(10, 0))
+        
+        ttk.Label(criteria_frame, text="Optimise:", font=('Arial', 10, 'bold')).grid(row=3, column=2, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.objective_var = tk.StringVar(value='cheapest')
+        objective_combo = ttk.Combobox(criteria_frame, textvariable=self.objective_var, width=15, state='readonly')
+        objective_combo['values'] = ('cheapest', 'fastest', 'fewest_transfers')
+        objective_combo.grid(row=3, column=3, padx=(0, 20), pady=(10, 0))
+        
+        ttk.Label(criteria_frame, text="Min layover (min):", font=('Arial', 10, 'bold')).grid(row=3, column=4, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.layover_var = tk.StringVar(value='60')
+        ttk.Spinbox(criteria_frame, from_=0, to=720, increment=15, textvariable=self.layover_var,
+                    width=6).grid(row=3, column=5, pady=(10, 0))
+        
+        # Range filters and sort order for direct trip searches
+        filter_frame = ttk.Frame(search_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        self.filter_vars = {}
+        ranges = [
+            (0, "Price (₹):", 'min_price', 'max_price'),
+            (2, "Departs:", 'departure_from', 'departure_to'),
+            (4, "Dates:", 'date_from', 'date_to'),
+        ]
+        for column, label, low, high in ranges:
+            ttk.Label(filter_frame, text=label, font=('Arial', 10, 'bold')).grid(row=0, column=column * 2, sticky=tk.W, padx=(0, 10))
+            range_frame = ttk.Frame(filter_frame)
+            range_frame.grid(row=0, column=column * 2 + 1, sticky=tk.W, padx=(0, 20))
+            for name in (low, high):
+                self.filter_vars[name] = tk.StringVar()
+            ttk.Entry(range_frame, textvariable=self.filter_vars[low], width=10).pack(side=tk.LEFT)
+            ttk.Label(range_frame, text="–").pack(side=tk.LEFT, padx=3)
+            ttk.Entry(range_frame, textvariable=self.filter_vars[high], width=10).pack(side=tk.LEFT)
+        
+        ttk.Label(filter_frame, text="(HH:MM)", font=('Arial', 8), foreground='gray').grid(row=1, column=5, sticky=tk.W, pady=(2, 0))
+        ttk.Label(filter_frame, text="(YYYY-MM-DD)", font=('Arial', 8), foreground='gray').grid(row=1, column=9, sticky=tk.W, pady=(2, 0))
+        
+        ttk.Label(filter_frame, text="Max hours:", font=('Arial', 10, 'bold')).grid(row=2, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.filter_vars['max_hours'] = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.filter_vars['max_hours'], width=10).grid(row=2, column=1, sticky=tk.W, pady=(10, 0))
+        
+        ttk.Label(filter_frame, text="Min seats:", font=('Arial', 10, 'bold')).grid(row=2, column=4, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.filter_vars['min_seats'] = tk.StringVar(value='1')
+        ttk.Spinbox(filter_frame, from_=1, to=100, textvariable=self.filter_vars['min_seats'],
+                    width=6).grid(row=2, column=5, sticky=tk.W, pady=(10, 0))
+        
+        ttk.Label(filter_frame, text="Sort by:", font=('Arial', 10, 'bold')).grid(row=2, column=8, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.sort_var = tk.StringVar(value='departure')
+        sort_combo = ttk.Combobox(filter_frame, textvariable=self.sort_var, width=12, state='readonly')
+        sort_combo['values'] = ('departure', 'price', 'duration')
+        sort_combo.grid(row=2, column=9, sticky=tk.W, pady=(10, 0))
+        
         # Search buttons
         button_frame = ttk.Frame(search_frame)
         button_frame.pack(fill=tk.X)
@@ -66,38 +131,37 @@ class SearchWindow:
         clear_button = ttk.Button(button_frame, text="Clear", command=self.clear_search)
         clear_button.pack(side=tk.LEFT)
         
+        # City names match by prefix (indexed); substring matching is opt-in
+        self.substring_var = tk.BooleanVar(value=False)
+        substring_check = ttk.Checkbutton(button_frame, text="Match anywhere in city name", variable=self.substring_var)
+        substring_check.pack(side=tk.LEFT, padx=(20, 0))
+        
         show_all_button = ttk.Button(button_frame, text="Show All", command=self.load_trips)
         show_all_button.pack(side=tk.RIGHT)
         
+        # Fare calendar: cheapest fare on the days around a route search, filled in after a search
+        self.calendar_frame = ttk.Frame(self.parent_frame)
+        self.calendar_frame.pack(fill=tk.X, padx=10)
+        ttk.Style().configure('Selected.TButton', font=('Arial', 9, 'bold'))
+        
         # Results frame
         results_frame = ttk.LabelFrame(self.parent_frame, text="Available Trips", padding="15")
         results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Create treeview for trips
+        # Create virtual treeview for trips; only the visible rows become Treeview items
         columns = ('ID', 'Source', 'Destination', 'Date', 'Mode', 'Departure', 'Arrival', 'Duration', 'Price', 'Seats')
-        self.trips_tree = ttk.Treeview(results_frame, columns=columns, show='headings', height=12)
         
         # Define column headings and widths
         column_widths = {'ID': 50, 'Source': 100, 'Destination': 100, 'Date': 100, 
                         'Mode': 80, 'Departure': 80, 'Arrival': 80, 'Duration': 80, 
                         'Price': 80, 'Seats': 60}
         
-        for col in columns:
-            self.trips_tree.heading(col, text=col)
-            self.trips_tree.column(col, width=column_widths[col], minwidth=50)
-        
-        # Scrollbars
-        v_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.trips_tree.yview)
-        h_scrollbar = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.trips_tree.xview)
-        self.trips_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        # Color code by mode
+        tag_colors = {'flight': '#dbeafe', 'train': '#dcfce7', 'bus': '#fed7aa'}
         
-        # Pack treeview and scrollbars
-        self.trips_tree.grid(row=0, column=0, sticky='nsew')
-        v_scrollbar.grid(row=0, column=1, sticky='ns')
-        h_scrollbar.grid(row=1, column=0, sticky='ew')
-        
-        results_frame.grid_rowconfigure(0, weight=1)
-        results_frame.grid_columnconfigure(0, weight=1)
+        self.trips_tree = VirtualTreeview(results_frame, columns, column_widths, self.format_trip,
+                                          height=12, tag_colors=tag_colors, minwidth=50,
+                                          data_service=self.data_service)
         
         # Book button
         book_frame = ttk.Frame(self.parent_frame)
@@ -121,7 +185,13 @@ class SearchWindow:
         self.destination_var.set('')
         self.date_var.set('')
         self.mode_var.set('')
+        self.substring_var.set(False)
+        self.search_type_var.set('Direct trips')
+        for name, var in self.filter_vars.items():
+            var.set('1' if name == 'min_seats' else '')
+        self.sort_var.set('departure')
     
+    @timed_handler("search")
     def search_trips(self):
         """Search trips based on criteria"""
         source = self.source_var.get().strip()
@@ -134,93 +204,256 @@ class SearchWindow:
             try:
                 datetime.strptime(date_str, '%Y-%m-%d')
             except ValueError:
-                messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
+                dialogs.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
                 return
         
-        # Search trips
-        trips = self.db.search_trips(
+        if self.search_type_var.get() == 'Connections':
+            self.search_connections(source, destination, date_str, mode)
+            return
+        
+        ranges = self.read_filters()
+        if ranges is None:
+            return
+        
+        # Search trips; results are paged into the list as the user scrolls
+        criteria = dict(
             source=source if source else None,
             destination=destination if destination else None,
             date=date_str if date_str else None,
-            mode=mode if mode else None
+            mode=mode if mode else None,
+            match="substring" if self.substring_var.get() else "prefix",
+            **ranges
         )
-        
-        self.display_trips(trips)
-        
-        # Show search results count
-        count = len(trips)
+        sort = self.sort_var.get()
+        self.data_service.cancel("search-connections")
+        if source and destination and date_str:
+            self.load_fare_calendar(source, destination, date_str, mode or None)
+        else:
+            self.clear_fare_calendar()
+        self.trips_tree.set_source(
+            lambda after, page_size: self.db.search_trips_page(sort=sort, page_size=page_size, after=after, **criteria))
+        
+        # Show search results count; a newer search supersedes this one
+        self.data_service.submit(
+            self.db.count_trips, on_success=self.show_search_count,
+            key="search-count", owner=self.parent_frame, **criteria
+        )
+    
+    def show_search_count(self, count):
+        """Report how many trips matched the search"""
         if count == 0:
-            messagebox.showinfo("Search Results", "No trips found matching your criteria.")
+            dialogs.showinfo("Search Results", "No trips found matching your criteria.")
         else:
-            messagebox.showinfo("Search Results", f"Found {count} trip(s) matching your criteria.")
+            dialogs.showinfo("Search Results", f"Found {count} trip(s) matching your criteria.")
+    
+    def load_fare_calendar(self, source, destination, date_str, mode):
+        """Fetch the cheapest fares around the searched date in one query"""
+        self.data_service.submit(
+            self.db.get_fare_calendar, source, destination, date_str, days=FARE_CALENDAR_DAYS, mode=mode,
+            on_success=lambda rows: self.show_fare_calendar(date_str, rows),
+            key="fare-calendar", owner=self.parent_frame
+        )
+    
+    def clear_fare_calendar(self):
+        """Remove the fare calendar strip"""
+        self.data_service.cancel("fare-calendar")
+        for child in self.calendar_frame.winfo_children():
+            child.destroy()
     
+    def show_fare_calendar(self, date_str, rows):
+        """Show one button per day with its cheapest fare; clicking one searches that day"""
+        self.clear_fare_calendar()
+        
+        # Rows are per date and mode; the strip shows the best of each day
+        fares = {}
+        for day, mode, min_price, seats, trips in rows:
+            price, total_seats = fares.get(day, (min_price, 0))
+            fares[day] = (min(price, min_price), total_seats + seats)
+        cheapest = min((price for price, seats in fares.values()), default=None)
+        
+        ttk.Label(self.calendar_frame, text="Nearby dates:", font=('Arial', 10, 'bold')).pack(side=tk.LEFT, padx=(0, 10))
+        center = datetime.strptime(date_str, '%Y-%m-%d').date()
+        for offset in range(-FARE_CALENDAR_DAYS, FARE_CALENDAR_DAYS + 1):
+            day = (center + timedelta(days=offset)).isoformat()
+            label = (center + timedelta(days=offset)).strftime('%a %d %b')
+            if day in fares:
+                price, seats = fares[day]
+                marker = " ★" if price == cheapest else ""
+                text = f"{label}\n₹{price:,.0f}{marker}\n{seats} seats"
+            else:
+                text = f"{label}\nNo trips\n"
+            
+            button = ttk.Button(self.calendar_frame, text=text, width=12,
+                                style='Selected.TButton' if offset == 0 else 'TButton',
+                                command=lambda day=day: self.select_calendar_day(day))
+            if day not in fares:
+                button.state(['disabled'])
+            button.pack(side=tk.LEFT, padx=2, pady=(0, 5))
+    
+    def select_calendar_day(self, day):
+        """Search the same route on another day from the fare calendar"""
+        self.date_var.set(day)
+        self.search_trips()
+    
+    def read_filters(self):
+        """Validate the range filters; returns them as search arguments, or None"""
+        values = {name: var.get().strip() for name, var in self.filter_vars.items()}
+        
+        def number(name, convert):
+            try:
+                value = convert(values[name])
+            except ValueError:
+                raise ValueError("Prices, hours and seats must be numbers")
+            if value < 0:
+                raise ValueError("Prices, hours and seats cannot be negative")
+            return value
+        
+        ranges = {}
+        try:
+            for name in ('min_price', 'max_price'):
+                if values[name]:
+                    ranges[name] = number(name, float)
+            
+            for name in ('departure_from', 'departure_to'):
+                if values[name]:
+                    ranges[name] = parse_clock(values[name])
+            
+            for name in ('date_from', 'date_to'):
+                if values[name]:
+                    try:
+                        datetime.strptime(values[name], '%Y-%m-%d')
+                    except ValueError:
+                        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+                    ranges[name] = values[name]
+            
+            if values['max_hours']:
+                ranges['max_duration'] = round(number('max_hours', float) * 60)
+            
+            if values['min_seats']:
+                ranges['min_seats'] = number('min_seats', int)
+        except ValueError as e:
+            dialogs.showerror("Error", str(e))
+            return None
+        return ranges
+    
+    def search_connections(self, source, destination, date_str, mode):
+        """Search direct trips and multi-leg connections between two cities"""
+        if not (source and destination and date_str):
+            dialogs.showerror("Error", "Connections need a source, a destination and a date")
+            return
+        try:
+            min_layover = int(self.layover_var.get())
+            if min_layover < 0:
+                raise ValueError
+        except ValueError:
+            dialogs.showerror("Error", "Minimum layover must be a number of minutes")
+            return
+        
+        self.data_service.cancel("search-count")
+        self.clear_fare_calendar()
+        self.connection_query = dict(
+            source=source, destination=destination, date=date_str, objective=self.objective_var.get(),
+            min_layover=min_layover, passengers=max(self.passengers_var.get(), 1), mode=mode or None
+        )
+        self.data_service.submit(
+            self.db.find_connections, on_success=self.show_connections,
+            key="search-connections", owner=self.parent_frame, **self.connection_query
+        )
+    
+    def show_connections(self, connections):
+        """Display connection search results"""
+        self.trips_tree.set_rows(connections)
+        if not connections:
+            dialogs.showinfo("Search Results", "No trips or connections found matching your criteria.")
+    
+    def refresh_connections(self):
+        """Re-run the last connection search quietly, e.g. after a booking changed seat counts"""
+        self.data_service.submit(
+            self.db.find_connections, on_success=self.trips_tree.set_rows,
+            key="search-connections", owner=self.parent_frame, **self.connection_query
+        )
+    
+    @timed_handler("show all trips")
     def load_trips(self):
         """Load all available trips"""
-        trips = self.db.search_trips()
-        self.display_trips(trips)
+        self.clear_fare_calendar()
+        self.data_service.cancel("search-count")
+        self.data_service.cancel("search-connections")
+        self.trips_tree.set_source(lambda after, page_size: self.db.search_trips_page(page_size=page_size, after=after))
     
     def display_trips(self, trips):
         """Display trips in the treeview"""
-        # Clear existing items
-        for item in self.trips_tree.get_children():
-            self.trips_tree.delete(item)
+        self.trips_tree.set_rows(trips)
+    
+    def format_trip(self, trip):
+        """Format a trip row for display; returns (values, tags)"""
+        if isinstance(trip, Connection):
+            return self.format_connection(trip)
         
-        # Insert trip data
-        for trip in trips:
-            trip_id, source, destination, date, price, mode, duration, departure, arrival, seats, created_at = trip
-            
-            # Format price
-            price_str = f"₹{price:,.0f}"
-            
-            # Color code by mode
-            tags = ()
-            if mode == 'flight':
-                tags = ('flight',)
-            elif mode == 'train':
-                tags = ('train',)
-            elif mode == 'bus':
-                tags = ('bus',)
-            
-            self.trips_tree.insert('', tk.END, values=(
-                trip_id, source, destination, date, mode.title(), 
-                departure, arrival, duration, price_str, seats
-            ), tags=tags)
+        trip_id, source, destination, date, price, mode, duration, departure, arrival, seats, created_at = trip
+        
+        # Format price
+        price_str = f"₹{price:,.0f}"
         
-        # Configure tag colors
-        self.trips_tree.tag_configure('flight', background='#dbeafe')
-        self.trips_tree.tag_configure('train', background='#dcfce7')
-        self.trips_tree.tag_configure('bus', background='#fed7aa')
+        # Color code by mode
+        tags = ()
+        if mode in ('flight', 'train', 'bus'):
+            tags = (mode,)
+        
+        values = (
+            trip_id, source, destination, date, mode.title(), 
+            format_clock(departure), format_clock(arrival), format_duration(duration), price_str, seats
+        )
+        return values, tags
+    
+    def format_connection(self, connection):
+        """Format a connection row; the columns describe the whole journey"""
+        first, last = connection.legs[0], connection.legs[-1]
+        
+        # Destination shows the cities changed in, Mode the mode of every leg
+        destination = last[2]
+        if len(connection.legs) > 1:
+            destination += f" (via {', '.join(leg[2] for leg in connection.legs[:-1])})"
+        modes = " + ".join(leg[5].title() for leg in connection.legs)
+        
+        arrival = format_clock(last[8])
+        days_later = (datetime.strptime(connection.arrival_date, '%Y-%m-%d') - datetime.strptime(first[3], '%Y-%m-%d')).days
+        if days_later:
+            arrival += f" +{days_later}d"
+        
+        tags = (first[5],) if len(connection.legs) == 1 else ()
+        values = (
+            connection.key, first[1], destination, first[3], modes,
+            format_clock(first[7]), arrival, format_duration(connection.duration), f"₹{connection.price:,.0f}",
+            connection.seats
+        )
+        return values, tags
     
+    @timed_handler("book")
     def book_selected_trip(self):
         """Book the selected trip"""
-        selection = self.trips_tree.selection()
-        if not selection:
-            messagebox.showwarning("No Selection", "Please select a trip to book.")
+        trip = self.trips_tree.selected_row()
+        if trip is None:
+            dialogs.showwarning("No Selection", "Please select a trip to book.")
+            return
+        if isinstance(trip, Connection):
+            self.book_connection(trip)
             return
         
         # Get selected trip data
-        item = self.trips_tree.item(selection[0])
-        trip_data = item['values']
-        trip_id = trip_data[0]
-        source = trip_data[1]
-        destination = trip_data[2]
-        date = trip_data[3]
-        mode = trip_data[4]
-        price_str = trip_data[8]
-        available_seats = trip_data[9]
+        trip_id, source, destination, date, price, mode, duration, departure, arrival, available_seats, created_at = trip
+        mode = mode.title()
         
         passengers = self.passengers_var.get()
         
         if passengers > available_seats:
-            messagebox.showerror("Error", f"Only {available_seats} seats available.")
+            dialogs.showerror("Error", f"Only {available_seats} seats available.")
             return
         
-        # Extract price from formatted string
-        price = float(price_str.replace('₹', '').replace(',', ''))
         total_amount = price * passengers
         
         # Confirm booking
-        confirmation = messagebox.askyesno(
+        confirmation = dialogs.askyesno(
             "Confirm Booking",
             f"Booking Details:\n\n"
             f"Trip: {source} → {destination}\n"
@@ -232,11 +465,92 @@ class SearchWindow:
         )
         
         if confirmation:
-            success, message = self.db.book_trip(self.user_data['user_id'], trip_id, passengers)
-            if success:
-                messagebox.showinfo("Success", "Trip booked successfully!")
-                self.load_trips()  # Refresh the list
-                if self.on_book_trip:
-                    self.on_book_trip()  # Callback to parent
-            else:
-                messagebox.showerror("Booking Failed", message)
\ No newline at end of file
+            self.book_button.configure(state=tk.DISABLED)
+            self.data_service.submit(
+                self.book_and_fetch, trip_id, passengers,
+                on_success=self.on_booking_result, on_error=self.on_booking_error, owner=self.parent_frame
+            )
+    
+    def book_connection(self, connection):
+        """Book every leg of a connection in one transaction"""
+        passengers = self.passengers_var.get()
+        if passengers > connection.seats:
+            dialogs.showerror("Error", f"Only {connection.seats} seats available on every leg.")
+            return
+        
+        legs = "\n".join(
+            f"  {leg[1]} → {leg[2]}: {leg[3]} {format_clock(leg[7])}-{format_clock(leg[8])} ({leg[5].title()})"
+            for leg in connection.legs
+        )
+        confirmation = dialogs.askyesno(
+            "Confirm Booking",
+            f"Booking Details:\n\n"
+            f"{legs}\n\n"
+            f"Passengers: {passengers}\n"
+            f"Total Amount: ₹{connection.price * passengers:,.0f}\n\n"
+            f"All legs are booked together or not at all. Confirm this booking?"
+        )
+        
+        if confirmation:
+            self.book_button.configure(state=tk.DISABLED)
+            self.data_service.submit(
+                self.book_connection_and_fetch, [leg[0] for leg in connection.legs], passengers,
+                on_success=self.on_connection_booking_result, on_error=self.on_booking_error, owner=self.parent_frame
+            )
+    
+    def book_connection_and_fetch(self, trip_ids, passengers):
+        """Book all legs and fetch the rows the UI has to patch (runs on a worker thread)"""
+        success, results = self.db.book_trips(self.user_data['user_id'], [(trip_id, passengers) for trip_id in trip_ids])
+        if not success:
+            failed = next(result for result in results if not result['success'])
+            return False, failed['message'], []
+        
+        booked = [(self.db.get_trip(result['trip_id']), self.db.get_user_booking(result['booking_id']))
+                  for result in results]
+        return True, "Booking successful", booked
+    
+    def on_connection_booking_result(self, result):
+        """Handle the connection booking result"""
+        self.book_button.configure(state=tk.NORMAL)
+        success, message, booked = result
+        if success:
+            if self.on_book_trip:
+                self.on_book_trip(booked)  # Callback to parent, once for all legs
+            self.refresh_connections()
+            dialogs.showinfo("Success", f"All {len(booked)} leg(s) booked successfully!")
+        else:
+            dialogs.showerror("Booking Failed", message)
+    
+    def book_and_fetch(self, trip_id, passengers):
+        """Book a trip and fetch the rows the UI has to patch (runs on a worker thread)"""
+        success, results = self.db.book_trips(self.user_data['user_id'], [(trip_id, passengers)])
+        result = results[0]
+        if not success:
+            return False, result['message'], None, None
+        
+        trip = self.db.get_trip(trip_id)
+        booking = self.db.get_user_booking(result['booking_id'])
+        return True, result['message'], trip, booking
+    
+    def on_booking_error(self, error):
+        """Handle a booking request that raised"""
+        self.book_button.configure(state=tk.NORMAL)
+        dialogs.showerror("Booking Failed", f"Booking failed: {str(error)}")
+    
+    def on_booking_result(self, result):
+        """Handle the booking result"""
+        self.book_button.configure(state=tk.NORMAL)
+        success, message, trip, booking = result
+        if success:
+            # Patch the one trip row instead of reloading the list
+            self.patch_trip(trip)
+            if self.on_book_trip:
+                self.on_book_trip([(trip, booking)])  # Callback to parent
+            dialogs.showinfo("Success", "Trip booked successfully!")
+        else:
+            dialogs.showerror("Booking Failed", message)
+    
+    def patch_trip(self, trip):
+        """Update one trip row in place, e.g. after its seat count changed"""
+        if trip is not None:
+            self.trips_tree.update_row(trip)
\ No newline at end of file
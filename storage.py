@@ -0,0 +1,89 @@
+class StorageProfile:
+    """How SQLite stores and syncs the database file
+    
+    journal_mode is set once when a DatabaseManager opens the file and is
+    remembered by the file itself; None leaves it as it is. The other
+    settings apply to every pooled connection:
+    
+    - synchronous: OFF, NORMAL, FULL or EXTRA
+    - busy_timeout: seconds a statement waits for another writer's lock
+    - mmap_size: bytes of the file read through memory mapping (0 disables it)
+    - cache_size: page cache per connection; negative values are KiB
+    - wal_autocheckpoint: WAL pages that trigger an automatic checkpoint
+    - journal_size_limit: bytes the WAL file is truncated back to after a checkpoint
+    - checkpoint_on_close: wal_checkpoint mode run by DatabaseManager.close(), or None
+    """
+    def __init__(self, journal_mode=None, synchronous=None, busy_timeout=5.0, mmap_size=None,
+                 cache_size=None, wal_autocheckpoint=None, journal_size_limit=None, checkpoint_on_close=None):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.wal_autocheckpoint = wal_autocheckpoint
+        self.journal_size_limit = journal_size_limit
+        self.checkpoint_on_close = checkpoint_on_close
+    
+    def pragmas(self):
+        """Per-connection PRAGMAs for this profile; unset values keep SQLite's defaults"""
+        settings = {
+            'synchronous': self.synchronous,
+            'mmap_size': self.mmap_size,
+            'cache_size': self.cache_size,
+            'wal_autocheckpoint': self.wal_autocheckpoint,
+            'journal_size_limit': self.journal_size_limit,
+        }
+        return {pragma: value for pragma, value in settings.items() if value is not None}
+
+# Named profiles accepted by DatabaseManager(storage=...)
+STORAGE_PROFILES = {
+    # SQLite's defaults; a file already in WAL mode stays in WAL mode
+    'default': StorageProfile(),
+    
+    # One application instance. WAL lets searches run while a booking
+    # commits; NORMAL may lose the last commits on power loss, never on a crash.
+    'desktop': StorageProfile(
+        journal_mode='WAL',
+        synchronous='NORMAL',
+        mmap_size=64 * 1024 * 1024,
+        cache_size=-16000,
+        wal_autocheckpoint=1000,
+        checkpoint_on_close='TRUNCATE',
+    ),
+    
+    # Several instances on one machine sharing one file (kiosks). Readers
+    # never block and are never blocked; writers take turns, waiting up to
+    # busy_timeout for the lock before DatabaseManager.run_write retries.
+    # Closing only runs a PASSIVE checkpoint so it never waits on the others,
+    # and journal_size_limit keeps the WAL file from growing without bound.
+    # WAL needs shared memory, so every process must run on the same host;
+    # do not put the file on a network share.
+    'multiprocess': StorageProfile(
+        journal_mode='WAL',
+        synchronous='NORMAL',
+        busy_timeout=30.0,
+        mmap_size=64 * 1024 * 1024,
+        cache_size=-8000,
+        wal_autocheckpoint=1000,
+        journal_size_limit=64 * 1024 * 1024,
+        checkpoint_on_close='PASSIVE',
+    ),
+    
+    # Every commit survives power loss, at the cost of an fsync per commit
+    'durable': StorageProfile(
+        journal_mode='WAL',
+        synchronous='FULL',
+        wal_autocheckpoint=1000,
+        checkpoint_on_close='TRUNCATE',
+    ),
+}
+
+def get_storage_profile(storage):
+    """Resolve a profile name or StorageProfile; None means the default profile"""
+    if storage is None:
+        return STORAGE_PROFILES['default']
+    if isinstance(storage, StorageProfile):
+        return storage
+    if storage not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {storage}")
+    return STORAGE_PROFILES[storage]
\ No newline at end of file
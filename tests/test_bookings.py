@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from db import DatabaseManager
+
+class BookingTestCase(unittest.TestCase):
+    """A fresh database with one user and one 10-seat trip"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, "test.db"), storage="desktop")
+        self.user_id = self.add_user("test@example.com")
+        self.trip_id = self.add_trip('2099-03-01', 10)
+    
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+    
+    def add_user(self, email):
+        self.db.register_user("Test User", email, "password")
+        with self.db.get_connection() as conn:
+            return conn.execute("SELECT user_id FROM users WHERE email = ?", (email,)).fetchone()[0]
+    
+    def add_trip(self, date, seats, source='Delhi', destination='Mumbai', departure='08:00', arrival='10:00'):
+        success, message = self.db.add_trip(source, destination, date, 1000, 'train', '2h 0m', departure, arrival, seats)
+        self.assertTrue(success, message)
+        with self.db.get_connection() as conn:
+            return conn.execute("SELECT trip_id FROM trips WHERE source = ? AND date = ? AND departure_time = ?",
+                                (source, date, departure)).fetchone()[0]
+    
+    def available_seats(self, trip_id=None):
+        return self.db.get_trip(trip_id or self.trip_id)[9]
+    
+    def confirmed_passengers(self, trip_id=None):
+        with self.db.get_connection() as conn:
+            return conn.execute("SELECT COALESCE(SUM(passengers), 0) FROM bookings WHERE trip_id = ? AND status = 'confirmed'",
+                                (trip_id or self.trip_id,)).fetchone()[0]
+    
+    def booking_ids(self):
+        return [booking[0] for booking in self.db.get_user_bookings(self.user_id)]
+
+class BookingTest(BookingTestCase):
+    """Seats are taken and returned atomically, and never oversold"""
+    def test_overbooking_is_refused(self):
+        self.assertTrue(self.db.book_trip(self.user_id, self.trip_id, 8)[0])
+        
+        success, message = self.db.book_trip(self.user_id, self.trip_id, 3)
+        
+        self.assertFalse(success)
+        self.assertEqual(message, "Not enough seats available")
+        self.assertEqual(self.available_seats(), 2)
+        self.assertEqual(len(self.booking_ids()), 1)
+    
+    def test_concurrent_bookings_never_oversell(self):
+        results = []
+        
+        def book():
+            results.append(self.db.book_trip(self.user_id, self.trip_id, 1)[0])
+        
+        threads = [threading.Thread(target=book) for _ in range(25)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(self.available_seats(), 0)
+        self.assertEqual(self.confirmed_passengers(), 10)
+    
+    def test_cancel_restores_seats(self):
+        self.assertTrue(self.db.book_trip(self.user_id, self.trip_id, 4)[0])
+        
+        success, message = self.db.cancel_booking(self.booking_ids()[0], self.user_id)
+        
+        self.assertTrue(success, message)
+        self.assertEqual(self.available_seats(), 10)
+        self.assertEqual(self.confirmed_passengers(), 0)
+    
+    def test_double_cancel_returns_seats_once(self):
+        self.assertTrue(self.db.book_trip(self.user_id, self.trip_id, 4)[0])
+        self.assertTrue(self.db.book_trip(self.user_id, self.trip_id, 2)[0])
+        booking_id = self.booking_ids()[0]
+        
+        self.assertTrue(self.db.cancel_booking(booking_id, self.user_id)[0])
+        success, message = self.db.cancel_booking(booking_id, self.user_id)
+        
+        self.assertFalse(success)
+        self.assertEqual(message, "Booking not found or already cancelled")
+        self.assertEqual(self.available_seats(), 10 - self.confirmed_passengers())
+    
+    def test_cancel_by_another_user_is_refused(self):
+        self.assertTrue(self.db.book_trip(self.user_id, self.trip_id, 4)[0])
+        
+        self.assertFalse(self.db.cancel_booking(self.booking_ids()[0], self.add_user("other@example.com"))[0])
+        self.assertEqual(self.available_seats(), 6)
+
+class MultiLegBookingTest(BookingTestCase):
+    """book_trips books every leg or none of them"""
+    def setUp(self):
+        super().setUp()
+        self.second_trip_id = self.add_trip('2099-03-01', 1, source='Mumbai', destination='Goa',
+                                            departure='12:00', arrival='14:00')
+    
+    def test_failed_leg_rolls_back_earlier_legs(self):
+        success, results = self.db.book_trips(self.user_id, [(self.trip_id, 2), (self.second_trip_id, 2)])
+        
+        self.assertFalse(success)
+        self.assertEqual([result['success'] for result in results], [False, False])
+        self.assertEqual(results[0]['message'], "Not booked: another leg failed")
+        self.assertEqual(results[1]['message'], "Not enough seats available")
+        self.assertEqual(self.available_seats(), 10)
+        self.assertEqual(self.available_seats(self.second_trip_id), 1)
+        self.assertEqual(self.booking_ids(), [])
+    
+    def test_all_legs_booked_together(self):
+        success, results = self.db.book_trips(self.user_id, [(self.trip_id, 1), (self.second_trip_id, 1)])
+        
+        self.assertTrue(success)
+        self.assertEqual(self.available_seats(), 9)
+        self.assertEqual(self.available_seats(self.second_trip_id), 0)
+        self.assertEqual(sorted(self.booking_ids()), sorted(result['booking_id'] for result in results))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
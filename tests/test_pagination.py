@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+
+from db import DatabaseManager
+
+DATE = '2099-05-01'
+
+class PaginationTestCase(unittest.TestCase):
+    """A database with trips on one far-future route, so sample data stays out of the pages"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, "test.db"), storage="desktop")
+    
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+    
+    def add_trip(self, date=DATE, departure='08:00', arrival='10:00', price=1000, seats=10, mode='train'):
+        success, message = self.db.add_trip('Delhi', 'Mumbai', date, price, mode, '2h 0m',
+                                            departure, arrival, seats)
+        self.assertTrue(success, message)
+        with self.db.get_connection() as conn:
+            return conn.execute("SELECT MAX(trip_id) FROM trips").fetchone()[0]
+    
+    def all_pages(self, fetch, page_size):
+        """Follow the cursors from the first page to the last; returns the list of pages"""
+        pages = []
+        after = None
+        while True:
+            rows, after = fetch(page_size=page_size, after=after)
+            pages.append(rows)
+            if after is None:
+                return pages
+            self.assertLess(len(pages), 100, "cursor never reached the last page")
+
+class TripPageTest(PaginationTestCase):
+    """search_trips_page walks the same rows as search_trips, in the same order"""
+    def setUp(self):
+        super().setUp()
+        # Three trips share date and departure and four share a price, so only trip_id tells them apart
+        for departure, mode, price in (('08:00', 'train', 1500), ('06:00', 'train', 900), ('08:00', 'bus', 1500),
+                                       ('21:30', 'train', 900), ('08:00', 'flight', 1500),
+                                       ('06:00', 'bus', 900), ('21:30', 'bus', 1200)):
+            self.add_trip(departure=departure, price=price, mode=mode)
+        self.add_trip(date='2099-05-02', departure='05:00', price=900)
+    
+    def fetch(self, sort):
+        def fetch(page_size, after):
+            return self.db.search_trips_page('Delhi', 'Mumbai', sort=sort, page_size=page_size, after=after,
+                                             date_from=DATE)
+        return fetch
+    
+    def test_pages_cover_every_trip_once_in_order(self):
+        for sort in ('departure', 'price', 'duration'):
+            expected = [trip[0] for trip in self.db.search_trips('Delhi', 'Mumbai', sort=sort, date_from=DATE)]
+            self.assertEqual(len(expected), 8)
+            for page_size in (1, 2, 3, 7):
+                with self.subTest(sort=sort, page_size=page_size):
+                    pages = self.all_pages(self.fetch(sort), page_size)
+                    self.assertTrue(all(len(page) == page_size for page in pages[:-1]))
+                    self.assertEqual([trip[0] for page in pages for trip in page], expected)
+    
+    def test_duplicate_sort_keys_are_ordered_by_trip_id(self):
+        trips = [trip for page in self.all_pages(self.fetch('departure'), 2) for trip in page]
+        same_departure = [trip[0] for trip in trips if trip[3] == DATE and trip[7] == 8 * 60]
+        self.assertEqual(len(same_departure), 3)
+        self.assertEqual(same_departure, sorted(same_departure))
+    
+    def test_exact_last_page_has_no_cursor(self):
+        pages = self.all_pages(self.fetch('departure'), 4)
+        self.assertEqual([len(page) for page in pages], [4, 4])
+        
+        trips, after = self.db.search_trips_page('Delhi', 'Mumbai', page_size=8, date_from=DATE)
+        self.assertEqual((len(trips), after), (8, None))
+    
+    def test_short_last_page_has_no_cursor(self):
+        pages = self.all_pages(self.fetch('price'), 3)
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+    
+    def test_empty_result(self):
+        self.assertEqual(self.db.search_trips_page('Delhi', 'Mumbai', '2099-12-31'), ([], None))
+    
+    def test_cursor_past_the_last_trip(self):
+        trips, after = self.db.search_trips_page('Delhi', 'Mumbai', page_size=8, date_from=DATE)
+        last = (trips[-1][3], trips[-1][7], trips[-1][0])
+        self.assertEqual(self.db.search_trips_page('Delhi', 'Mumbai', after=last, date_from=DATE), ([], None))
+
+class BookingPageTest(PaginationTestCase):
+    """get_user_bookings_page and get_all_bookings_page walk bookings newest first"""
+    def setUp(self):
+        super().setUp()
+        self.user_id = self.add_user("test@example.com")
+        self.other_user_id = self.add_user("other@example.com")
+        trip_id = self.add_trip(seats=100)
+        for user_id in (self.user_id,) * 7 + (self.other_user_id,) * 2:
+            success, message = self.db.book_trip(user_id, trip_id, 1)
+            self.assertTrue(success, message)
+        
+        # Pin the booking times: most share one second, so booking_id alone orders them
+        epochs = [4102444800, 4102444800, 4102444900, 4102444800, 4102444700, 4102444800, 4102444800,
+                  4102444800, 4102445000]
+        with self.db.transaction() as conn:
+            ids = [row[0] for row in conn.execute(
+                "SELECT booking_id FROM bookings WHERE trip_id = ? ORDER BY booking_id", (trip_id,))]
+            conn.executemany("UPDATE bookings SET booking_epoch = ? WHERE booking_id = ?", zip(epochs, ids))
+        self.expected = [booking_id for epoch, booking_id in sorted(zip(epochs, ids), reverse=True)]
+        self.user_expected = [booking_id for booking_id in self.expected if booking_id in ids[:7]]
+    
+    def add_user(self, email):
+        self.db.register_user("Test User", email, "password")
+        with self.db.get_connection() as conn:
+            return conn.execute("SELECT user_id FROM users WHERE email = ?", (email,)).fetchone()[0]
+    
+    def user_fetch(self, user_id):
+        def fetch(page_size, after):
+            return self.db.get_user_bookings_page(user_id, page_size=page_size, after=after)
+        return fetch
+    
+    def test_user_pages_cover_every_booking_once_in_order(self):
+        for page_size in (1, 2, 3, 7):
+            with self.subTest(page_size=page_size):
+                pages = self.all_pages(self.user_fetch(self.user_id), page_size)
+                self.assertTrue(all(len(page) == page_size for page in pages[:-1]))
+                self.assertEqual([booking[0] for page in pages for booking in page], self.user_expected)
+    
+    def test_all_pages_cover_every_booking_once_in_order(self):
+        expected = [booking[0] for booking in self.db.get_all_bookings()]
+        self.assertEqual([booking_id for booking_id in expected if booking_id in self.expected], self.expected)
+        for page_size in (1, 2, 4, len(expected)):
+            with self.subTest(page_size=page_size):
+                pages = self.all_pages(self.db.get_all_bookings_page, page_size)
+                self.assertEqual([booking[0] for page in pages for booking in page], expected)
+    
+    def test_last_page_has_no_cursor(self):
+        bookings, after = self.db.get_user_bookings_page(self.user_id, page_size=7)
+        self.assertEqual((len(bookings), after), (7, None))
+        
+        bookings, after = self.db.get_user_bookings_page(self.user_id, page_size=6)
+        self.assertEqual(len(bookings), 6)
+        self.assertEqual(self.db.get_user_bookings_page(self.user_id, page_size=6, after=after)[1], None)
+    
+    def test_empty_result(self):
+        user_id = self.add_user("nobody@example.com")
+        self.assertEqual(self.db.get_user_bookings_page(user_id), ([], None))
+        
+        last = self.db.get_all_bookings()[-1]
+        self.assertEqual(self.db.get_all_bookings_page(after=(last[5], last[0])), ([], None))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from db import DatabaseManager
+from query_cache import QueryCache
+
+TRIP = ('Delhi', 'Mumbai', '2099-04-01', 1000, 'train', '2h 0m', '08:00', '10:00', 10)
+
+class CachedReadsTest(unittest.TestCase):
+    """Cached reads never outlive a write made through the manager"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = QueryCache(max_entries=32, ttl=60.0)
+        self.db = DatabaseManager(os.path.join(self.directory.name, "test.db"), storage="desktop",
+                                  query_cache=self.cache)
+        self.db.register_user("Test User", "test@example.com", "password")
+        with self.db.get_connection() as conn:
+            self.user_id = conn.execute("SELECT user_id FROM users WHERE email = 'test@example.com'").fetchone()[0]
+        self.assertTrue(self.db.add_trip(*TRIP)[0])
+    
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+    
+    def search(self):
+        return self.db.search_trips('Delhi', 'Mumbai', '2099-04-01')
+    
+    def test_repeated_search_is_served_from_cache(self):
+        self.search()
+        hits = self.cache.stats()['hits']
+        self.search()
+        self.assertEqual(self.cache.stats()['hits'], hits + 1)
+    
+    def test_new_trip_shows_up(self):
+        self.assertEqual(len(self.search()), 1)
+        self.assertEqual(self.db.count_trips('Delhi', 'Mumbai', '2099-04-01'), 1)
+        
+        self.assertTrue(self.db.add_trip(*TRIP[:6], '18:00', '20:00', 10)[0])
+        
+        self.assertEqual(len(self.search()), 2)
+        self.assertEqual(self.db.count_trips('Delhi', 'Mumbai', '2099-04-01'), 2)
+    
+    def test_booking_and_cancel_show_up(self):
+        trip_id = self.search()[0][0]
+        stats_before = self.db.get_booking_statistics()
+        page_before = self.db.search_trips_page('Delhi', 'Mumbai', '2099-04-01')[0]
+        
+        self.assertTrue(self.db.book_trip(self.user_id, trip_id, 3)[0])
+        
+        self.assertEqual(self.search()[0][9], 7)
+        self.assertEqual(self.db.search_trips_page('Delhi', 'Mumbai', '2099-04-01')[0][0][9], 7)
+        self.assertEqual(self.db.get_booking_statistics()['total_bookings'], stats_before['total_bookings'] + 1)
+        self.assertEqual(page_before[0][9], 10)
+        
+        booking_id = self.db.get_user_bookings(self.user_id)[0][0]
+        self.assertTrue(self.db.cancel_booking(booking_id, self.user_id)[0])
+        self.assertEqual(self.search()[0][9], 10)
+    
+    def test_deleted_trip_disappears(self):
+        trip_id = self.search()[0][0]
+        self.assertTrue(self.db.delete_trip(trip_id)[0])
+        self.assertEqual(self.search(), [])
+        self.assertEqual(self.db.count_trips('Delhi', 'Mumbai', '2099-04-01'), 0)
+    
+    def test_outside_write_is_seen_after_ttl(self):
+        self.assertEqual(len(self.search()), 1)
+        conn = sqlite3.connect(self.db.db_name)
+        try:
+            with conn:
+                conn.execute("UPDATE trips SET available_seats = 4")
+        finally:
+            conn.close()
+        
+        # The manager cannot see this write, so the cached result stands until it expires
+        self.assertEqual(self.search()[0][9], 10)
+        later = time.monotonic() + self.cache.ttl + 1
+        with mock.patch('query_cache.time.monotonic', return_value=later):
+            self.assertEqual(self.search()[0][9], 4)
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+    
+    def test_outside_write_is_seen_after_invalidate(self):
+        self.assertEqual(len(self.search()), 1)
+        version = self.db.data_version()
+        conn = sqlite3.connect(self.db.db_name)
+        try:
+            with conn:
+                conn.execute("UPDATE trips SET available_seats = 4")
+        finally:
+            conn.close()
+        
+        self.db.invalidate()
+        self.assertEqual(self.search()[0][9], 4)
+        self.assertNotEqual(self.db.data_version(), version)
+
+class QueryCacheTest(unittest.TestCase):
+    """Expiry, eviction and invalidation of the cache itself"""
+    def test_entry_expires_after_ttl(self):
+        cache = QueryCache(ttl=10.0)
+        loads = []
+        
+        def load():
+            loads.append(1)
+            return len(loads)
+        
+        now = time.monotonic()
+        with mock.patch('query_cache.time.monotonic', return_value=now):
+            self.assertEqual(cache.get_or_load('key', load), 1)
+        with mock.patch('query_cache.time.monotonic', return_value=now + 9):
+            self.assertEqual(cache.get_or_load('key', load), 1)
+        with mock.patch('query_cache.time.monotonic', return_value=now + 11):
+            self.assertEqual(cache.get_or_load('key', load), 2)
+    
+    def test_least_recently_used_is_evicted(self):
+        cache = QueryCache(max_entries=2)
+        cache.get_or_load('a', lambda: 'a')
+        cache.get_or_load('b', lambda: 'b')
+        cache.get_or_load('a', lambda: 'stale')
+        cache.get_or_load('c', lambda: 'c')
+        
+        self.assertEqual(cache.get_or_load('a', lambda: 'reloaded'), 'a')
+        self.assertEqual(cache.get_or_load('b', lambda: 'reloaded'), 'reloaded')
+    
+    def test_load_overlapping_an_invalidation_is_not_stored(self):
+        cache = QueryCache()
+        
+        def load():
+            # A write commits while the old value is being read
+            cache.invalidate()
+            return 'old'
+        
+        self.assertEqual(cache.get_or_load('key', load), 'old')
+        self.assertEqual(cache.get_or_load('key', lambda: 'new'), 'new')
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
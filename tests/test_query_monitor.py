@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import unittest
+
+from db import DatabaseManager
+from query_monitor import QueryMonitor
+
+class SlowLogParametersTest(unittest.TestCase):
+    """The slow-query log keeps statement parameters only when asked to, and never for logins"""
+    def open(self, **options):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        # A zero threshold logs every statement as slow
+        self.monitor = QueryMonitor(slow_threshold=0, **options)
+        self.db = DatabaseManager(os.path.join(self.directory.name, "test.db"), storage="desktop", monitor=self.monitor)
+        self.addCleanup(self.db.close)
+        self.db.register_user("Secret Name", "secret@example.com", "hunter2")
+        self.db.login_user("secret@example.com", "hunter2")
+        self.db.search_trips("Delhi", "Mumbai")
+    
+    def dumped(self):
+        path = os.path.join(self.directory.name, "dump.json")
+        self.monitor.dump(path)
+        with open(path) as dump:
+            return dump.read()
+    
+    def slow_params(self, method):
+        return [entry['params'] for entry in self.monitor.snapshot()['slow_queries'] if entry['method'] == method]
+    
+    def test_redacted_by_default(self):
+        self.open()
+        
+        for secret in ("secret@example.com", "Secret Name", self.db.hash_password("hunter2"), "delhi"):
+            self.assertNotIn(secret, self.dumped())
+        self.assertTrue(self.slow_params('search_trips'))
+        self.assertEqual(set(self.slow_params('search_trips')), {"(redacted)"})
+    
+    def test_opt_in_still_hides_credentials(self):
+        self.open(log_params=True)
+        
+        self.assertIn("delhi", json.dumps(self.slow_params('search_trips')))
+        self.assertEqual(set(self.slow_params('login_user') + self.slow_params('register_user')), {"(redacted)"})
+        for secret in ("secret@example.com", "Secret Name", self.db.hash_password("hunter2")):
+            self.assertNotIn(secret, self.dumped())
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+from db import DatabaseManager
+
+DATE = '2099-06-01'
+
+# name: (source, destination, departure, arrival, duration, price, seats)
+TRIPS = {
+    'direct': ('Agra', 'Dehradun', '10:00', '20:00', '10h 0m', 5000, 10),
+    'agra_chandigarh': ('Agra', 'Chandigarh', '06:00', '08:00', '2h 0m', 1000, 10),
+    'chandigarh_dehradun': ('Chandigarh', 'Dehradun', '09:30', '11:00', '1h 30m', 1000, 2),
+    'agra_bhopal': ('Agra', 'Bhopal', '05:00', '06:00', '1h 0m', 200, 10),
+    'bhopal_chandigarh': ('Bhopal', 'Chandigarh', '07:00', '07:30', '0h 30m', 200, 1),
+}
+
+class ConnectionSearchTest(unittest.TestCase):
+    """Multi-leg search over a small network with one direct trip and two connections
+    
+    To Dehradun: direct (5000, 10h, 1 leg); via Chandigarh (2000, 5h, 2 legs,
+    90 min layover); via Bhopal and Chandigarh (1400, 6h, 3 legs, 60 min
+    layover first). Both connections end with the same Chandigarh trip.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, "test.db"), storage="desktop")
+        self.trip_ids = {}
+        for name, (source, destination, departure, arrival, duration, price, seats) in TRIPS.items():
+            success, message = self.db.add_trip(source, destination, DATE, price, 'bus', duration, departure, arrival, seats)
+            self.assertTrue(success, message)
+            with self.db.get_connection() as conn:
+                self.trip_ids[name] = conn.execute(
+                    "SELECT trip_id FROM trips WHERE source = ? AND destination = ? AND date = ?",
+                    (source, destination, DATE)).fetchone()[0]
+    
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+    
+    def routes(self, **options):
+        """Each result as its list of trip names"""
+        names = {trip_id: name for name, trip_id in self.trip_ids.items()}
+        return [[names[row[0]] for row in connection.legs]
+                for connection in self.db.find_connections('Agra', 'Dehradun', DATE, **options)]
+    
+    def test_cheapest(self):
+        self.assertEqual(self.routes(objective='cheapest'),
+                         [['agra_bhopal', 'bhopal_chandigarh', 'chandigarh_dehradun'], ['direct']])
+    
+    def test_fastest(self):
+        self.assertEqual(self.routes(objective='fastest'), [['agra_chandigarh', 'chandigarh_dehradun'], ['direct']])
+    
+    def test_fewest_transfers(self):
+        self.assertEqual(self.routes(objective='fewest_transfers'),
+                         [['direct'], ['agra_chandigarh', 'chandigarh_dehradun']])
+    
+    def test_each_result_ends_with_a_different_trip(self):
+        for objective in ('cheapest', 'fastest', 'fewest_transfers'):
+            with self.subTest(objective=objective):
+                last_trips = [route[-1] for route in self.routes(objective=objective)]
+                self.assertEqual(len(last_trips), len(set(last_trips)))
+    
+    def test_connection_totals(self):
+        connection = self.db.find_connections('Agra', 'Dehradun', DATE, objective='fastest')[0]
+        self.assertEqual((connection.price, connection.duration, connection.seats), (2000, 300, 2))
+    
+    def test_min_layover(self):
+        self.assertEqual(self.routes(min_layover=90), [['agra_chandigarh', 'chandigarh_dehradun'], ['direct']])
+        self.assertEqual(self.routes(min_layover=100), [['direct']])
+    
+    def test_max_legs(self):
+        self.assertEqual(self.routes(max_legs=2), [['agra_chandigarh', 'chandigarh_dehradun'], ['direct']])
+        self.assertEqual(self.routes(max_legs=1), [['direct']])
+    
+    def test_legs_need_enough_seats(self):
+        self.assertEqual(self.routes(passengers=2), [['agra_chandigarh', 'chandigarh_dehradun'], ['direct']])
+        self.assertEqual(self.routes(passengers=3), [['direct']])
+    
+    def test_sold_out_trip_drops_out(self):
+        self.routes()
+        self.db.register_user("Test User", "test@example.com", "password")
+        with self.db.get_connection() as conn:
+            user_id = conn.execute("SELECT user_id FROM users WHERE email = 'test@example.com'").fetchone()[0]
+        self.assertTrue(self.db.book_trip(user_id, self.trip_ids['chandigarh_dehradun'], 2)[0])
+        
+        self.assertEqual(self.routes(), [['direct']])
+    
+    def test_limit(self):
+        self.assertEqual(self.routes(limit=1), [['agra_bhopal', 'bhopal_chandigarh', 'chandigarh_dehradun']])
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from db import DatabaseManager
+
+SCHEDULE = ('Delhi', 'Mumbai', 'train', 1500, '2h 0m', '08:00', '10:00')
+
+class UpdateScheduleSeatsTest(unittest.TestCase):
+    """Changing a schedule's capacity keeps seat counts in line with its bookings"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, "test.db"), storage="desktop")
+        self.db.register_user("Test User", "test@example.com", "password")
+        with self.db.get_connection() as conn:
+            self.user_id = conn.execute("SELECT user_id FROM users WHERE email = 'test@example.com'").fetchone()[0]
+        
+        success, message, self.schedule_id = self.db.add_schedule(*SCHEDULE, 10, 127, '2099-01-01', '2099-01-01')
+        self.assertTrue(success, message)
+        self.assertTrue(self.db.expand_schedules('2099-01-01', '2099-01-01')[0])
+        with self.db.get_connection() as conn:
+            self.trip_id = conn.execute("SELECT trip_id FROM trips WHERE schedule_id = ?",
+                                        (self.schedule_id,)).fetchone()[0]
+    
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+    
+    def update_seats(self, seats):
+        return self.db.update_schedule(self.schedule_id, *SCHEDULE, seats, 127, '2099-01-01', '2099-01-01',
+                                       from_date='2099-01-01')
+    
+    def available_seats(self):
+        return self.db.get_trip(self.trip_id)[9]
+    
+    def test_shrink_below_booked_is_refused(self):
+        self.assertTrue(self.db.book_trip(self.user_id, self.trip_id, 8)[0])
+        
+        success, message = self.update_seats(5)
+        
+        self.assertFalse(success, message)
+        self.assertEqual(self.available_seats(), 2)
+        with self.db.get_connection() as conn:
+            seats = conn.execute("SELECT seats FROM schedules WHERE schedule_id = ?", (self.schedule_id,)).fetchone()[0]
+        self.assertEqual(seats, 10)
+    
+    def test_shrink_then_cancel_restores_capacity(self):
+        self.assertTrue(self.db.book_trip(self.user_id, self.trip_id, 3)[0])
+        
+        self.assertTrue(self.update_seats(5)[0])
+        self.assertEqual(self.available_seats(), 2)
+        
+        booking_id = self.db.get_user_bookings(self.user_id)[0][0]
+        self.assertTrue(self.db.cancel_booking(booking_id, self.user_id)[0])
+        self.assertEqual(self.available_seats(), 5)
+    
+    def test_grow_counts_from_bookings(self):
+        self.assertTrue(self.db.book_trip(self.user_id, self.trip_id, 4)[0])
+        
+        self.assertTrue(self.update_seats(12)[0])
+        self.assertEqual(self.available_seats(), 8)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
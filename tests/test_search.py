@@ -0,0 +1,45 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from db import DatabaseManager
+
+class CitySearchTest(unittest.TestCase):
+    """City names match whatever the case of their ASCII letters, as stored by any writer"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, "test.db"), storage="desktop")
+        success, message = self.db.add_trip('Zürich', 'ÉVORA', '2099-02-01', 100, 'bus', '2h 0m', '08:00', '10:00', 20)
+        self.assertTrue(success, message)
+    
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+    
+    def test_non_ascii_capitals(self):
+        for source, destination in (('Zürich', 'ÉVORA'), ('zürich', 'Évora'), ('ZüRICH', 'ÉvOrA')):
+            for match in ('exact', 'prefix', 'substring'):
+                with self.subTest(source=source, destination=destination, match=match):
+                    self.assertEqual(len(self.db.search_trips(source, destination, match=match)), 1)
+    
+    def test_connections_use_the_same_keys(self):
+        self.assertTrue(self.db.find_connections('ZüRICH', 'Évora', '2099-02-01'))
+    
+    def test_insert_through_a_bare_connection(self):
+        # Triggers must not depend on functions only DatabaseManager registers
+        conn = sqlite3.connect(self.db.db_name)
+        try:
+            with conn:
+                conn.execute('''
+                    INSERT INTO trips (source, destination, date, price, mode, duration, departure_time,
+                                       arrival_time, available_seats)
+                    VALUES (' Évian ', 'GENÈVE', '2099-02-02', 50, 'bus', '1h 0m', '09:00', '10:00', 30)
+                ''')
+        finally:
+            conn.close()
+        
+        self.assertEqual(len(self.db.search_trips('ÉVIAN', 'genÈve', match='exact')), 1)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import trip_import
+from db import DatabaseManager, TRIP_FIELDS
+from trip_import import TripFileReader, import_trip_file
+
+def trip(number, **changes):
+    """A valid trip row; number makes its departure time unique"""
+    row = {'source': 'Pune', 'destination': 'Goa', 'date': '2099-05-01', 'price': '900', 'mode': 'bus',
+           'duration': '10h 0m', 'departure_time': f"{number % 24:02d}:{number // 24 % 60:02d}",
+           'arrival_time': '23:59', 'available_seats': '40'}
+    row.update(changes)
+    return row
+
+class TripImportTest(unittest.TestCase):
+    """Valid rows are imported, bad rows rejected with a reason and repeats skipped"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, "test.db"), storage="desktop")
+    
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+    
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write(text)
+        return path
+    
+    def write_csv(self, name, rows):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, TRIP_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+    
+    def run_import(self, path, **options):
+        rejects_path = os.path.join(self.directory.name, "rejects.csv")
+        return import_trip_file(self.db, path, rejects_path=rejects_path, **options)
+    
+    def imported_count(self):
+        with self.db.get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM trips WHERE source = 'Pune'").fetchone()[0]
+    
+    def rejects(self, summary):
+        with open(summary['rejects_path'], newline='', encoding='utf-8') as file:
+            return list(csv.DictReader(file))
+    
+    def test_valid_csv(self):
+        summary = self.run_import(self.write_csv("trips.csv", [trip(n) for n in range(30)]), batch_size=7)
+        
+        self.assertEqual((summary['read'], summary['imported'], summary['duplicates'], summary['rejected']),
+                         (30, 30, 0, 0))
+        self.assertIsNone(summary['rejects_path'])
+        self.assertEqual(self.imported_count(), 30)
+    
+    def test_valid_ndjson(self):
+        lines = [json.dumps(trip(n)) for n in range(5)]
+        summary = self.run_import(self.write("trips.jsonl", "\n".join(lines[:2] + [""] + lines[2:]) + "\n"))
+        
+        self.assertEqual((summary['read'], summary['imported']), (5, 5))
+    
+    def test_valid_json_array_across_chunks(self):
+        text = json.dumps([trip(n) for n in range(50)], indent=2)
+        # Small chunks put element boundaries in every possible place
+        with mock.patch.object(trip_import, 'JSON_CHUNK_SIZE', 37):
+            summary = self.run_import(self.write("trips.json", text))
+        
+        self.assertEqual((summary['read'], summary['imported'], summary['rejected']), (50, 50, 0))
+    
+    def test_invalid_rows_are_rejected_with_reasons(self):
+        rows = [trip(0), trip(1, price='free'), trip(2, mode='boat'), trip(3, date='2099-13-01'), trip(4)]
+        summary = self.run_import(self.write_csv("trips.csv", rows))
+        
+        self.assertEqual((summary['imported'], summary['rejected']), (2, 3))
+        rejects = self.rejects(summary)
+        self.assertEqual([int(reject['line']) for reject in rejects], [3, 4, 5])
+        self.assertTrue(all(reject['reason'] for reject in rejects))
+    
+    def test_malformed_ndjson_line_is_rejected(self):
+        text = "\n".join([json.dumps(trip(0)), '{"source": "Pune",', '[1, 2]', json.dumps(trip(1))])
+        summary = self.run_import(self.write("trips.ndjson", text))
+        
+        self.assertEqual((summary['read'], summary['imported'], summary['rejected']), (4, 2, 2))
+        self.assertEqual([reject['reason'] for reject in self.rejects(summary)][1], "Not a JSON object")
+    
+    def test_duplicates_are_skipped(self):
+        rows = [trip(0), trip(1), trip(0), trip(1)]
+        summary = self.run_import(self.write_csv("trips.csv", rows))
+        self.assertEqual((summary['imported'], summary['duplicates']), (2, 2))
+        
+        # Importing the same file again only finds duplicates
+        summary = self.run_import(self.write_csv("again.csv", rows))
+        self.assertEqual((summary['imported'], summary['duplicates']), (0, 4))
+        self.assertEqual(self.imported_count(), 2)
+
+class CountingWrapper(io.TextIOWrapper):
+    """Text stream that counts the characters read from it"""
+    read_chars = 0
+    
+    def read(self, size=-1):
+        text = super().read(size)
+        CountingWrapper.read_chars += len(text)
+        return text
+
+class JsonArrayReaderTest(unittest.TestCase):
+    """A malformed JSON array fails without reading the rest of the file"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        CountingWrapper.read_chars = 0
+        patcher = mock.patch.object(trip_import.io, 'TextIOWrapper', CountingWrapper)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def read_all(self, text):
+        path = os.path.join(self.directory.name, "trips.json")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        reader = TripFileReader(path)
+        rows = []
+        with self.assertRaises(ValueError) as raised:
+            for row in reader:
+                rows.append(row)
+        return reader, rows, str(raised.exception)
+    
+    def test_not_an_array(self):
+        reader, rows, message = self.read_all('{"source": "Pune"}')
+        self.assertIn("array of objects", message)
+    
+    def test_malformed_element_stops_within_the_size_limit(self):
+        good = json.dumps(trip(0))
+        text = "[" + good + ", {\"source\": oops}, " + ", ".join([good] * 5000) + "]"
+        
+        with mock.patch.object(trip_import, 'JSON_CHUNK_SIZE', 1024), \
+             mock.patch.object(trip_import, 'MAX_JSON_ELEMENT_SIZE', 4096):
+            reader, rows, message = self.read_all(text)
+        
+        self.assertEqual(len(rows), 1)
+        self.assertIn("after element 1", message)
+        self.assertLess(CountingWrapper.read_chars, 8 * 1024)
+        self.assertGreater(len(text), 100 * 1024)
+    
+    def test_truncated_file(self):
+        reader, rows, message = self.read_all("[" + json.dumps(trip(0)) + ", {\"source\": \"Pu")
+        self.assertEqual(len(rows), 1)
+        self.assertIn("after element 1", message)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+import os
+import re
+
+# Characters read from a JSON array file at a time
+JSON_CHUNK_SIZE = 64 * 1024
+# Longest JSON array element accepted; a malformed one is given up on at this size
+# instead of reading the rest of the file while looking for where it ends
+MAX_JSON_ELEMENT_SIZE = 1024 * 1024
+ARRAY_SEPARATORS = re.compile(r'[\s,]*')
+
+class TripFileReader:
+    """Streams trip rows from a CSV, JSON array or newline-delimited JSON file
+    
+    Iterating yields (line_number, row) pairs, where row maps the column or
+    key names to values, or is a ValueError for a row that could not be
+    parsed; for JSON arrays line_number is the element's position. The file
+    is read in chunks, never loaded whole (a JSON array element may be at
+    most MAX_JSON_ELEMENT_SIZE characters), and bytes_read/total_bytes tell
+    how far through the file the reader is.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.total_bytes = os.path.getsize(path)
+        self._raw = None
+    
+    @property
+    def bytes_read(self):
+        """Bytes consumed from the file so far"""
+        if self._raw is None:
+            return 0
+        if self._raw.closed:
+            return self.total_bytes
+        return self._raw.tell()
+    
+    def __iter__(self):
+        extension = os.path.splitext(self.path)[1].lower()
+        with open(self.path, 'rb') as raw:
+            self._raw = raw
+            text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+            if extension == '.csv':
+                yield from self._read_csv(text)
+            elif extension in ('.jsonl', '.ndjson'):
+                yield from self._read_ndjson(text)
+            elif extension == '.json':
+                yield from self._read_json_array(text)
+            else:
+                raise ValueError(f"Unsupported trip file type: {extension or self.path}")
+    
+    def _read_csv(self, text):
+        """Yield CSV rows keyed by the header line"""
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    
+    def _read_ndjson(self, text):
+        """Yield one JSON object per non-blank line"""
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                row = ValueError(f"Invalid JSON: {e.msg}")
+            yield line_number, self._check_object(row)
+    
+    def _read_json_array(self, text):
+        """Yield the objects of a top-level JSON array without parsing the whole file"""
+        decoder = json.JSONDecoder()
+        buffer = text.read(JSON_CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError("A .json trip file must contain an array of objects")
+        index = 1
+        position = 0
+        
+        while True:
+            # Skip whitespace and commas between elements
+            index = ARRAY_SEPARATORS.match(buffer, index).end()
+            if buffer.startswith(']', index):
+                return
+            
+            try:
+                row, end = decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError:
+                row, end = None, None
+            
+            # An element ending at the buffer edge may continue in the next chunk
+            if end is None or end == len(buffer):
+                if len(buffer) - index > MAX_JSON_ELEMENT_SIZE:
+                    raise ValueError(f"Invalid JSON after element {position}: no complete element "
+                                     f"within {MAX_JSON_ELEMENT_SIZE} characters")
+                chunk = text.read(JSON_CHUNK_SIZE)
+                if chunk:
+                    buffer = buffer[index:] + chunk
+                    index = 0
+                    continue
+                if end is None:
+                    raise ValueError(f"Invalid JSON after element {position}")
+            
+            position += 1
+            index = end
+            yield position, self._check_object(row)
+    
+    def _check_object(self, row):
+        """Pass objects and parse errors through; anything else is rejected"""
+        if isinstance(row, (dict, ValueError)):
+            return row
+        return ValueError("Not a JSON object")
+
+def import_trip_file(db, path, batch_size=5000, on_progress=None, rejects_path=None):
+    """Import trips from a file through DatabaseManager.import_trips
+    
+    on_progress(summary) additionally gets bytes_read and total_bytes so
+    callers can show how far the import has come. Rejected rows are written
+    to rejects_path as CSV (line, reason, row), created only if a row is
+    rejected; the summary's rejects_path is then set.
+    """
+    reader = TripFileReader(path)
+    rejects_file = None
+    rejects_writer = None
+    
+    def progress(summary):
+        if on_progress:
+            summary['bytes_read'] = reader.bytes_read
+            summary['total_bytes'] = reader.total_bytes
+            on_progress(summary)
+    
+    def reject(line_number, row, reason):
+        nonlocal rejects_file, rejects_writer
+        if rejects_path is None:
+            return
+        if rejects_writer is None:
+            rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+            rejects_writer = csv.writer(rejects_file)
+            rejects_writer.writerow(('line', 'reason', 'row'))
+        raw = json.dumps(row, default=str) if isinstance(row, dict) else ''
+        rejects_writer.writerow((line_number, reason, raw))
+    
+    try:
+        summary = db.import_trips(reader, batch_size=batch_size, on_progress=progress, on_reject=reject)
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+    
+    summary['rejects_path'] = rejects_path if rejects_file is not None else None
+    return summary
\ No newline at end of file
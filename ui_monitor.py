@@ -0,0 +1,259 @@
+import functools
+import math
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+import dialogs
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)]
+
+def timed_handler(name):
+    """Time a UI method as the named handler
+    
+    For methods of objects with a data_service; does nothing unless that
+    DataService has a UIMonitor.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def timed(self, *args, **kwargs):
+            monitor = getattr(self.data_service, 'monitor', None)
+            if monitor is None:
+                return method(self, *args, **kwargs)
+            with monitor.handler(name):
+                return method(self, *args, **kwargs)
+        return timed
+    return decorate
+
+class UIAction:
+    """One user action: a handler plus the requests and callbacks it set off"""
+    __slots__ = ('name', 'started', 'render', 'other', 'dialog', 'db_times', 'pending', 'running')
+    
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.render = 0.0
+        self.other = 0.0
+        self.dialog = 0.0
+        # Appended to by worker threads, summed on the Tk thread once the action is done
+        self.db_times = []
+        self.pending = 0
+        self.running = True
+    
+    def timed(self, func):
+        """Wrap a request so its run time on the worker thread counts as database time"""
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.db_times.append(time.perf_counter() - started)
+        return run
+
+class UIMonitor:
+    """Measures how responsive the Tk event loop is
+    
+    A heartbeat is scheduled with root.after every interval milliseconds;
+    how late it fires is how long the event loop was blocked, and a beat
+    later than stall_threshold seconds is logged as a stall along with the
+    handler or callback that ran last.
+    
+    Handlers (see timed_handler) are timed as actions from the moment they
+    start until the last DataService request they submitted, directly or
+    from its callbacks, has been delivered. Each action is split into:
+    
+    - db: time its requests ran on the worker threads
+    - render: time its result callbacks ran on the Tk thread
+    - other: the rest of the wall time - the handler itself, queueing and
+      the delivery poll
+    - dialog: time a modal dialog opened through the dialogs module was
+      open, left out of the total
+    
+    report() summarises the last window seconds; all methods must be called
+    on the Tk thread.
+    """
+    def __init__(self, root, interval=100, stall_threshold=0.2, window=60.0, history=500):
+        self.root = root
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.window = window
+        
+        # (time, lateness) of recent heartbeats, and recent stalls and finished actions
+        self._beats = deque(maxlen=int(window * 1000 / interval) + 1)
+        self._stalls = deque(maxlen=history)
+        self._actions = deque(maxlen=history)
+        self._current = None
+        self._last_segment = None
+        self._dialog_time = 0.0
+        self._expected = None
+        self._after_id = None
+    
+    def start(self):
+        """Start the heartbeat and time the dialogs shown through the dialogs module"""
+        if self._after_id is None:
+            self._expected = time.perf_counter() + self.interval / 1000
+            self._after_id = self.root.after(self.interval, self._beat)
+        dialogs.set_monitor(self)
+    
+    def stop(self):
+        """Stop the heartbeat and stop timing dialogs"""
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        if dialogs.get_monitor() is self:
+            dialogs.set_monitor(None)
+    
+    def _beat(self):
+        now = time.perf_counter()
+        lateness = max(now - self._expected, 0.0)
+        self._beats.append((now, lateness))
+        if lateness >= self.stall_threshold:
+            self._stalls.append({
+                'time': time.time(),
+                'late_ms': round(lateness * 1000, 1),
+                'after': self._last_segment[0] if self._last_segment else None,
+            })
+        self._expected = time.perf_counter() + self.interval / 1000
+        self._after_id = self.root.after(self.interval, self._beat)
+    
+    def dialog(self, function, *args, **kwargs):
+        """Show a modal dialog; the time it is open is the user's, not the handler's"""
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._dialog_time += time.perf_counter() - started
+    
+    @contextmanager
+    def _segment(self, action, kind, label):
+        """Time a stretch of Tk-thread work for an action, minus any dialog it opened"""
+        previous = self._current
+        self._current = action
+        dialog_before = self._dialog_time
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            dialog = self._dialog_time - dialog_before
+            elapsed = time.perf_counter() - started - dialog
+            self._current = previous
+            self._last_segment = (label, elapsed)
+            if action is not None:
+                setattr(action, kind, getattr(action, kind) + elapsed)
+                action.dialog += dialog
+    
+    @contextmanager
+    def handler(self, name):
+        """Time a UI handler; handlers called from inside another action are part of it"""
+        if self._current is not None:
+            yield
+            return
+        action = UIAction(name)
+        try:
+            with self._segment(action, 'other', name):
+                yield
+        finally:
+            action.running = False
+            self._maybe_finish(action)
+    
+    def request_started(self, key, func):
+        """Called by DataService.submit; returns the action the request belongs to
+        
+        Requests submitted outside any handler, such as list pages fetched
+        while scrolling, become an action of their own named after the key.
+        """
+        action = self._current
+        if action is None:
+            name = re.sub(r'-?\d+$', '', key) if key else getattr(func, '__name__', 'request')
+            action = UIAction(name)
+            action.running = False
+        action.pending += 1
+        return action
+    
+    def callback(self, action):
+        """Context for a request's result callback on the Tk thread"""
+        return self._segment(action, 'render', f"{action.name} callback" if action else "callback")
+    
+    def request_finished(self, action):
+        """Called by DataService once a request's result was delivered or dropped"""
+        action.pending -= 1
+        self._maybe_finish(action)
+    
+    def _maybe_finish(self, action):
+        if action.running or action.pending > 0:
+            return
+        total = time.perf_counter() - action.started - action.dialog
+        db = sum(action.db_times)
+        self._actions.append({
+            'time': time.time(),
+            'name': action.name,
+            'total': total,
+            'db': db,
+            'render': action.render,
+            'other': max(total - db - action.render, 0.0),
+            'dialog': action.dialog,
+        })
+    
+    def report(self):
+        """Summarise the last window seconds
+        
+        Returns a dict with heartbeat lateness (ms percentiles, stalls),
+        per-handler timings (calls, total ms percentiles and mean db,
+        render, other and dialog ms) and the most recent stalls.
+        """
+        cutoff = time.perf_counter() - self.window
+        wall_cutoff = time.time() - self.window
+        lateness = sorted(late * 1000 for when, late in self._beats if when >= cutoff)
+        stalls = [stall for stall in self._stalls if stall['time'] >= wall_cutoff]
+        
+        handlers = {}
+        for action in self._actions:
+            if action['time'] >= wall_cutoff:
+                handlers.setdefault(action['name'], []).append(action)
+        handler_stats = {}
+        for name, actions in handlers.items():
+            totals = sorted(action['total'] * 1000 for action in actions)
+            handler_stats[name] = {
+                'calls': len(actions),
+                'p50_ms': round(percentile(totals, 50), 1),
+                'p95_ms': round(percentile(totals, 95), 1),
+                'max_ms': round(totals[-1], 1),
+            }
+            for part in ('db', 'render', 'other', 'dialog'):
+                handler_stats[name][f'{part}_ms'] = round(sum(action[part] for action in actions) * 1000 / len(actions), 1)
+        
+        return {
+            'window_seconds': self.window,
+            'heartbeat': {
+                'interval_ms': self.interval,
+                'samples': len(lateness),
+                'p50_late_ms': round(percentile(lateness, 50), 1) if lateness else None,
+                'p95_late_ms': round(percentile(lateness, 95), 1) if lateness else None,
+                'max_late_ms': round(lateness[-1], 1) if lateness else None,
+                'stalls': len(stalls),
+            },
+            'handlers': handler_stats,
+            'stalls': stalls[-20:],
+            'last_action': dict(self._actions[-1]) if self._actions else None,
+        }
+    
+    def summary(self):
+        """One line for a status bar: event loop lag, stalls and the last action's breakdown"""
+        report = self.report()
+        heartbeat = report['heartbeat']
+        if not heartbeat['samples']:
+            return ""
+        text = f"UI lag p95 {heartbeat['p95_late_ms']:.0f} ms, {heartbeat['stalls']} stall(s)/{self.window:.0f}s"
+        last = report['last_action']
+        if last is not None:
+            text += (f"  |  {last['name']}: {last['total'] * 1000:.0f} ms (DB {last['db'] * 1000:.0f}, "
+                     f"render {last['render'] * 1000:.0f}, other {last['other'] * 1000:.0f})")
+        return text
\ No newline at end of file
@@ -0,0 +1,290 @@
+import tkinter as tk
+from tkinter import ttk
+import dialogs
+
+class VirtualTreeview:
+    """Treeview that only materialises the rows currently on screen
+    
+    Rows come either from a list (set_rows) or from a keyset-paginated
+    fetch_page(after, page_size) -> (rows, next_cursor) callable
+    (set_source), which is asked for more rows as the user scrolls down.
+    Only the visible window exists as Treeview items; scrolling rewrites
+    their values in place, so rendering cost does not depend on the
+    number of rows. With a data_service, pages are fetched on a worker
+    thread and drawn when they arrive.
+    """
+    def __init__(self, parent, columns, column_widths, format_row, height=12,
+                 tag_colors=None, minwidth=None, page_size=200, buffer=50, data_service=None,
+                 row_key=None):
+        self.parent = parent
+        self.format_row = format_row
+        # Identifies a row for in-place updates; the first column (the ID) by default
+        self.row_key = row_key or (lambda row: row[0])
+        self.page_size = page_size
+        self.buffer = buffer
+        self.data_service = data_service
+        
+        # Loaded rows and the position of the first visible row
+        self.rows = []
+        self.offset = 0
+        self.selected_index = None
+        self._fetch_page = None
+        self._next_cursor = None
+        self._exhausted = True
+        self._loading = False
+        self._wanted_offset = 0
+        self._items = []
+        self._visible = height
+        
+        self.tree = ttk.Treeview(parent, columns=columns, show='headings', height=height, selectmode='browse')
+        
+        for col in columns:
+            self.tree.heading(col, text=col)
+            if minwidth is None:
+                self.tree.column(col, width=column_widths[col])
+            else:
+                self.tree.column(col, width=column_widths[col], minwidth=minwidth)
+        
+        for tag, color in (tag_colors or {}).items():
+            self.tree.tag_configure(tag, background=color)
+        
+        # The vertical scrollbar tracks the virtual row range, not the Treeview items
+        self.v_scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.h_scrollbar = ttk.Scrollbar(parent, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.h_scrollbar.set)
+        
+        # Grid treeview and scrollbars
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.v_scrollbar.grid(row=0, column=1, sticky='ns')
+        self.h_scrollbar.grid(row=1, column=0, sticky='ew')
+        
+        parent.grid_rowconfigure(0, weight=1)
+        parent.grid_columnconfigure(0, weight=1)
+        
+        # Scrolling and keyboard navigation
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_by(3))
+        self.tree.bind('<Up>', lambda e: self._move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self._move_selection(1))
+        self.tree.bind('<Prior>', lambda e: self._move_selection(-self._visible))
+        self.tree.bind('<Next>', lambda e: self._move_selection(self._visible))
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+    
+    def bind(self, sequence, func):
+        """Bind an event on the underlying Treeview"""
+        return self.tree.bind(sequence, func, add='+')
+    
+    def set_rows(self, rows):
+        """Show a fully loaded list of rows"""
+        self._set_fetch_page(None)
+        self.rows = list(rows)
+        self._reset()
+    
+    def set_source(self, fetch_page):
+        """Show rows from a keyset-paginated source, loading pages on demand"""
+        self._set_fetch_page(fetch_page)
+        self.rows = []
+        self._reset()
+    
+    def has_more(self):
+        """Check whether the source has rows that are not loaded yet"""
+        return self._fetch_page is not None and not self._exhausted
+    
+    def is_loading(self):
+        """Check whether a page request is in flight"""
+        return self._loading
+    
+    def selected_row(self):
+        """Return the selected source row, or None"""
+        if self.selected_index is None or self.selected_index >= len(self.rows):
+            return None
+        return self.rows[self.selected_index]
+    
+    def selected_values(self):
+        """Return the displayed values of the selected row, or None"""
+        row = self.selected_row()
+        if row is None:
+            return None
+        return self.format_row(row)[0]
+    
+    def refresh(self):
+        """Redraw the visible window"""
+        self._render()
+    
+    def find_row(self, key):
+        """Return the index of the loaded row with this key, or None"""
+        for index, row in enumerate(self.rows):
+            if self.row_key(row) == key:
+                return index
+        return None
+    
+    def update_row(self, row):
+        """Replace the loaded row with the same key; returns False if it is not loaded"""
+        index = self.find_row(self.row_key(row))
+        if index is None:
+            return False
+        
+        self.rows[index] = row
+        # Only touch Treeview items when the row is on screen
+        if self.offset <= index < self.offset + len(self._items):
+            values, tags = self.format_row(row)
+            self.tree.item(self._items[index - self.offset], values=values, tags=tags)
+        return True
+    
+    def insert_row(self, index, row):
+        """Insert a row at a position in the loaded rows"""
+        self.rows.insert(index, row)
+        if self.selected_index is not None and self.selected_index >= index:
+            self.selected_index += 1
+        self._render()
+    
+    def scroll_to(self, index):
+        """Scroll so that row index is the first visible row"""
+        # Remembered so an asynchronous page load can finish the scroll
+        self._wanted_offset = index
+        self._ensure_loaded(index + self._visible + self.buffer)
+        max_offset = max(0, len(self.rows) - self._visible)
+        self.offset = max(0, min(index, max_offset))
+        self._render()
+    
+    def _reset(self):
+        """Jump back to the top and drop the selection"""
+        self.offset = 0
+        self._wanted_offset = 0
+        self.selected_index = None
+        self._ensure_loaded(self._visible + self.buffer)
+        self._render()
+    
+    def _set_fetch_page(self, fetch_page):
+        """Switch to a new page source, dropping any page still in flight"""
+        if self._loading and self.data_service is not None:
+            self.data_service.cancel(self._request_key())
+        self._fetch_page = fetch_page
+        self._next_cursor = None
+        self._exhausted = fetch_page is None
+        self._loading = False
+    
+    def _request_key(self):
+        """Data service key for this list's page requests"""
+        return f"virtual-list-{id(self)}"
+    
+    def _add_page(self, page):
+        """Append a fetched page and remember where the next one starts"""
+        rows, self._next_cursor = page
+        self.rows.extend(rows)
+        self._exhausted = self._next_cursor is None
+    
+    def _ensure_loaded(self, count):
+        """Load pages until at least count rows are available or the source runs out"""
+        if self.data_service is None:
+            while len(self.rows) < count and self.has_more():
+                self._add_page(self._fetch_page(self._next_cursor, self.page_size))
+            return
+        
+        # Asynchronous: one page at a time, the rest follows from _on_page
+        if len(self.rows) < count and self.has_more() and not self._loading:
+            self._loading = True
+            self.data_service.submit(
+                self._fetch_page, self._next_cursor, self.page_size,
+                on_success=self._on_page, on_error=self._on_page_error,
+                key=self._request_key(), owner=self.tree
+            )
+    
+    def _on_page(self, page):
+        """Draw a page that arrived from the data service"""
+        self._loading = False
+        self._add_page(page)
+        self.scroll_to(self._wanted_offset)
+    
+    def _on_page_error(self, error):
+        """Stop loading after a failed page request"""
+        self._loading = False
+        self._exhausted = True
+        dialogs.showerror("Error", f"Failed to load rows: {str(error)}")
+    
+    def _virtual_total(self):
+        """Row count used for the scrollbar; unloaded pages count as one more page"""
+        return len(self.rows) + (self.page_size if self.has_more() else 0)
+    
+    def _render(self):
+        """Write the visible window into the reusable Treeview items"""
+        window = self.rows[self.offset:self.offset + self._visible]
+        
+        # Grow or shrink the item pool to the window size
+        while len(self._items) < len(window):
+            self._items.append(self.tree.insert('', tk.END))
+        while len(self._items) > len(window):
+            self.tree.delete(self._items.pop())
+        
+        for iid, row in zip(self._items, window):
+            values, tags = self.format_row(row)
+            self.tree.item(iid, values=values, tags=tags)
+        
+        # Keep the selection attached to the row, not the item
+        position = None if self.selected_index is None else self.selected_index - self.offset
+        if position is not None and 0 <= position < len(self._items):
+            self.tree.selection_set(self._items[position])
+            self.tree.focus(self._items[position])
+        else:
+            self.tree.selection_set(())
+        
+        total = self._virtual_total()
+        if total:
+            self.v_scrollbar.set(self.offset / total, min(1.0, (self.offset + len(window)) / total))
+        else:
+            self.v_scrollbar.set(0.0, 1.0)
+    
+    def _on_select(self, event):
+        """Remember which source row the user selected"""
+        # An empty selection only means the selected row scrolled out of view
+        selection = self.tree.selection()
+        if selection and selection[0] in self._items:
+            self.selected_index = self.offset + self._items.index(selection[0])
+    
+    def _on_configure(self, event):
+        """Recompute how many rows fit when the widget is resized"""
+        style = ttk.Style()
+        row_height = int(style.lookup('Treeview', 'rowheight') or 20)
+        # Leave room for the heading row
+        visible = max(1, (event.height - row_height - 4) // row_height)
+        if visible != self._visible:
+            self._visible = visible
+            self.scroll_to(self.offset)
+    
+    def _on_scrollbar(self, *args):
+        """Translate scrollbar commands into row offsets"""
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self._virtual_total()))
+        elif args[0] == 'scroll':
+            step = self._visible if args[2] == 'pages' else 1
+            self._scroll_by(int(args[1]) * step)
+    
+    def _on_mousewheel(self, event):
+        """Scroll three rows per wheel notch"""
+        self._scroll_by(-3 if event.delta > 0 else 3)
+        return 'break'
+    
+    def _scroll_by(self, rows):
+        """Scroll the window by a number of rows"""
+        self.scroll_to(self.offset + rows)
+        return 'break'
+    
+    def _move_selection(self, rows):
+        """Move the selection, scrolling when it leaves the window"""
+        if not self.rows:
+            return 'break'
+        
+        current = self.offset if self.selected_index is None else self.selected_index
+        self._ensure_loaded(current + rows + 1)
+        index = max(0, min(current + rows, len(self.rows) - 1))
+        self.selected_index = index
+        
+        if index < self.offset:
+            self.scroll_to(index)
+        elif index >= self.offset + self._visible:
+            self.scroll_to(index - self._visible + 1)
+        else:
+            self._render()
+        return 'break'
\ No newline at end of file